@@ -1,17 +1,38 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 import os
 import json
+import logging
 import csv
-import io
+import codecs
+import itertools
 import re
-from datetime import datetime
+import hashlib
+import threading
+import time
+import queue
+import random
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import requests
-from googleapiclient.discovery import build
-from langchain.llms import OpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage
 from config import Config
+from cache import ChannelCache, ResultCache
+from clients import get_llm_client, get_youtube_client
+from parsing import describe_fields, parse_analysis_response, parse_batch_response, validate_analysis
+from quota import QuotaTracker
+from ratelimit import RateLimiterRegistry
+from router import LLMRouter
+from jobs import JobManager
+from store import ResultStore, title_video_id
+from watch import WatchScheduler
+from dedup import TitleDeduplicator
+from preclassifier import PreClassifier
+from metrics import Metrics, estimate_tokens
+from export import EXPORT_FORMATS, EXPORT_WRITERS, check_export_format
+from summary import compare_channels, summarize
+from comments import COMMENT_FIELDS, SAMPLING_MODES, CommentAggregator, sample_comments
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -19,20 +40,164 @@ app.config.from_object(Config)
 # Configuration
 YOUTUBE_API_KEY = app.config['YOUTUBE_API_KEY']
 
+# LOG_LEVEL=DEBUG also logs every title, prompt size and raw LLM response
+logging.basicConfig(level=app.config['LOG_LEVEL'], format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+# Timing spans and counters exposed at /metrics
+metrics = Metrics()
+metrics.describe('channel_resolution_seconds', 'Time to resolve a channel input to a channel ID')
+metrics.describe('youtube_request_seconds', 'YouTube Data API calls, including retries')
+metrics.describe('prompt_build_seconds', 'Time to format an analysis prompt')
+metrics.describe('llm_call_seconds', 'LLM calls, including rate limit waits and retries')
+metrics.describe('json_parse_seconds', 'Time to parse an LLM response')
+metrics.describe('invalid_fields_total', 'Analysis fields that failed schema validation, by field and whether asking again fixed them')
+metrics.describe('export_seconds', 'Time to stream a results download, by format')
+metrics.describe('llm_requests_total', 'LLM calls by model and outcome')
+metrics.describe('llm_tokens_total', 'LLM tokens by model and direction (estimated when the provider does not report usage)')
+metrics.describe('llm_cost_usd_total', 'Approximate LLM spend from LLM_PRICES')
+metrics.describe('result_cache_lookups_total', 'Result cache lookups by outcome')
+metrics.describe('duplicate_titles_total', 'Titles answered from a near-duplicate instead of the LLM')
+metrics.describe('preclassified_titles_total', 'Titles answered by the local pre-classifier instead of the LLM')
+metrics.describe('comments_total', 'Comments by stage: fetched from YouTube, then analyzed or failed')
+
+# Shared pool for LLM calls so concurrent requests together stay within LLM_MAX_WORKERS
+llm_executor = ThreadPoolExecutor(max_workers=app.config['LLM_MAX_WORKERS'], thread_name_prefix='llm')
+
+# Persistent cache of title analyses, keyed by title + model + prompt version
+result_cache = ResultCache(
+    app.config['CACHE_PATH'],
+    ttl_seconds=app.config['CACHE_TTL_SECONDS'],
+    max_entries=app.config['CACHE_MAX_ENTRIES']
+) if app.config['CACHE_ENABLED'] else None
+
+# Persistent channel input -> channel ID -> uploads playlist resolutions
+channel_cache = ChannelCache(
+    app.config['CACHE_PATH'],
+    ttl_seconds=app.config['CHANNEL_CACHE_TTL_SECONDS']
+) if app.config['CACHE_ENABLED'] else None
+
+# Optional local tier answering confident titles without the LLM; trained via /admin/preclassifier/train
+preclassifier = PreClassifier(app.config['PRECLASSIFIER_PATH'], app.config['PRECLASSIFIER_THRESHOLDS'])
+
+# Per-key YouTube quota units
+youtube_quota = QuotaTracker(app.config['YOUTUBE_DAILY_QUOTA'])
+
+# Token bucket, adaptive concurrency and retry/backoff per provider and API key
+rate_limiters = RateLimiterRegistry({
+    'chatgpt': {
+        'rate_per_minute': app.config['LLM_RATE_LIMIT'],
+        'max_concurrency': app.config['LLM_MAX_WORKERS'],
+        'max_retries': app.config['API_MAX_RETRIES']
+    },
+    'gemini': {
+        'rate_per_minute': app.config['LLM_RATE_LIMIT'],
+        'max_concurrency': app.config['LLM_MAX_WORKERS'],
+        'max_retries': app.config['API_MAX_RETRIES']
+    },
+    'youtube': {
+        'rate_per_minute': app.config['YOUTUBE_RATE_LIMIT'],
+        'max_concurrency': app.config['YOUTUBE_MAX_CONCURRENCY'],
+        'max_retries': app.config['API_MAX_RETRIES']
+    }
+})
+
+# Picks the key (and, on failure or slow tails, the fallback model) serving each LLM call
+llm_router = LLMRouter(
+    rate_limiters,
+    fallbacks=app.config['LLM_FALLBACKS'] if app.config['LLM_FAILOVER_ENABLED'] else {},
+    cooldown_seconds=app.config['LLM_COOLDOWN_SECONDS'],
+    hedge_quantile=app.config['LLM_HEDGE_QUANTILE'],
+    hedge_min_seconds=app.config['LLM_HEDGE_MIN_SECONDS'],
+    max_workers=app.config['LLM_MAX_WORKERS']
+)
+
+def execute_youtube_request(request, api_key, method):
+    """Execute a YouTube API request under the key's quota and rate limits, retrying throttled calls"""
+    def attempt():
+        # Every attempt, including retries, costs quota units
+        youtube_quota.charge(api_key, method)
+        return request.execute()
+    with metrics.span('youtube_request', method=method):
+        return rate_limiters.call('youtube', api_key, attempt)
+
+CHANNEL_ID_PATTERN = re.compile(r'^UC[\w-]{22}$')
+
+def parse_channel_input(channel_input):
+    """Classify a channel input as ('id'|'handle'|'username'|'custom'|'name', value)"""
+    channel_input = channel_input.strip()
+    for marker, kind in (('youtube.com/channel/', 'id'), ('youtube.com/@', 'handle'),
+                         ('youtube.com/user/', 'username'), ('youtube.com/c/', 'custom')):
+        if marker in channel_input:
+            value = channel_input.split(marker)[1].split('/')[0].split('?')[0]
+            return kind, value
+    if channel_input.startswith('@'):
+        return 'handle', channel_input[1:]
+    if CHANNEL_ID_PATTERN.match(channel_input):
+        return 'id', channel_input
+    return 'name', channel_input
+
+def lookup_channel_with_key(api_key, **criteria):
+    """Find a channel with a cheap (1 unit) channels().list lookup such as forHandle or forUsername.
+
+    Returns the channel ID and caches its uploads playlist, or None when nothing matches.
+    """
+    youtube = get_youtube_client(api_key)
+    request = youtube.channels().list(part='id,contentDetails', **criteria)
+    response = execute_youtube_request(request, api_key, 'channels.list')
+    if not response.get('items'):
+        return None
+    item = response['items'][0]
+    if channel_cache is not None:
+        channel_cache.set_uploads_playlist_id(item['id'], item['contentDetails']['relatedPlaylists']['uploads'])
+    return item['id']
+
 def extract_channel_id_with_key(channel_input, api_key):
     """Extract channel ID from various YouTube URL formats or channel name using provided API key"""
-    if 'youtube.com/channel/' in channel_input:
-        return channel_input.split('youtube.com/channel/')[1].split('/')[0]
-    elif 'youtube.com/c/' in channel_input or 'youtube.com/user/' in channel_input:
-        # For custom URLs, we'll need to search for the channel
-        return None
-    elif 'youtube.com/@' in channel_input:
-        # Handle @username format
-        username = channel_input.split('youtube.com/@')[1].split('/')[0]
-        return search_channel_by_username_with_key(username, api_key)
-    else:
-        # Assume it's a channel name and search for it
-        return search_channel_by_name_with_key(channel_input, api_key)
+    kind, value = parse_channel_input(channel_input)
+    if kind == 'id':
+        return value
+
+    lookup = f"{kind}:{value.lower()}"
+    if channel_cache is not None:
+        channel_id = channel_cache.get_channel_id(lookup)
+        if channel_id:
+            return channel_id
+
+    channel_id = None
+    try:
+        if kind == 'handle':
+            channel_id = lookup_channel_with_key(api_key, forHandle=value)
+        elif kind == 'username':
+            channel_id = lookup_channel_with_key(api_key, forUsername=value)
+    except Exception as e:
+        logger.warning("Error looking up channel: %s", e)
+
+    if not channel_id:
+        # Custom /c/ URLs and plain names have no direct lookup, so fall back to search
+        if kind == 'name':
+            channel_id = search_channel_by_name_with_key(value, api_key)
+        else:
+            channel_id = search_channel_by_username_with_key(value, api_key)
+
+    if channel_id and channel_cache is not None:
+        channel_cache.set_channel_id(lookup, channel_id)
+    return channel_id
+
+def resolve_channels_with_key(channel_inputs, api_key):
+    """Resolve many channel inputs concurrently; returns channel IDs (None when not found) in input order"""
+    def resolve(channel_input):
+        try:
+            return extract_channel_id_with_key(channel_input, api_key)
+        except Exception as e:
+            logger.warning("Error resolving channel %s: %s", channel_input, e)
+            return None
+    with ThreadPoolExecutor(max_workers=app.config['YOUTUBE_MAX_CONCURRENCY'], thread_name_prefix='resolve') as executor:
+        return list(executor.map(resolve, channel_inputs))
+
+def make_channel_name(channel_input):
+    """File-name friendly name of a channel input, used in exports and stored results"""
+    return channel_input.replace(' ', '_').replace('@', '').replace('/', '_').replace(':', '_')
 
 def extract_channel_id(channel_input):
     """Extract channel ID from various YouTube URL formats or channel name"""
@@ -41,35 +206,35 @@ def extract_channel_id(channel_input):
 def search_channel_by_username_with_key(username, api_key):
     """Search for channel ID by username using provided API key"""
     try:
-        youtube = build('youtube', 'v3', developerKey=api_key)
+        youtube = get_youtube_client(api_key)
         request = youtube.search().list(
             part='snippet',
             q=username,
             type='channel',
             maxResults=1
         )
-        response = request.execute()
+        response = execute_youtube_request(request, api_key, 'search.list')
         if response['items']:
             return response['items'][0]['snippet']['channelId']
     except Exception as e:
-        print(f"Error searching for channel: {e}")
+        logger.warning("Error searching for channel: %s", e)
     return None
 
 def search_channel_by_name_with_key(channel_name, api_key):
     """Search for channel ID by channel name using provided API key"""
     try:
-        youtube = build('youtube', 'v3', developerKey=api_key)
+        youtube = get_youtube_client(api_key)
         request = youtube.search().list(
             part='snippet',
             q=channel_name,
             type='channel',
             maxResults=1
         )
-        response = request.execute()
+        response = execute_youtube_request(request, api_key, 'search.list')
         if response['items']:
             return response['items'][0]['snippet']['channelId']
     except Exception as e:
-        print(f"Error searching for channel: {e}")
+        logger.warning("Error searching for channel: %s", e)
     return None
 
 def search_channel_by_username(username):
@@ -80,177 +245,1200 @@ def search_channel_by_name(channel_name):
     """Search for channel ID by channel name"""
     return search_channel_by_name_with_key(channel_name, YOUTUBE_API_KEY)
 
-def get_video_titles_with_key(channel_id, max_results, api_key):
-    """Get recent video titles from a YouTube channel using provided API key"""
+def clean_title(title):
+    """Clean a video title by removing newlines and extra whitespace"""
+    return re.sub(r'\s+', ' ', title.replace('\n', ' ').replace('\r', ' ')).strip()
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 date or datetime into an aware UTC datetime (None passes through)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def prefetch(iterable, buffer_size):
+    """Iterate over an iterable from a background thread, keeping up to buffer_size items ready.
+
+    Lets slow producers (paginated API fetches) run ahead while the consumer is
+    busy. Exceptions raised by the producer are re-raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=max(1, buffer_size))
+    stopped = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stopped.is_set():
+                    try:
+                        buffer.put((item, None), timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stopped.is_set():
+                    return
+            buffer.put((done, None))
+        except Exception as e:
+            buffer.put((done, e))
+
+    threading.Thread(target=produce, daemon=True).start()
     try:
-        youtube = build('youtube', 'v3', developerKey=api_key)
-        
-        # First, get the channel's uploads playlist
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+def merge_streams(iterables, max_workers, buffer_size):
+    """Drain several iterables from up to max_workers background threads, yielding (index, item) as items arrive.
+
+    Like prefetch, but for many producers at once; the first exception raised
+    by a producer is re-raised in the consumer once the others have finished.
+    """
+    buffer = queue.Queue(maxsize=max(1, buffer_size))
+    stopped = threading.Event()
+    done = object()
+
+    def drain(index, iterable):
+        for item in iterable:
+            while not stopped.is_set():
+                try:
+                    buffer.put((index, item), timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if stopped.is_set():
+                return
+
+    def produce():
+        error = None
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='merge') as executor:
+                futures = [executor.submit(drain, index, iterable) for index, iterable in enumerate(iterables)]
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        error = error or e
+        except Exception as e:
+            # iterables itself failed (e.g. the video list could not be fetched); don't leave the consumer waiting
+            error = error or e
+        buffer.put((done, error))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            index, item = buffer.get()
+            if index is done:
+                if item is not None:
+                    raise item
+                return
+            yield index, item
+    finally:
+        stopped.set()
+
+def get_uploads_playlist_ids_with_key(channel_ids, api_key):
+    """Uploads playlists of many channels; those not cached are looked up 50 per channels.list call (1 unit each)"""
+    playlists = {}
+    missing = []
+    for channel_id in channel_ids:
+        cached = channel_cache.get_uploads_playlist_id(channel_id) if channel_cache is not None else None
+        if cached:
+            playlists[channel_id] = cached
+        elif channel_id not in missing:
+            missing.append(channel_id)
+
+    youtube = get_youtube_client(api_key)
+    for start in range(0, len(missing), 50):
         request = youtube.channels().list(
             part='contentDetails',
-            id=channel_id
+            id=','.join(missing[start:start + 50]),
+            maxResults=50
         )
-        response = request.execute()
-        
-        if not response['items']:
-            return []
-        
-        uploads_playlist_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-        
-        # Get videos from the uploads playlist
+        response = execute_youtube_request(request, api_key, 'channels.list')
+        for item in response.get('items', []):
+            playlists[item['id']] = item['contentDetails']['relatedPlaylists']['uploads']
+            if channel_cache is not None:
+                channel_cache.set_uploads_playlist_id(item['id'], playlists[item['id']])
+    return playlists
+
+def get_uploads_playlist_id_with_key(channel_id, api_key):
+    """Look up the playlist holding all uploads of a channel"""
+    if channel_cache is not None:
+        uploads_playlist_id = channel_cache.get_uploads_playlist_id(channel_id)
+        if uploads_playlist_id:
+            return uploads_playlist_id
+
+    youtube = get_youtube_client(api_key)
+    request = youtube.channels().list(
+        part='contentDetails',
+        id=channel_id
+    )
+    response = execute_youtube_request(request, api_key, 'channels.list')
+    if not response['items']:
+        return None
+    uploads_playlist_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+    if channel_cache is not None:
+        channel_cache.set_uploads_playlist_id(channel_id, uploads_playlist_id)
+    return uploads_playlist_id
+
+def iter_channel_videos_with_key(channel_id, api_key, max_results=None, published_after=None,
+                                 published_before=None, stop_at_video_id=None, uploads_playlist_id=None):
+    """Yield a channel's uploads newest first, following nextPageToken across pages.
+
+    Each item is a dict with video_id, video_title and published_at. Iteration
+    stops after max_results videos, at the first video older than
+    published_after, or on reaching stop_at_video_id (exclusive), whichever
+    comes first. Every API call is charged to the key's quota. Pass
+    uploads_playlist_id when it is already known to skip its lookup.
+    """
+    published_after = parse_timestamp(published_after)
+    published_before = parse_timestamp(published_before)
+
+    uploads_playlist_id = uploads_playlist_id or get_uploads_playlist_id_with_key(channel_id, api_key)
+    if not uploads_playlist_id:
+        return
+
+    youtube = get_youtube_client(api_key)
+    yielded = 0
+    page_token = None
+    while True:
+        page_size = 50 if max_results is None else min(50, max_results - yielded)
         request = youtube.playlistItems().list(
-            part='snippet',
+            part='snippet,contentDetails',
             playlistId=uploads_playlist_id,
-            maxResults=max_results
+            maxResults=page_size,
+            pageToken=page_token
+        )
+        response = execute_youtube_request(request, api_key, 'playlistItems.list')
+
+        for item in response.get('items', []):
+            video_id = item['contentDetails']['videoId']
+            if video_id == stop_at_video_id:
+                return
+            published_at = item['contentDetails'].get('videoPublishedAt') or item['snippet'].get('publishedAt')
+            published = parse_timestamp(published_at) if published_at else None
+            if published is not None:
+                if published_after is not None and published < published_after:
+                    return
+                if published_before is not None and published >= published_before:
+                    continue
+            yield {
+                'video_id': video_id,
+                'video_title': clean_title(item['snippet']['title']),
+                'published_at': published_at
+            }
+            yielded += 1
+            if max_results is not None and yielded >= max_results:
+                return
+
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+def iter_videos_with_key(channel_id, api_key, max_results=None, **filters):
+    """Stream a channel's uploads (see iter_channel_videos_with_key), prefetching pages in the background"""
+    try:
+        yield from prefetch(
+            iter_channel_videos_with_key(channel_id, api_key, max_results, **filters),
+            app.config['YOUTUBE_PREFETCH_VIDEOS']
         )
-        response = request.execute()
-        
-        video_titles = []
-        for item in response['items']:
-            title = item['snippet']['title']
-            # Clean video titles by removing newlines and extra whitespace
-            cleaned_title = re.sub(r'\s+', ' ', title.strip().replace('\n', ' ').replace('\r', ' '))
-            video_titles.append(cleaned_title)
-        
-        return video_titles
     except Exception as e:
-        print(f"Error getting video titles: {e}")
-        return []
+        logger.error("Error getting video titles: %s", e)
+
+def iter_video_titles_with_key(channel_id, api_key, max_results=None, **filters):
+    """Stream cleaned video titles of a channel, prefetching pages in the background"""
+    for video in iter_videos_with_key(channel_id, api_key, max_results, **filters):
+        yield video['video_title']
+
+def iter_titles_of(videos, seen):
+    """Yield each video's title, first appending the video to seen so results can be matched by position"""
+    for video in videos:
+        seen.append(video)
+        yield video['video_title']
+
+def iter_comment_threads_with_key(video_id, api_key, max_comments=None, order='relevance'):
+    """Yield a video's top-level comments, following nextPageToken across pages of up to 100.
+
+    Each item is a dict with comment_id, video_id, text, like_count,
+    reply_count and published_at. Every page is charged to the key's quota.
+    """
+    youtube = get_youtube_client(api_key)
+    yielded = 0
+    page_token = None
+    while True:
+        request = youtube.commentThreads().list(
+            part='snippet',
+            videoId=video_id,
+            maxResults=100 if max_comments is None else min(100, max_comments - yielded),
+            order=order,
+            textFormat='plainText',
+            pageToken=page_token
+        )
+        response = execute_youtube_request(request, api_key, 'commentThreads.list')
+
+        for item in response.get('items', []):
+            snippet = item['snippet']['topLevelComment']['snippet']
+            yield {
+                'comment_id': item['id'],
+                'video_id': video_id,
+                'text': snippet.get('textDisplay') or snippet.get('textOriginal') or '',
+                'like_count': snippet.get('likeCount', 0),
+                'reply_count': item['snippet'].get('totalReplyCount', 0),
+                'published_at': snippet.get('publishedAt')
+            }
+            yielded += 1
+            if max_comments is not None and yielded >= max_comments:
+                return
+
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+def iter_sampled_comments_with_key(video, api_key, settings, aggregator):
+    """Read one video's comments and yield the sample settings asks for, counting both in aggregator.
+
+    Errors (e.g. comments turned off) are recorded against the video instead of raised.
+    """
+    video_id = video['video_id']
+    aggregator.add_video(video_id, video.get('video_title'))
+
+    def fetched():
+        for comment in iter_comment_threads_with_key(video_id, api_key, settings['max_comments'], settings['order']):
+            aggregator.record_fetched(video_id)
+            metrics.inc('comments_total', stage='fetched')
+            yield comment
+
+    try:
+        # Seeded per video so a stratified sample is the same on every run
+        for comment in sample_comments(fetched(), settings['sample'], settings['sample_size'], random.Random(video_id)):
+            if comment['text'].strip():
+                aggregator.record_sampled(video_id)
+                yield comment
+    except Exception as e:
+        logger.error("Error getting comments of %s: %s", video_id, e)
+        aggregator.record_error(video_id, str(e))
+    aggregator.finish_sampling(video_id)
+
+def get_video_titles_with_key(channel_id, max_results, api_key):
+    """Get recent video titles from a YouTube channel using provided API key"""
+    return list(iter_video_titles_with_key(channel_id, api_key, max_results))
 
 def get_video_titles(channel_id, max_results=10):
     """Get recent video titles from a YouTube channel"""
     return get_video_titles_with_key(channel_id, max_results, YOUTUBE_API_KEY)
 
-def load_prompt():
-    """Load the analysis prompt from prompt.txt"""
+# path -> (mtime, text, compiled PromptTemplate); files are re-read only when they change
+_prompt_cache = {}
+
+def _get_cached_prompt(path):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError as e:
+        logger.error("Error loading prompt: %s", e)
+        return None, "", None
+    cached = _prompt_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                text = file.read()
+        except Exception as e:
+            logger.error("Error loading prompt: %s", e)
+            return None, "", None
+        cached = (mtime, text, PromptTemplate.from_template(text))
+        _prompt_cache[path] = cached
+    return cached
+
+def load_prompt(path='prompt.txt'):
+    """Load an analysis prompt, by default the single-title prompt from prompt.txt"""
+    return _get_cached_prompt(path)[1]
+
+def get_prompt_template(path='prompt.txt'):
+    """Compiled PromptTemplate for a prompt file, rebuilt only when the file changes"""
+    template = _get_cached_prompt(path)[2]
+    if template is None:
+        raise ValueError(f"Prompt file {path} could not be loaded")
+    return template
+
+# Prompt files whose contents make up the version recorded with every analysis
+PROMPT_FILES = ('prompt.txt', 'batch_prompt.txt')
+
+# tuple of paths -> (mtimes, version)
+_prompt_versions = {}
+
+def hash_prompt_files(paths):
+    """Short hash of the current contents of prompt files, without recording it in the result store"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(load_prompt(path).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+def get_prompt_version(paths=PROMPT_FILES):
+    """Short hash identifying the current contents of a set of prompt files, by default the analysis prompts.
+
+    A version is recorded in the result store with its prompt texts the first
+    time it is computed, so stored analyses can be traced back to their prompt.
+    """
+    paths = tuple(paths)
+    mtimes = tuple(_get_cached_prompt(path)[0] for path in paths)
+    cached = _prompt_versions.get(paths)
+    if cached is None or cached[0] != mtimes:
+        cached = _prompt_versions[paths] = (mtimes, hash_prompt_files(paths))
+        try:
+            result_store.add_prompt_version(cached[1], {path: load_prompt(path) for path in paths})
+        except Exception as e:
+            logger.error("Error recording prompt version: %s", e)
+    return cached[1]
+
+def get_cached_analysis(video_title, llm_type, gemini_model="gemini-2.5-flash"):
+    """Look up a previous analysis of this title, or None"""
+    if result_cache is None:
+        return None
+    model = get_model_name(llm_type, gemini_model)
+    analysis = result_cache.get(video_title, model, get_prompt_version())
+    metrics.inc('result_cache_lookups_total', result='hit' if analysis is not None else 'miss')
+    if analysis is not None:
+        # Entries cached before results recorded their model and prompt version
+        analysis.setdefault('model', model)
+        analysis.setdefault('prompt_version', get_prompt_version())
+    return analysis
+
+def cache_analysis(video_title, llm_type, gemini_model, analysis):
+    """Remember an analysis for later requests, under the model that actually produced it"""
+    if result_cache is not None:
+        model = analysis.get('model') or get_model_name(llm_type, gemini_model)
+        result_cache.set(video_title, model, get_prompt_version(), analysis)
+
+def get_model_name(llm_type, gemini_model="gemini-2.5-flash"):
+    """Name of the model actually used for an analysis"""
+    return gemini_model if llm_type == 'gemini' else llm_type
+
+def get_batch_size(llm_type, gemini_model="gemini-2.5-flash"):
+    """Number of titles packed into one LLM request for the given model"""
+    batch_sizes = app.config['LLM_BATCH_SIZES']
+    return max(1, int(batch_sizes.get(get_model_name(llm_type, gemini_model), app.config['LLM_BATCH_SIZE'])))
+
+def get_token_usage(response, prompt, text):
+    """(input_tokens, output_tokens) reported with a response, else estimated from the text"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage:
+        return usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+    usage = (getattr(response, 'response_metadata', None) or {}).get('token_usage')
+    if usage:
+        return usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0)
+    return estimate_tokens(prompt), estimate_tokens(text)
+
+def record_llm_usage(model, input_tokens, output_tokens):
+    """Count tokens and approximate cost for one LLM call"""
+    metrics.inc('llm_tokens_total', input_tokens, model=model, direction='input')
+    metrics.inc('llm_tokens_total', output_tokens, model=model, direction='output')
+    prices = app.config['LLM_PRICES'].get(model)
+    if prices:
+        metrics.inc('llm_cost_usd_total', (input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000, model=model)
+
+def get_llm_keys(llm_type, llm_api_key, fallback_api_key=''):
+    """Key pools per provider: llm_api_key for llm_type, fallback_api_key for the other provider"""
+    other = 'gemini' if llm_type == 'chatgpt' else 'chatgpt'
+    return {llm_type: llm_api_key or '', other: fallback_api_key or ''}
+
+def call_llm_target(target, formatted_prompt):
+    """One call to a (provider, model, api_key) target chosen by llm_router"""
+    provider, model, api_key = target
+    llm = get_llm_client(provider, api_key, model, max_connections=app.config['LLM_MAX_WORKERS'],
+                         json_mode=app.config['LLM_JSON_MODE'])
+    try:
+        response = llm.invoke(formatted_prompt)
+    except Exception:
+        metrics.inc('llm_requests_total', model=model, outcome='error')
+        raise
+    metrics.inc('llm_requests_total', model=model, outcome='success')
+    return response
+
+def invoke_llm(formatted_prompt, llm_type, api_key, gemini_model="gemini-2.5-flash"):
+    """Send a fully formatted prompt to the specified LLM; returns (response text, model that answered).
+
+    api_key is a key pool string for llm_type (comma-separated keys) or a
+    {provider: pool} dict from get_llm_keys; llm_router spreads calls over the
+    keys and fails over to LLM_FALLBACKS models.
+    """
+    return call_llm(formatted_prompt, llm_type, api_key, gemini_model)[:2]
+
+def call_llm(formatted_prompt, llm_type, api_key, gemini_model="gemini-2.5-flash", router=None, call_target=None):
+    """invoke_llm that also returns the call's token usage: (text, model, input_tokens, output_tokens)
+
+    router and call_target default to llm_router and call_llm_target; tools
+    such as evaluate.py pass their own to route or time calls differently.
+    """
+    router = router or llm_router
+    call_target = call_target or call_llm_target
+    requested = get_model_name(llm_type, gemini_model)
+    keys = api_key if isinstance(api_key, dict) else {llm_type: api_key}
+    with metrics.span('llm_call', model=requested):
+        response, (_, model, _) = router.call(
+            router.targets(llm_type, requested, keys),
+            lambda target: call_target(target, formatted_prompt)
+        )
+    if model != requested:
+        logger.info("%s answered instead of %s", model, requested)
+    logger.debug("response: %s", response)
+        
+    # Extract content from response object
+    if hasattr(response, 'content'):
+        text = response.content
+    else:
+        text = str(response)
+    input_tokens, output_tokens = get_token_usage(response, formatted_prompt, text)
+    record_llm_usage(model, input_tokens, output_tokens)
+    return text, model, input_tokens, output_tokens
+
+def complete_analysis(video_title, analysis, llm_type, api_key, gemini_model="gemini-2.5-flash", attempts=None):
+    """Validate an analysis against the prompt's schema, asking the LLM again for only the invalid fields.
+
+    Returns the normalized analysis; raises ValueError naming the fields that
+    are still invalid after attempts (default LLM_FIELD_REPAIR_ATTEMPTS) follow-up calls.
+    """
+    analysis, invalid = validate_analysis(analysis)
+    if attempts is None:
+        attempts = app.config['LLM_FIELD_REPAIR_ATTEMPTS']
+    for _ in range(attempts):
+        if not invalid:
+            break
+        logger.warning("Asking again for %s of %r", ', '.join(invalid), video_title)
+        with metrics.span('prompt_build'):
+            formatted_prompt = get_prompt_template('field_prompt.txt').format(
+                title=video_title, fields=describe_fields(invalid)
+            )
+        response_text, _ = invoke_llm(formatted_prompt, llm_type, api_key, gemini_model)
+        try:
+            with metrics.span('json_parse'):
+                repaired, still_invalid = validate_analysis(parse_analysis_response(response_text), invalid)
+        except ValueError as e:
+            logger.warning("Error parsing field repair: %s", e)
+            continue
+        for field in repaired:
+            metrics.inc('invalid_fields_total', field=field, outcome='repaired')
+        analysis.update(repaired)
+        invalid = still_invalid
+    if invalid:
+        for field in invalid:
+            metrics.inc('invalid_fields_total', field=field, outcome='failed')
+        raise ValueError(f"Invalid {', '.join(invalid)} in LLM response")
+    return analysis
+
+def run_sentiment_analysis(video_title, llm_type, api_key, gemini_model="gemini-2.5-flash", use_cache=True):
+    """Analyze sentiment using the specified LLM, raising on any failure"""
+    if use_cache:
+        cached = get_cached_analysis(video_title, llm_type, gemini_model)
+        if cached is not None:
+            return cached
+
+    logger.debug("title: %s", video_title)
+    logger.debug("model: %s", gemini_model)
+
+    with metrics.span('prompt_build'):
+        formatted_prompt = get_prompt_template('prompt.txt').format(title=video_title)
+    response_text, model = invoke_llm(formatted_prompt, llm_type, api_key, gemini_model)
+    with metrics.span('json_parse'):
+        analysis = parse_analysis_response(response_text)
+    analysis = complete_analysis(video_title, analysis, llm_type, api_key, gemini_model)
+    analysis['model'] = model
+    analysis['prompt_version'] = get_prompt_version()
+    cache_analysis(video_title, llm_type, gemini_model, analysis)
+    return analysis
+
+def number_texts(texts):
+    """Texts as JSON strings numbered from 1, one per line, as parse_batch_response expects"""
+    return '\n'.join(f"{position}. {json.dumps(text, ensure_ascii=False)}" for position, text in enumerate(texts, start=1))
+
+def format_batch_prompt(video_titles, path='batch_prompt.txt'):
+    """Batch prompt listing the titles numbered from 1"""
+    return get_prompt_template(path).format(count=len(video_titles), titles=number_texts(video_titles))
+
+def run_batch_sentiment_analysis(video_titles, llm_type, api_key, gemini_model="gemini-2.5-flash"):
+    """Analyze several titles in one request.
+
+    Returns ({position: analysis}, {position: error}): analyses for the titles
+    it parsed, and errors for parsed titles whose fields stayed invalid or
+    whose follow-up call failed; one title's error never discards the others.
+    """
+    logger.debug("titles: %d", len(video_titles))
+    logger.debug("model: %s", gemini_model)
+
+    with metrics.span('prompt_build'):
+        formatted_prompt = format_batch_prompt(video_titles)
+    response_text, model = invoke_llm(formatted_prompt, llm_type, api_key, gemini_model)
+    with metrics.span('json_parse'):
+        parsed = parse_batch_response(response_text, len(video_titles))
+    errors = {}
+    for position, analysis in list(parsed.items()):
+        try:
+            analysis = complete_analysis(video_titles[position], analysis, llm_type, api_key, gemini_model)
+        except Exception as e:
+            logger.error("Error analyzing sentiment: %s", e)
+            errors[position] = str(e)
+            del parsed[position]
+            continue
+        analysis['model'] = model
+        analysis['prompt_version'] = get_prompt_version()
+        cache_analysis(video_titles[position], llm_type, gemini_model, analysis)
+        parsed[position] = analysis
+    return parsed, errors
+
+def complete_local_analysis(video_title, analysis, llm_type, api_key, gemini_model="gemini-2.5-flash"):
+    """Fill in the fields a pre-classifier answer leaves out with one field_prompt.txt call.
+
+    Only topics and agency_subject (and any field the local guess got wrong
+    by schema) are asked for, so the call is much shorter than a full analysis.
+    """
+    analysis = complete_analysis(video_title, analysis, llm_type, api_key, gemini_model,
+                                 attempts=max(1, app.config['LLM_FIELD_REPAIR_ATTEMPTS']))
+    analysis['source'] = 'local'
+    analysis['model'] = 'preclassifier'
+    analysis['prompt_version'] = get_prompt_version()
+    return analysis
+
+def analyze_batch_with_llm(video_titles, llm_type, api_key, gemini_model="gemini-2.5-flash"):
+    """Analyze a batch of titles, splitting and retrying whatever comes back malformed.
+
+    Returns a list aligned with video_titles holding (analysis, error) pairs.
+    A single title always goes through the regular one-title prompt.
+    """
+    if len(video_titles) == 1:
+        try:
+            # The cache was already consulted before the title was batched
+            return [(run_sentiment_analysis(video_titles[0], llm_type, api_key, gemini_model, use_cache=False), None)]
+        except Exception as e:
+            logger.error("Error analyzing sentiment: %s", e)
+            return [(None, str(e))]
+
     try:
-        with open('prompt.txt', 'r', encoding='utf-8') as file:
-            return file.read()
+        parsed, errors = run_batch_sentiment_analysis(video_titles, llm_type, api_key, gemini_model)
+    except ValueError as e:
+        # Malformed batch output: retry the two halves separately
+        logger.warning("Error parsing batch of %d: %s", len(video_titles), e)
+        parsed, errors = {}, {}
     except Exception as e:
-        print(f"Error loading prompt: {e}")
-        return ""
+        logger.error("Error analyzing sentiment: %s", e)
+        return [(None, str(e))] * len(video_titles)
+
+    # Titles whose invalid fields were already asked for again are not sent a second time
+    outcomes = [
+        (parsed[position], None) if position in parsed else (None, errors[position]) if position in errors else None
+        for position in range(len(video_titles))
+    ]
+    missing = [position for position, outcome in enumerate(outcomes) if outcome is None]
+    if missing:
+        middle = (len(missing) + 1) // 2
+        for half in (missing[:middle], missing[middle:]):
+            if not half:
+                continue
+            retried = analyze_batch_with_llm([video_titles[position] for position in half], llm_type, api_key, gemini_model)
+            for position, outcome in zip(half, retried):
+                outcomes[position] = outcome
+    return outcomes
 
 def analyze_sentiment_with_llm(video_title, llm_type, api_key, gemini_model="gemini-2.5-flash"):
     """Analyze sentiment using the specified LLM"""
-    prompt_template = load_prompt()
-    
-    print(f"title: {video_title}")
-    print(f"model: {gemini_model}")
-
     try:
-        if llm_type == 'chatgpt':
-            llm = OpenAI(api_key=api_key, temperature=0)
-            prompt = PromptTemplate(
-                input_variables=["title"],
-                template=prompt_template
-            )
-            formatted_prompt = prompt.format(title=video_title)
-            response = llm.invoke(formatted_prompt)
-            print(f"response: {response}")
-            
-        elif llm_type == 'gemini':
-            llm = ChatGoogleGenerativeAI(
-                model=gemini_model,
-                google_api_key=api_key,
-                temperature=0
-            )
-            prompt = PromptTemplate(
-                input_variables=["title"],
-                template=prompt_template
-            )
-            formatted_prompt = prompt.format(title=video_title)
-            response = llm.invoke(formatted_prompt)
-            print(f"response: {response}")
-        else:
-            return None
-            
-        # Extract content from response object
-        if hasattr(response, 'content'):
-            response_text = response.content
-        else:
-            response_text = str(response)
-            
-        # Extract JSON from response
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group())
-        else:
-            return None
-            
+        return run_sentiment_analysis(video_title, llm_type, api_key, gemini_model)
     except Exception as e:
-        print(f"Error analyzing sentiment: {e}")
+        logger.error("Error analyzing sentiment: %s", e)
         return None
 
+def format_analysis_result(video_title, analysis, duplicate_of=None):
+    """Flatten an LLM analysis into a result row.
+
+    duplicate_of names the title whose analysis was reused for a near-duplicate.
+    """
+    result = {
+        'video_title': video_title,
+        'sentiment': analysis.get('sentiment', ''),
+        'emotion': analysis.get('emotion', ''),
+        'frame': analysis.get('frame', ''),
+        'ideology_score': analysis.get('ideology_score', ''),
+        'topics': ', '.join(analysis.get('topics', [])),
+        'language_mix': analysis.get('language_mix', ''),
+        'agency_subject': analysis.get('agency_subject', ''),
+        'model': analysis.get('model', ''),
+        'prompt_version': analysis.get('prompt_version', '')
+    }
+    if analysis.get('source'):
+        result['source'] = analysis['source']
+    if duplicate_of is not None:
+        result['duplicate_of'] = duplicate_of
+    return result
+
+def analyze_titles_with_llm(video_titles, llm_type, api_key, gemini_model="gemini-2.5-flash",
+                            on_result=None, cancel_event=None):
+    """Analyze many titles concurrently on the shared LLM pool.
+
+    Duplicate titles (see dedup.py) are grouped as they arrive
+    and only the first title of each group is analyzed; its result is fanned
+    out to the other members. Cached titles are answered immediately, and so
+    are titles the local pre-classifier is confident about when
+    PRECLASSIFIER_ENABLED is set, apart from one short call for the fields it
+    cannot answer; the rest are packed into batches of get_batch_size() titles per request. Titles may
+    be any iterable; at most LLM_MAX_WORKERS batches are in flight at once so a
+    lazy source is not drained ahead of the workers. Returns (results, failed)
+    with both lists in input order.
+
+    on_result(position, title, result, error) is called as each title finishes,
+    possibly from a worker thread. Setting cancel_event stops reading new
+    titles; batches already in flight still complete.
+    """
+    in_flight = threading.BoundedSemaphore(app.config['LLM_MAX_WORKERS'])
+    batch_size = get_batch_size(llm_type, gemini_model)
+    deduplicator = TitleDeduplicator(
+        threshold=app.config['DEDUP_SIMILARITY'],
+        boilerplate=app.config['TITLE_BOILERPLATE'],
+        fuzzy=app.config['DEDUP_FUZZY']
+    ) if app.config['DEDUP_ENABLED'] else None
+    use_preclassifier = app.config['PRECLASSIFIER_ENABLED'] and preclassifier.trained
+
+    # position -> (title, analysis, error, representative title or None)
+    outcomes = {}
+    # representative position -> [(position, title)] still waiting for its result
+    waiting = {}
+    representatives = {}
+    lock = threading.Lock()
+
+    def finish(position, title, analysis, error, duplicate_of=None):
+        with lock:
+            outcomes[position] = (title, analysis, error, duplicate_of)
+            members = waiting.pop(position, [])
+        if on_result is not None:
+            result = format_analysis_result(title, analysis, duplicate_of) if analysis is not None else None
+            on_result(position, title, result, error)
+        for member_position, member_title in members:
+            finish(member_position, member_title, analysis, error, title)
+
+    def worker(batch):
+        try:
+            results = analyze_batch_with_llm([title for _, title, _ in batch], llm_type, api_key, gemini_model)
+            for (position, title, prediction), (analysis, error) in zip(batch, results):
+                if analysis is not None:
+                    preclassifier.record_agreement(prediction, analysis)
+                finish(position, title, analysis, error)
+        finally:
+            in_flight.release()
+
+    def local_worker(position, title, prediction):
+        try:
+            analysis = complete_local_analysis(title, preclassifier.answer(title, prediction), llm_type, api_key,
+                                               gemini_model)
+        except Exception as e:
+            logger.error("Error completing local analysis: %s", e)
+            finish(position, title, None, str(e))
+        else:
+            finish(position, title, analysis, None)
+        finally:
+            in_flight.release()
+
+    def submit(function, *args):
+        in_flight.acquire()
+        futures.append(llm_executor.submit(function, *args))
+
+    futures = []
+    batch = []
+    for position, title in enumerate(video_titles):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        if deduplicator is not None:
+            group, is_new = deduplicator.assign(title)
+            if not is_new:
+                representative = representatives[group]
+                with lock:
+                    done = outcomes.get(representative)
+                    if done is None:
+                        waiting.setdefault(representative, []).append((position, title))
+                if done is not None:
+                    finish(position, title, done[1], done[2], done[0])
+                metrics.inc('duplicate_titles_total')
+                continue
+            representatives[group] = position
+        cached = get_cached_analysis(title, llm_type, gemini_model)
+        if cached is not None:
+            finish(position, title, cached, None)
+            continue
+        prediction = preclassifier.predict(title) if use_preclassifier else {}
+        if preclassifier.is_confident(prediction):
+            submit(local_worker, position, title, prediction)
+            metrics.inc('preclassified_titles_total')
+            continue
+        batch.append((position, title, prediction))
+        if len(batch) >= batch_size:
+            submit(worker, batch)
+            batch = []
+    if batch:
+        submit(worker, batch)
+
+    for future in futures:
+        future.result()
+
+    results = []
+    failed = []
+    for position in sorted(outcomes):
+        title, analysis, error, duplicate_of = outcomes[position]
+        if analysis is not None:
+            results.append(format_analysis_result(title, analysis, duplicate_of))
+        else:
+            failed.append({'video_title': title, 'error': error})
+    return results, failed
+
+def analyze_comment_batch(comments, llm_type, api_key, gemini_model="gemini-2.5-flash"):
+    """Classify several comments in one request; returns analyses aligned with comments, None where invalid or missing"""
+    texts = [comment['text'][:app.config['COMMENT_MAX_CHARS']] for comment in comments]
+    with metrics.span('prompt_build'):
+        formatted_prompt = get_prompt_template('comment_prompt.txt').format(count=len(texts), comments=number_texts(texts))
+    response_text, _ = invoke_llm(formatted_prompt, llm_type, api_key, gemini_model)
+    with metrics.span('json_parse'):
+        parsed = parse_batch_response(response_text, len(texts))
+    analyses = []
+    for position in range(len(comments)):
+        analysis, invalid = validate_analysis(parsed.get(position, {}), COMMENT_FIELDS)
+        analyses.append(None if invalid else analysis)
+    return analyses
+
+def classify_comments(comments, llm_type, api_key, gemini_model="gemini-2.5-flash"):
+    """analyze_comment_batch, sending the comments missing from a malformed or incomplete answer once more"""
+    analyses = [None] * len(comments)
+    pending = list(range(len(comments)))
+    for _ in range(2):
+        try:
+            answers = analyze_comment_batch([comments[index] for index in pending], llm_type, api_key, gemini_model)
+        except ValueError as e:
+            logger.warning("Error parsing comment batch of %d: %s", len(pending), e)
+            continue
+        except Exception as e:
+            logger.error("Error analyzing comments: %s", e)
+            break
+        for index, analysis in zip(pending, answers):
+            analyses[index] = analysis
+        pending = [index for index in pending if analyses[index] is None]
+        if not pending:
+            break
+    return analyses
+
+def analyze_comments_with_llm(comments, llm_type, api_key, gemini_model="gemini-2.5-flash", aggregator=None,
+                              cancel_event=None):
+    """Classify a stream of comments in batches of COMMENT_BATCH_SIZE on the shared LLM pool.
+
+    Each outcome goes straight into aggregator and nothing else is kept: at
+    most LLM_MAX_WORKERS batches are in flight, so memory stays bounded however
+    many comments the iterable yields. A batch whose analysis raises counts
+    all of its comments as failed. Returns the aggregator.
+    """
+    aggregator = aggregator or CommentAggregator()
+    in_flight = threading.BoundedSemaphore(app.config['LLM_MAX_WORKERS'])
+    batch_size = max(1, app.config['COMMENT_BATCH_SIZE'])
+
+    def worker(batch):
+        try:
+            try:
+                analyses = classify_comments(batch, llm_type, api_key, gemini_model)
+            except Exception as e:
+                logger.error("Error analyzing comment batch of %d: %s", len(batch), e)
+                analyses = [None] * len(batch)
+            for comment, analysis in zip(batch, analyses):
+                aggregator.record(comment, analysis)
+                metrics.inc('comments_total', stage='analyzed' if analysis is not None else 'failed')
+        finally:
+            in_flight.release()
+
+    def submit(batch):
+        in_flight.acquire()
+        # Finished batches are collected as we go, so at most LLM_MAX_WORKERS futures are kept
+        for future in [future for future in futures if future.done()]:
+            futures.remove(future)
+            future.result()
+        futures.append(llm_executor.submit(worker, batch))
+
+    futures = []
+    batch = []
+    for comment in comments:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        batch.append(comment)
+        if len(batch) >= batch_size:
+            submit(batch)
+            batch = []
+    if batch:
+        submit(batch)
+
+    for future in futures:
+        future.result()
+    return aggregator
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', max_videos=app.config['MAX_VIDEOS_PER_ANALYSIS'])
 
-@app.route('/analyze', methods=['POST'])
-def analyze():
+# Request settings that must never be written to disk
+SECRET_SETTINGS = ('llm_api_key', 'fallback_api_key', 'youtube_api_key')
+
+def parse_video_filters(data):
+    """Upload filters of a channel request; returns (filters, None) or (None, error_message)"""
+    filters = {
+        'published_after': data.get('published_after') or None,
+        'published_before': data.get('published_before') or None,
+        'stop_at_video_id': data.get('since_video_id') or None
+    }
     try:
-        data = request.get_json()
-        input_method = data.get('input_method', 'channel')
-        channel_input = data.get('channel_input', '')
-        num_videos = int(data.get('num_videos', app.config['DEFAULT_VIDEOS_COUNT']))
-        llm_type = data.get('llm_type')
-        gemini_model = data.get('gemini_model', 'gemini-2.5-flash')
-        youtube_api_key = data.get('youtube_api_key', '')
-        llm_api_key = data.get('llm_api_key')
+        parse_timestamp(filters['published_after'])
+        parse_timestamp(filters['published_before'])
+    except ValueError:
+        return None, 'Dates must be in ISO format, e.g. 2024-06-01 or 2024-06-01T12:00:00Z.'
+    return filters, None
+
+def prepare_channel_analysis(data):
+    """Validate a channel analysis request and resolve its channel.
+
+    Returns (settings, None) on success or (None, error_message).
+    """
+    input_method = data.get('input_method', 'channel')
+    channel_input = data.get('channel_input', '')
+    num_videos = int(data.get('num_videos', app.config['DEFAULT_VIDEOS_COUNT']))
+    llm_type = data.get('llm_type')
+    gemini_model = data.get('gemini_model', 'gemini-2.5-flash')
+    youtube_api_key = data.get('youtube_api_key', '')
+    llm_api_key = data.get('llm_api_key')
+    
+    # Validate inputs
+    if input_method == 'channel':
+        if not channel_input or not channel_input.strip():
+            return None, 'Channel input is required.'
+            
+        if not youtube_api_key or not youtube_api_key.strip():
+            return None, 'YouTube API key is required.'
+    
+    if not llm_api_key or not llm_api_key.strip():
+        return None, 'LLM API key is required.'
         
-        # Validate inputs
-        if input_method == 'channel':
-            if not channel_input or not channel_input.strip():
-                return jsonify({'error': 'Channel input is required.'}), 400
-                
-            if not youtube_api_key or not youtube_api_key.strip():
-                return jsonify({'error': 'YouTube API key is required.'}), 400
+    if num_videos < 1 or num_videos > app.config['MAX_VIDEOS_PER_ANALYSIS']:
+        return None, f'Number of videos must be between 1 and {app.config["MAX_VIDEOS_PER_ANALYSIS"]}.'
         
-        if not llm_api_key or not llm_api_key.strip():
-            return jsonify({'error': 'LLM API key is required.'}), 400
-            
-        if num_videos < 1 or num_videos > app.config['MAX_VIDEOS_PER_ANALYSIS']:
-            return jsonify({'error': f'Number of videos must be between 1 and {app.config["MAX_VIDEOS_PER_ANALYSIS"]}.'}), 400
-            
-        if llm_type not in ['chatgpt', 'gemini']:
-            return jsonify({'error': 'Invalid LLM type. Choose from: chatgpt, gemini'}), 400
+    if llm_type not in ['chatgpt', 'gemini']:
+        return None, 'Invalid LLM type. Choose from: chatgpt, gemini'
+    
+    filters, error = parse_video_filters(data)
+    if error:
+        return None, error
+    
+    if input_method != 'channel':
+        return None, 'Invalid input method. Use /analyze_csv for CSV uploads.'
+    
+    # Extract channel ID using the provided YouTube API key
+    with metrics.span('channel_resolution'):
+        channel_id = extract_channel_id_with_key(channel_input, youtube_api_key)
+    if not channel_id:
+        return None, 'Could not find channel. Please check the channel name or URL and YouTube API key.'
+    
+    return {
+        'kind': 'channel',
+        'channel_id': channel_id,
+        'channel_name': make_channel_name(channel_input),
+        'num_videos': num_videos,
+        'filters': filters,
+        'llm_type': llm_type,
+        'gemini_model': gemini_model,
+        'llm_model': get_model_name(llm_type, gemini_model),
+        'youtube_api_key': youtube_api_key,
+        'llm_api_key': llm_api_key,
+        'fallback_api_key': data.get('fallback_api_key', '')
+    }, None
+
+def iter_csv_titles(csv_file, dedup_window=None):
+    """Stream cleaned, de-duplicated video titles from an uploaded CSV file.
+
+    Only the header is read up front to find the title column (raising
+    ValueError if there is none); rows are then decoded lazily. Duplicates are
+    detected with 8-byte digests of the last dedup_window distinct titles, so
+    memory stays bounded however large the file is.
+    """
+    if dedup_window is None:
+        dedup_window = app.config['CSV_DEDUP_WINDOW']
+    # utf-8-sig drops the byte order mark spreadsheet exports often start with
+    reader = csv.reader(codecs.iterdecode(csv_file.stream, 'utf-8-sig'))
+    header = next(reader, None) or []
+    
+    # Find the video title column
+    title_column = None
+    for index, col in enumerate(header):
+        if 'title' in col.lower() or 'video' in col.lower():
+            title_column = index
+            break
+    
+    if title_column is None:
+        raise ValueError('No video title column found. Please ensure your CSV has a column named "video_title" or "title".')
+    
+    def titles():
+        seen = OrderedDict()
+        for row in reader:
+            if title_column >= len(row):
+                continue
+            # Clean video titles by removing newlines and extra whitespace
+            title = clean_title(row[title_column])
+            if not title:
+                continue
+            digest = hashlib.blake2b(title.encode('utf-8'), digest_size=8).digest()
+            if digest in seen:
+                seen.move_to_end(digest)
+                continue
+            seen[digest] = None
+            if len(seen) > dedup_window:
+                seen.popitem(last=False)
+            yield title
+    
+    return titles()
+
+def prepare_csv_analysis(form, files):
+    """Validate a CSV analysis request and open its titles as a stream.
+
+    Returns (settings, video_titles, None) on success or (None, None, error_message).
+    """
+    if 'csv_file' not in files:
+        return None, None, 'No CSV file uploaded.'
+    
+    csv_file = files['csv_file']
+    if csv_file.filename == '':
+        return None, None, 'No CSV file selected.'
+    
+    llm_type = form.get('llm_type')
+    gemini_model = form.get('gemini_model', 'gemini-2.5-flash')
+    llm_api_key = form.get('llm_api_key')
+    
+    # Validate inputs
+    if not llm_api_key or not llm_api_key.strip():
+        return None, None, 'AI Model API key is required.'
         
-        if input_method == 'channel':
-            # Extract channel ID using the provided YouTube API key
-            channel_id = extract_channel_id_with_key(channel_input, youtube_api_key)
-            if not channel_id:
-                return jsonify({'error': 'Could not find channel. Please check the channel name or URL and YouTube API key.'}), 400
-            
-            # Get video titles using the provided YouTube API key
-            video_titles = get_video_titles_with_key(channel_id, num_videos, youtube_api_key)
-            if not video_titles:
-                return jsonify({'error': 'Could not retrieve video titles. Please check the channel and YouTube API key.'}), 400
-            
-            channel_name = channel_input.replace(' ', '_').replace('@', '').replace('/', '_').replace(':', '_')
-        else:
-            return jsonify({'error': 'Invalid input method. Use /analyze_csv for CSV uploads.'}), 400
+    if llm_type not in ['chatgpt', 'gemini']:
+        return None, None, 'Invalid LLM type. Choose from: chatgpt, gemini'
+    
+    try:
+        video_titles = iter_csv_titles(csv_file)
+        # Read ahead one title so an empty file is reported before any work starts
+        first_title = next(video_titles, None)
+    except ValueError as e:
+        return None, None, str(e)
+    except Exception as e:
+        return None, None, f'Error reading CSV file: {str(e)}'
+    if first_title is None:
+        return None, None, 'No video titles found in the CSV file.'
+    video_titles = itertools.chain([first_title], video_titles)
+    
+    return {
+        'kind': 'csv',
+        'channel_name': csv_file.filename.replace('.csv', ''),
+        'llm_type': llm_type,
+        'gemini_model': gemini_model,
+        'llm_model': get_model_name(llm_type, gemini_model),
+        'llm_api_key': llm_api_key,
+        'fallback_api_key': form.get('fallback_api_key', '')
+    }, video_titles, None
+
+def read_channel_inputs(csv_file):
+    """Channel inputs from an uploaded CSV, taken from a channel/url/handle column or else the first column"""
+    rows = list(csv.reader(codecs.iterdecode(csv_file.stream, 'utf-8-sig')))
+    if not rows:
+        return []
+    column = next((index for index, col in enumerate(rows[0])
+                   if any(word in col.lower() for word in ('channel', 'url', 'handle'))), None)
+    if column is None:
+        # No header row: every row is a channel
+        column = 0
+    else:
+        rows = rows[1:]
+    return [row[column].strip() for row in rows if column < len(row) and row[column].strip()]
+
+def prepare_bulk_analysis(data, files):
+    """Validate a bulk analysis request and resolve all of its channels in parallel.
+
+    Channels come from the channels list (or newline-separated text) and/or an
+    uploaded channels_file CSV. Returns (settings, None) on success or
+    (None, error_message); inputs that could not be resolved are listed in
+    settings['unresolved'] rather than failing the request.
+    """
+    channel_inputs = data.get('channels') or []
+    if isinstance(channel_inputs, str):
+        channel_inputs = channel_inputs.splitlines()
+    if 'channels_file' in files:
+        try:
+            channel_inputs = list(channel_inputs) + read_channel_inputs(files['channels_file'])
+        except Exception as e:
+            return None, f'Error reading channels file: {str(e)}'
+    channel_inputs = list(dict.fromkeys(
+        channel_input.strip() for channel_input in channel_inputs if channel_input and channel_input.strip()
+    ))
+    num_videos = int(data.get('num_videos', app.config['DEFAULT_VIDEOS_COUNT']))
+    llm_type = data.get('llm_type')
+    gemini_model = data.get('gemini_model', 'gemini-2.5-flash')
+    youtube_api_key = data.get('youtube_api_key', '')
+    llm_api_key = data.get('llm_api_key')
+    
+    # Validate inputs
+    if not channel_inputs:
+        return None, 'At least one channel is required.'
+    
+    if len(channel_inputs) > app.config['MAX_BULK_CHANNELS']:
+        return None, f'At most {app.config["MAX_BULK_CHANNELS"]} channels can be analyzed at once.'
+    
+    if not youtube_api_key or not youtube_api_key.strip():
+        return None, 'YouTube API key is required.'
+    
+    if not llm_api_key or not llm_api_key.strip():
+        return None, 'LLM API key is required.'
+    
+    if num_videos < 1 or num_videos * len(channel_inputs) > app.config['MAX_VIDEOS_PER_ANALYSIS']:
+        return None, (f'Number of videos per channel must be between 1 and '
+                      f'{app.config["MAX_VIDEOS_PER_ANALYSIS"] // len(channel_inputs)} for {len(channel_inputs)} channels.')
+    
+    if llm_type not in ['chatgpt', 'gemini']:
+        return None, 'Invalid LLM type. Choose from: chatgpt, gemini'
+    
+    filters, error = parse_video_filters(data)
+    if error:
+        return None, error
+    # A video id only makes sense for one channel
+    filters.pop('stop_at_video_id')
+    
+    with metrics.span('channel_resolution'):
+        channel_ids = resolve_channels_with_key(channel_inputs, youtube_api_key)
+    channels = []
+    unresolved = []
+    for channel_input, channel_id in zip(channel_inputs, channel_ids):
+        if not channel_id:
+            unresolved.append(channel_input)
+        elif channel_id not in {channel['channel_id'] for channel in channels}:
+            channels.append({
+                'channel_input': channel_input,
+                'channel_id': channel_id,
+                'channel_name': make_channel_name(channel_input)
+            })
+    if not channels:
+        return None, 'Could not find any of the channels. Please check the channel names or URLs and YouTube API key.'
+    
+    playlists = get_uploads_playlist_ids_with_key([channel['channel_id'] for channel in channels], youtube_api_key)
+    for channel in channels:
+        channel['uploads_playlist_id'] = playlists.get(channel['channel_id'])
+    
+    return {
+        'kind': 'bulk',
+        'channels': channels,
+        'unresolved': unresolved,
+        'num_videos': num_videos,
+        'filters': filters,
+        'llm_type': llm_type,
+        'gemini_model': gemini_model,
+        'llm_model': get_model_name(llm_type, gemini_model),
+        'youtube_api_key': youtube_api_key,
+        'llm_api_key': llm_api_key,
+        'fallback_api_key': data.get('fallback_api_key', '')
+    }, None
+
+def prepare_comment_analysis(data):
+    """Validate a comment analysis request: a channel (as for /analyze) or a list of video_ids.
+
+    Returns (settings, None) on success or (None, error_message).
+    """
+    video_ids = data.get('video_ids') or []
+    if isinstance(video_ids, str):
+        video_ids = re.split(r'[\s,]+', video_ids)
+    video_ids = list(dict.fromkeys(video_id.strip() for video_id in video_ids if video_id and video_id.strip()))
+    sample = data.get('sample', 'top')
+    order = data.get('order', 'relevance')
+    max_comments = int(data.get('max_comments', app.config['COMMENT_MAX_SCANNED']))
+    sample_size = int(data.get('sample_size', app.config['COMMENT_SAMPLE_SIZE']))
+    
+    if sample not in SAMPLING_MODES:
+        return None, f'Invalid sample. Choose from: {", ".join(SAMPLING_MODES)}'
+    
+    if order not in ('relevance', 'time'):
+        return None, 'Invalid order. Choose from: relevance, time'
+    
+    if max_comments < 1 or max_comments > app.config['COMMENT_MAX_SCANNED']:
+        return None, f'Comments read per video must be between 1 and {app.config["COMMENT_MAX_SCANNED"]}.'
+    
+    if sample_size < 1:
+        return None, 'Sample size must be at least 1.'
+    
+    if video_ids:
+        youtube_api_key = data.get('youtube_api_key') or ''
+        llm_api_key = data.get('llm_api_key') or ''
+        if len(video_ids) > app.config['MAX_COMMENT_VIDEOS']:
+            return None, f'At most {app.config["MAX_COMMENT_VIDEOS"]} videos can be analyzed at once.'
+        if not isinstance(youtube_api_key, str) or not youtube_api_key.strip():
+            return None, 'YouTube API key is required.'
+        if not isinstance(llm_api_key, str) or not llm_api_key.strip():
+            return None, 'LLM API key is required.'
+        if data.get('llm_type') not in ['chatgpt', 'gemini']:
+            return None, 'Invalid LLM type. Choose from: chatgpt, gemini'
+        gemini_model = data.get('gemini_model', 'gemini-2.5-flash')
+        settings = {
+            'channel_id': None,
+            'channel_name': data.get('channel_name') or 'videos',
+            'llm_type': data['llm_type'],
+            'gemini_model': gemini_model,
+            'llm_model': get_model_name(data['llm_type'], gemini_model),
+            'youtube_api_key': youtube_api_key.strip(),
+            'llm_api_key': llm_api_key,
+            'fallback_api_key': data.get('fallback_api_key') or ''
+        }
+    else:
+        if int(data.get('num_videos', app.config['DEFAULT_VIDEOS_COUNT'])) > app.config['MAX_COMMENT_VIDEOS']:
+            return None, f'At most {app.config["MAX_COMMENT_VIDEOS"]} videos can be analyzed at once.'
+        settings, error = prepare_channel_analysis(data)
+        if error:
+            return None, error
+    
+    settings.update({
+        'kind': 'comments',
+        'video_ids': video_ids,
+        'sample': sample,
+        # 'all' analyzes every comment read
+        'sample_size': max_comments if sample == 'all' else min(sample_size, max_comments),
+        'max_comments': max_comments,
+        'order': order
+    })
+    return settings, None
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    try:
+        settings, error = prepare_channel_analysis(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Analyze each video title using the provided LLM API key
-        results = []
-        for title in video_titles:
-            analysis = analyze_sentiment_with_llm(title, llm_type, llm_api_key, gemini_model)
-            if analysis:
-                results.append({
-                    'video_title': title,
-                    'sentiment': analysis.get('sentiment', ''),
-                    'emotion': analysis.get('emotion', ''),
-                    'frame': analysis.get('frame', ''),
-                    'ideology_score': analysis.get('ideology_score', ''),
-                    'topics': ', '.join(analysis.get('topics', [])),
-                    'language_mix': analysis.get('language_mix', ''),
-                    'agency_subject': analysis.get('agency_subject', '')
-                })
+        # Stream video titles page by page; analysis starts while later pages load
+        videos = []
+        video_titles = iter_titles_of(iter_videos_with_key(
+            settings['channel_id'], settings['youtube_api_key'], settings['num_videos'], **settings['filters']
+        ), videos)
+        
+        # Analyze the video titles concurrently using the provided LLM API key
+        results, failed = analyze_titles_with_llm(
+            video_titles, settings['llm_type'],
+            get_llm_keys(settings['llm_type'], settings['llm_api_key'], settings['fallback_api_key']),
+            settings['gemini_model'], on_result=lambda position, title, result, error: store_analysis(
+                settings, videos[position], title, result, error, 'analyze'
+            )
+        )
+        if not results and not failed:
+            return jsonify({'error': 'Could not retrieve video titles. Please check the channel and YouTube API key.'}), 400
         
         return jsonify({
             'success': True,
             'results': results,
             'total_analyzed': len(results),
-            'channel_name': channel_name,
-            'llm_model': gemini_model if llm_type == 'gemini' else llm_type
+            'failed': failed,
+            'total_failed': len(failed),
+            'channel_name': settings['channel_name'],
+            'llm_model': settings['llm_model']
         })
         
     except Exception as e:
@@ -260,123 +1448,813 @@ def analyze():
 def analyze_csv():
     """Analyze video titles from uploaded CSV file"""
     try:
-        if 'csv_file' not in request.files:
-            return jsonify({'error': 'No CSV file uploaded.'}), 400
-        
-        csv_file = request.files['csv_file']
-        if csv_file.filename == '':
-            return jsonify({'error': 'No CSV file selected.'}), 400
-        
-        llm_type = request.form.get('llm_type')
-        gemini_model = request.form.get('gemini_model', 'gemini-2.5-flash')
-        llm_api_key = request.form.get('llm_api_key')
-        
-        # Validate inputs
-        if not llm_api_key or not llm_api_key.strip():
-            return jsonify({'error': 'AI Model API key is required.'}), 400
-            
-        if llm_type not in ['chatgpt', 'gemini']:
-            return jsonify({'error': 'Invalid LLM type. Choose from: chatgpt, gemini'}), 400
+        settings, video_titles, error = prepare_csv_analysis(request.form, request.files)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Read CSV file
-        import pandas as pd
-        from io import StringIO
-        
-        try:
-            # Read the CSV content
-            csv_content = csv_file.read().decode('utf-8')
-            df = pd.read_csv(StringIO(csv_content))
-            
-            # Find the video title column
-            title_column = None
-            for col in df.columns:
-                if 'title' in col.lower() or 'video' in col.lower():
-                    title_column = col
-                    break
-            
-            if title_column is None:
-                return jsonify({'error': 'No video title column found. Please ensure your CSV has a column named "video_title" or "title".'}), 400
-            
-            video_titles = df[title_column].dropna().tolist()
-            # Clean video titles by removing newlines and extra whitespace
-            video_titles = [re.sub(r'\s+', ' ', title.strip().replace('\n', '').replace('\r', ' ')) for title in video_titles if title]
-            print(f"video_titles: {video_titles}")
-            if not video_titles:
-                return jsonify({'error': 'No video titles found in the CSV file.'}), 400
-                
-        except Exception as e:
-            return jsonify({'error': f'Error reading CSV file: {str(e)}'}), 400
-        
-        # Analyze each video title
-        results = []
-        for title in video_titles:
-            analysis = analyze_sentiment_with_llm(title, llm_type, llm_api_key, gemini_model)
-            if analysis:
-                results.append({
-                    'video_title': title,
-                    'sentiment': analysis.get('sentiment', ''),
-                    'emotion': analysis.get('emotion', ''),
-                    'frame': analysis.get('frame', ''),
-                    'ideology_score': analysis.get('ideology_score', ''),
-                    'topics': ', '.join(analysis.get('topics', [])),
-                    'language_mix': analysis.get('language_mix', ''),
-                    'agency_subject': analysis.get('agency_subject', '')
-                })
+        # Analyze the video titles concurrently
+        results, failed = analyze_titles_with_llm(
+            video_titles, settings['llm_type'],
+            get_llm_keys(settings['llm_type'], settings['llm_api_key'], settings['fallback_api_key']),
+            settings['gemini_model'], on_result=lambda position, title, result, error: store_analysis(
+                settings, None, title, result, error, 'analyze_csv'
+            )
+        )
         
         return jsonify({
             'success': True,
             'results': results,
             'total_analyzed': len(results),
-            'channel_name': csv_file.filename.replace('.csv', ''),
-            'llm_model': gemini_model if llm_type == 'gemini' else llm_type
+            'failed': failed,
+            'total_failed': len(failed),
+            'channel_name': settings['channel_name'],
+            'llm_model': settings['llm_model']
         })
         
     except Exception as e:
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
 
-@app.route('/download_csv', methods=['POST'])
-def download_csv():
+@app.route('/analyze_bulk', methods=['POST'])
+def analyze_bulk():
+    """Analyze the latest uploads of many channels in one shared pipeline, as a background job.
+
+    Accepts a JSON body with a channels list, or a form upload with a
+    channels_file CSV, plus the /analyze settings. Channels are resolved
+    before the job id is returned; progress and results come from /jobs.
+    """
     try:
-        data = request.get_json()
-        results = data.get('results', [])
-        channel_name = data.get('channel_name', 'unknown_channel')
-        llm_model = data.get('llm_model', 'unknown_model')
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'Video Title', 'Sentiment', 'Emotion', 'Frame', 
-            'Ideology Score', 'Topics', 'Language Mix', 'Agency Subject'
-        ])
+        if request.files:
+            settings, error = prepare_bulk_analysis(request.form, request.files)
+        else:
+            settings, error = prepare_bulk_analysis(request.get_json() or {}, {})
+        if error:
+            return jsonify({'error': error}), 400
+        return start_job(settings)
         
-        # Write data
-        for result in results:
-            writer.writerow([
-                result['video_title'],
-                result['sentiment'],
-                result['emotion'],
-                result['frame'],
-                result['ideology_score'],
-                result['topics'],
-                result['language_mix'],
-                result['agency_subject']
-            ])
+    except Exception as e:
+        return jsonify({'error': f'An error occurred: {str(e)}'}), 500
+
+@app.route('/analyze_comments', methods=['POST'])
+def analyze_comments():
+    """Audience sentiment from the comments of a channel's latest uploads or of given videos, as a background job.
+
+    Comments of several videos are read concurrently, sampled per video
+    (top engagement, stratified by engagement, or all) and classified in
+    batches; only per-video sentiment and emotion distributions are kept.
+    Each video is one job result, recorded once its comments are counted.
+    """
+    try:
+        settings, error = prepare_comment_analysis(request.get_json(silent=True) or {})
+        if error:
+            return jsonify({'error': error}), 400
+        return start_job(settings)
         
-        output.seek(0)
+    except Exception as e:
+        return jsonify({'error': f'An error occurred: {str(e)}'}), 500
+
+def stream_job_titles(job_id, params, secrets, seen):
+    """Fetch a channel job's videos, recording each one (and appending it to seen) before it is analyzed"""
+    videos = iter_videos_with_key(
+        params['channel_id'], secrets['youtube_api_key'], params['num_videos'], **params['filters']
+    )
+    for position, video in enumerate(videos):
+        job_manager.add_titles(job_id, [video], start=position)
+        seen.append(video)
+        yield video['video_title']
+    job_manager.mark_titles_complete(job_id)
+
+def run_analysis_job(job_id, params, secrets, cancel_event):
+    """Job runner: analyze every title of a job that has no result yet"""
+    job = job_manager.get(job_id, include_results=False)
+    if job['titles_complete']:
+        pending = job_manager.pending_titles(job_id)
+        positions = [position for position, _, _, _ in pending]
+        video_titles = [title for _, title, _, _ in pending]
+        videos = [{'video_id': video_id, 'published_at': published_at} for _, _, video_id, published_at in pending]
+    else:
+        # Titles were still being fetched when the job stopped, so fetch them again;
+        # titles analyzed before the interruption come straight from the result cache
+        job_manager.reset(job_id)
+        positions = None
+        videos = []
+        video_titles = stream_job_titles(job_id, params, secrets, videos)
+
+    def on_result(index, title, result, error):
+        position = positions[index] if positions is not None else index
+        job_manager.record_result(job_id, position, result, error)
+        store_analysis(params, videos[index], title, result, error, 'job')
+
+    analyze_titles_with_llm(
+        video_titles, params['llm_type'],
+        get_llm_keys(params['llm_type'], secrets['llm_api_key'], secrets.get('fallback_api_key')),
+        params['gemini_model'], on_result=on_result, cancel_event=cancel_event
+    )
+    if not cancel_event.is_set() and job_manager.get(job_id, include_results=False)['total'] == 0:
+        raise ValueError('Could not retrieve video titles. Please check the channel and YouTube API key.')
+
+def run_bulk_job(job_id, params, secrets, cancel_event):
+    """Job runner for /analyze_bulk: every channel's uploads analyzed in one stream, then summarized.
+
+    Which channel a title belongs to is only known while the streams are
+    read, so every run fetches the titles again; titles analyzed before an
+    interruption come straight from the result cache.
+    """
+    job_manager.reset(job_id)
+    channels = [dict(channel) for channel in params['channels']]
+    
+    def channel_videos(channel):
+        try:
+            yield from iter_channel_videos_with_key(
+                channel['channel_id'], secrets['youtube_api_key'], params['num_videos'],
+                uploads_playlist_id=channel['uploads_playlist_id'], **params['filters']
+            )
+        except Exception as e:
+            logger.error("Error getting video titles of %s: %s", channel['channel_id'], e)
+            channel['error'] = str(e)
+    
+    # position -> channel index and video; filled in as the merged stream is read
+    videos = []
+    outcomes = {}
+    # Titles first analyzed for each channel, to count headlines shared across channels
+    title_channels = {}
+    shared = [0]
+    lock = threading.Lock()
+    
+    def video_titles():
+        # Every channel's uploads are fetched concurrently and merged into one stream, so
+        # duplicate titles across channels are analyzed once under one set of LLM limits
+        streams = merge_streams(
+            [channel_videos(channel) for channel in channels],
+            app.config['YOUTUBE_MAX_CONCURRENCY'], app.config['YOUTUBE_PREFETCH_VIDEOS']
+        )
+        for index, video in streams:
+            job_manager.add_titles(job_id, [video], start=len(videos))
+            videos.append((index, video))
+            yield video['video_title']
+        job_manager.mark_titles_complete(job_id)
+    
+    def on_result(position, title, result, error):
+        index, video = videos[position]
+        channel = channels[index]
+        if result is not None:
+            result = dict(result, channel_id=channel['channel_id'], channel_name=channel['channel_name'])
+            with lock:
+                if result.get('duplicate_of') and title_channels.get(result['duplicate_of']) != index:
+                    shared[0] += 1
+                title_channels.setdefault(title, index)
+        outcomes[position] = (result, error)
+        job_manager.record_result(job_id, position, result, error)
+        store_analysis(dict(channel, llm_model=params['llm_model']), video, title, result, error, 'bulk')
+    
+    analyze_titles_with_llm(
+        video_titles(), params['llm_type'],
+        get_llm_keys(params['llm_type'], secrets['llm_api_key'], secrets.get('fallback_api_key')),
+        params['gemini_model'], on_result=on_result, cancel_event=cancel_event
+    )
+    if not outcomes and not cancel_event.is_set():
+        raise ValueError('Could not retrieve video titles. Please check the channels and YouTube API key.')
+    
+    results = []
+    per_channel = [([], 0) for _ in channels]
+    for position in sorted(outcomes):
+        result, _ = outcomes[position]
+        index, _ = videos[position]
+        analyzed, failed = per_channel[index]
+        if result is not None:
+            results.append(result)
+            analyzed.append(result)
+        else:
+            per_channel[index] = (analyzed, failed + 1)
+    
+    channel_summaries = {channel['channel_name']: summarize(analyzed)
+                         for channel, (analyzed, _) in zip(channels, per_channel)}
+    job_manager.set_summary(job_id, {
+        'channels': [
+            {
+                'channel_input': channel['channel_input'],
+                'channel_id': channel['channel_id'],
+                'channel_name': channel['channel_name'],
+                'total_analyzed': len(analyzed),
+                'total_failed': failed,
+                'error': channel.get('error'),
+                'summary': channel_summaries[channel['channel_name']]
+            }
+            for channel, (analyzed, failed) in zip(channels, per_channel)
+        ],
+        'unresolved': params['unresolved'],
+        'summary': {
+            **summarize(results),
+            **compare_channels(channel_summaries),
+            'cross_channel_duplicates': shared[0]
+        },
+        'llm_model': params['llm_model']
+    })
+
+def run_comment_job(job_id, params, secrets, cancel_event):
+    """Job runner for /analyze_comments: one result per video, overall distributions in the summary.
+
+    Comment analyses are not cached, so every run starts over.
+    """
+    job_manager.reset(job_id)
+    if params['video_ids']:
+        videos = [{'video_id': video_id} for video_id in params['video_ids']]
+    else:
+        videos = iter_videos_with_key(
+            params['channel_id'], secrets['youtube_api_key'], params['num_videos'], **params['filters']
+        )
+    positions = {}
+    
+    def on_video_done(row):
+        job_manager.record_result(job_id, positions[row['video_id']], None if row.get('error') else row, row.get('error'))
+    
+    def video_comments(position, video):
+        positions[video['video_id']] = position
+        job_manager.add_titles(job_id, [dict(video, video_title=video.get('video_title') or video['video_id'])],
+                               start=position)
+        return iter_sampled_comments_with_key(video, secrets['youtube_api_key'], params, aggregator)
+    
+    aggregator = CommentAggregator(on_video_done)
+    comments = (comment for _, comment in merge_streams(
+        (video_comments(position, video) for position, video in enumerate(videos)),
+        app.config['YOUTUBE_MAX_CONCURRENCY'],
+        app.config['COMMENT_BATCH_SIZE'] * app.config['LLM_MAX_WORKERS']
+    ))
+    analyze_comments_with_llm(
+        comments, params['llm_type'],
+        get_llm_keys(params['llm_type'], secrets['llm_api_key'], secrets.get('fallback_api_key')),
+        params['gemini_model'], aggregator, cancel_event
+    )
+    summary = aggregator.summary()
+    if not summary['videos'] and not cancel_event.is_set():
+        raise ValueError('Could not retrieve videos. Please check the channel and YouTube API key.')
+    if not cancel_event.is_set():
+        job_manager.mark_titles_complete(job_id)
+    job_manager.set_summary(job_id, {
+        'overall': summary['overall'],
+        'sample': params['sample'],
+        'sample_size': params['sample_size'],
+        'channel_name': params['channel_name'],
+        'llm_model': params['llm_model']
+    })
+
+# Job kind -> runner; channel and CSV jobs go to run_analysis_job
+JOB_RUNNERS = {
+    'bulk': run_bulk_job,
+    'comments': run_comment_job
+}
+
+def run_job(job_id, params, secrets, cancel_event):
+    """Job runner: hand a job to the runner of its kind"""
+    JOB_RUNNERS.get(params['kind'], run_analysis_job)(job_id, params, secrets, cancel_event)
+
+job_manager = JobManager(app.config['JOBS_DB_PATH'], run_job, max_workers=app.config['JOB_WORKERS'])
+
+def start_job(settings, video_titles=None):
+    """Create and queue a job from prepared settings; API keys are kept out of the stored params"""
+    secrets = {key: settings.pop(key) for key in SECRET_SETTINGS if key in settings}
+    job_id = job_manager.create(settings['kind'], settings, video_titles)
+    job_manager.start(job_id, secrets)
+    return jsonify({'success': True, **job_manager.get(job_id, include_results=False)}), 202
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Start an analysis in the background and return its job id right away.
+
+    Accepts the /analyze JSON body, or the /analyze_csv form upload.
+    """
+    try:
+        if request.files:
+            settings, video_titles, error = prepare_csv_analysis(request.form, request.files)
+        else:
+            settings, error = prepare_channel_analysis(request.get_json())
+            video_titles = None
+        if error:
+            return jsonify({'error': error}), 400
+        return start_job(settings, video_titles)
         
-        # Create response with CSV file
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'{channel_name}_sentiment_analysis_{llm_model}.csv'
+    except Exception as e:
+        return jsonify({'error': f'An error occurred: {str(e)}'}), 500
+
+def query_int(name, default):
+    """Non-negative integer query parameter; raises ValueError naming the parameter when it is not one"""
+    value = request.args.get(name, '')
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a whole number.') from None
+    if number < 0:
+        raise ValueError(f'{name} must not be negative.')
+    return number
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Most recent jobs without their results"""
+    try:
+        limit = query_int('limit', 50)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'jobs': job_manager.list(limit)})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job progress plus results recorded after the `since` sequence number"""
+    try:
+        since = query_int('since', 0)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    job = job_manager.get(job_id, since=since)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify(job)
+
+# Each open progress stream holds a server thread for the whole job, so only SSE_MAX_STREAMS may be open at once
+event_streams = threading.BoundedSemaphore(max(1, app.config['SSE_MAX_STREAMS']))
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events stream of job progress and newly finished titles.
+
+    Beyond SSE_MAX_STREAMS open streams the request gets a 503 and the
+    client is expected to poll GET /jobs/<job_id> instead.
+    """
+    if job_manager.get(job_id, include_results=False) is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    try:
+        since = query_int('since', 0)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not event_streams.acquire(blocking=False):
+        metrics.inc('sse_streams_refused_total')
+        response = jsonify({
+            'error': 'Too many open progress streams. Poll the job instead.',
+            'poll': f'/jobs/{job_id}?since={since}'
+        })
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    def stream(since):
+        last_update = None
+        while True:
+            job = job_manager.get(job_id, since=since)
+            if job['updated_at'] != last_update or job['results'] or job['failed']:
+                last_update = job['updated_at']
+                since = job['next_since']
+                yield f"data: {json.dumps(job, ensure_ascii=False)}\n\n"
+            else:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+            if job['done']:
+                return
+            time.sleep(app.config['JOB_EVENT_INTERVAL'])
+    
+    response = Response(stream(since), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the response, including when the client goes away
+    response.call_on_close(event_streams.release)
+    return response
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Stop a job; titles already being analyzed still finish"""
+    if job_manager.get(job_id, include_results=False) is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    if not job_manager.cancel(job_id):
+        return jsonify({'error': 'Job is not running.'}), 400
+    return jsonify({'success': True})
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    """Continue an interrupted, cancelled or failed job; API keys must be sent again"""
+    job = job_manager.get(job_id, include_results=False)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    if job['status'] not in ('interrupted', 'cancelled', 'failed'):
+        return jsonify({'error': f'Job is {job["status"]} and cannot be resumed.'}), 400
+    
+    data = request.get_json(silent=True) or {}
+    secrets = {key: data.get(key, '') for key in SECRET_SETTINGS}
+    if not secrets['llm_api_key'].strip():
+        return jsonify({'error': 'LLM API key is required.'}), 400
+    # Bulk and comment jobs always fetch their titles again
+    fetches_titles = job['kind'] in ('bulk', 'comments') or (job['kind'] == 'channel' and not job['titles_complete'])
+    if fetches_titles and not secrets['youtube_api_key'].strip():
+        return jsonify({'error': 'YouTube API key is required.'}), 400
+    
+    job_manager.start(job_id, secrets)
+    return jsonify({'success': True, **job_manager.get(job_id, include_results=False)}), 202
+
+def admin_authorized(require_token=False):
+    """Admin endpoints require the X-Admin-Token header when ADMIN_TOKEN is configured.
+
+    Endpoints that change server state or spend the server's own API keys
+    pass require_token and are refused outright while no ADMIN_TOKEN is set.
+    """
+    token = app.config['ADMIN_TOKEN']
+    if not token:
+        return not require_token
+    return request.headers.get('X-Admin-Token') == token
+
+# Returned by endpoints that need ADMIN_TOKEN to be set
+ADMIN_TOKEN_REQUIRED = 'Invalid admin token. This endpoint is disabled until ADMIN_TOKEN is set.'
+
+# Watched channels, their high-water marks and every analysis made by the app
+result_store = ResultStore(app.config['STORE_PATH'])
+
+def store_analysis(settings, video, title, result, error, source):
+    """Keep one analysis in the result store under the model that produced it.
+
+    CSV titles have no channel or video id of their own.
+    """
+    video = video or {}
+    try:
+        result_store.add_result(
+            settings.get('channel_id') or f"csv:{settings['channel_name']}",
+            video.get('video_id') or title_video_id(title),
+            title, video.get('published_at'), (result or {}).get('model') or settings['llm_model'], result, error,
+            prompt_version=(result or {}).get('prompt_version') or get_prompt_version(),
+            channel_name=settings['channel_name'], source=source
+        )
+    except Exception as e:
+        logger.error("Error storing analysis: %s", e)
+
+def get_server_llm_key(llm_type):
+    """API key (pool) from the server configuration, used for scheduled runs that have no user attached"""
+    return app.config['OPENAI_API_KEY'] if llm_type == 'chatgpt' else app.config['GOOGLE_AI_API_KEY']
+
+def get_server_llm_keys(llm_type):
+    """Server key pools of both providers, so scheduled runs can fail over too"""
+    other = 'gemini' if llm_type == 'chatgpt' else 'chatgpt'
+    return get_llm_keys(llm_type, get_server_llm_key(llm_type), get_server_llm_key(other))
+
+def poll_watched_channel(channel):
+    """Analyze the uploads of a watched channel published since its high-water mark.
+
+    Only videos newer than the last one analyzed are fetched (the first poll
+    takes the newest WATCH_INITIAL_VIDEOS), plus earlier failures that have
+    been tried fewer than WATCH_MAX_ATTEMPTS times. Results go to the result store; the mark advances once the new
+    videos have been analyzed.
+    """
+    youtube_api_key = app.config['YOUTUBE_API_KEY']
+    llm_api_key = get_server_llm_key(channel['llm_type'])
+    if not llm_api_key:
+        raise ValueError(f"No server API key configured for {channel['llm_type']}")
+    
+    new_videos = list(iter_channel_videos_with_key(
+        channel['channel_id'], youtube_api_key,
+        max_results=None if channel['last_video_id'] else app.config['WATCH_INITIAL_VIDEOS'],
+        published_after=channel['last_published_at'],
+        stop_at_video_id=channel['last_video_id']
+    ))
+    retried = result_store.failed_videos(channel['channel_id'], max_attempts=app.config['WATCH_MAX_ATTEMPTS'])
+    known = {video['video_id'] for video in new_videos}
+    videos = new_videos + [video for video in retried if video['video_id'] not in known]
+    
+    model = get_model_name(channel['llm_type'], channel['gemini_model'])
+    
+    settings = {'channel_id': channel['channel_id'], 'channel_name': channel['channel_name'], 'llm_model': model}
+    results, failed = analyze_titles_with_llm(
+        [video['video_title'] for video in videos], channel['llm_type'],
+        get_server_llm_keys(channel['llm_type']), channel['gemini_model'],
+        on_result=lambda position, title, result, error: store_analysis(
+            settings, videos[position], title, result, error, 'watch'
         )
+    )
+    if new_videos:
+        result_store.set_high_water_mark(channel['channel_id'], new_videos[0]['video_id'], new_videos[0]['published_at'])
+    return {'new_videos': len(new_videos), 'retried': len(retried), 'analyzed': len(results), 'failed': len(failed)}
+
+watch_scheduler = WatchScheduler(result_store, poll_watched_channel, tick_seconds=app.config['WATCH_TICK_SECONDS'])
+if app.config['WATCH_ENABLED']:
+    watch_scheduler.start()
+
+@app.route('/watchlist', methods=['GET'])
+def list_watchlist():
+    """Watched channels with their high-water marks and last poll outcome"""
+    if not admin_authorized():
+        return jsonify({'error': 'Invalid admin token.'}), 403
+    channels = result_store.list_channels()
+    for channel in channels:
+        channel['last_run'] = watch_scheduler.last_runs.get(channel['channel_id'])
+    return jsonify({'scheduler_running': watch_scheduler.running, 'channels': channels})
+
+@app.route('/watchlist', methods=['POST'])
+def add_to_watchlist():
+    """Watch a channel: {"channel_input", "llm_type", "gemini_model", "interval_minutes"}"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    data = request.get_json(silent=True) or {}
+    channel_input = (data.get('channel_input') or '').strip()
+    llm_type = data.get('llm_type', 'gemini')
+    gemini_model = data.get('gemini_model', 'gemini-2.5-flash')
+    if not channel_input:
+        return jsonify({'error': 'Channel input is required.'}), 400
+    if llm_type not in ['chatgpt', 'gemini']:
+        return jsonify({'error': 'Invalid LLM type. Choose from: chatgpt, gemini'}), 400
+    if not get_server_llm_key(llm_type):
+        return jsonify({'error': f'No server API key configured for {llm_type}.'}), 400
+    try:
+        interval_seconds = int(float(data.get('interval_minutes', app.config['WATCH_INTERVAL_SECONDS'] / 60)) * 60)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'interval_minutes must be a number.'}), 400
+    if interval_seconds < app.config['WATCH_MIN_INTERVAL_SECONDS']:
+        return jsonify({'error': f'interval_minutes must be at least {app.config["WATCH_MIN_INTERVAL_SECONDS"] // 60}.'}), 400
+    
+    channel_id = extract_channel_id_with_key(channel_input, app.config['YOUTUBE_API_KEY'])
+    if not channel_id:
+        return jsonify({'error': 'Could not find channel. Please check the channel name or URL.'}), 400
+    channel_name = make_channel_name(channel_input)
+    channel = result_store.add_channel(channel_id, channel_input, channel_name, llm_type, gemini_model, interval_seconds)
+    return jsonify({'success': True, 'channel': channel}), 201
+
+@app.route('/watchlist/<channel_id>', methods=['DELETE'])
+def remove_from_watchlist(channel_id):
+    """Stop watching a channel; stored results are kept"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    if not result_store.remove_channel(channel_id):
+        return jsonify({'error': 'Channel is not on the watchlist.'}), 404
+    return jsonify({'success': True})
+
+@app.route('/watchlist/<channel_id>/poll', methods=['POST'])
+def poll_watchlist_channel(channel_id):
+    """Check a watched channel for new uploads now"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    channel = result_store.get_channel(channel_id)
+    if channel is None:
+        return jsonify({'error': 'Channel is not on the watchlist.'}), 404
+    if watch_scheduler.running:
+        watch_scheduler.trigger(channel_id)
+        return jsonify({'success': True, 'scheduled': True}), 202
+    summary = watch_scheduler.run_channel(channel)
+    if 'error' in summary:
+        return jsonify(summary), 500
+    return jsonify({'success': True, **summary})
+
+@app.route('/watchlist/<channel_id>/results', methods=['GET'])
+def watchlist_results(channel_id):
+    """Stored analyses of a watched channel; page with ?since=<last id>"""
+    if not admin_authorized():
+        return jsonify({'error': 'Invalid admin token.'}), 403
+    try:
+        since = query_int('since', 0)
+        limit = min(query_int('limit', 1000), 10000)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = result_store.results(channel_id, since=since, limit=limit)
+    return jsonify({'results': rows, 'next_since': rows[-1]['id'] if rows else since})
+
+def parse_store_filters(args):
+    """Common filters of the /store endpoints: channel_id, model, prompt_version and from/to dates"""
+    start = parse_timestamp(args.get('from') or None)
+    end = parse_timestamp(args.get('to') or None)
+    return {
+        'channel_id': args.get('channel_id') or None,
+        'model': args.get('model') or None,
+        'prompt_version': args.get('prompt_version') or None,
+        'start': start.timestamp() if start else None,
+        'end': end.timestamp() if end else None
+    }
+
+@app.route('/store', methods=['GET'])
+def store_summary():
+    """Stored analyses per source, model and prompt version"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    return jsonify({'prompt_version': get_prompt_version(), **result_store.summary()})
+
+@app.route('/store/prompt_versions', methods=['GET'])
+def store_prompt_versions():
+    """Every prompt version seen so far with its prompt texts and number of stored analyses"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    return jsonify({'current': get_prompt_version(), 'versions': result_store.prompt_versions()})
+
+@app.route('/store/results', methods=['GET'])
+def store_results():
+    """Stored analyses matching the filters; page with ?since=<last id>"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    try:
+        filters = parse_store_filters(request.args)
+        since = int(request.args.get('since', 0))
+        limit = min(int(request.args.get('limit', 1000)), 10000)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = result_store.results(since=since, limit=limit, **filters)
+    return jsonify({'results': rows, 'next_since': rows[-1]['id'] if rows else since})
+
+@app.route('/store/aggregate', methods=['GET'])
+def store_aggregate():
+    """Time-bucketed aggregate of one field per channel, e.g. ?field=ideology_score&bucket=week"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    try:
+        filters = parse_store_filters(request.args)
+        rows = result_store.aggregate(request.args.get('field', 'ideology_score'),
+                                      request.args.get('bucket', 'week'), **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'rows': rows})
+
+@app.route('/store/topics', methods=['GET'])
+def store_topics():
+    """Most frequent topics, optionally per time bucket (?bucket=week&limit=20)"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    try:
+        filters = parse_store_filters(request.args)
+        limit = min(int(request.args.get('limit', 50)), 1000)
+        rows = result_store.topic_counts(limit=limit, bucket=request.args.get('bucket') or None, **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'rows': rows})
+
+@app.route('/admin/cache', methods=['GET'])
+def cache_stats():
+    """Report result cache size and hit/miss counters"""
+    if not admin_authorized():
+        return jsonify({'error': 'Invalid admin token.'}), 403
+    if result_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **result_cache.stats(), 'channels': channel_cache.stats()})
+
+@app.route('/admin/cache/purge', methods=['POST'])
+def purge_cache():
+    """Empty the result cache, or only its expired entries with {"expired_only": true}"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    if result_cache is None:
+        return jsonify({'error': 'Result cache is disabled.'}), 400
+    data = request.get_json(silent=True) or {}
+    removed = result_cache.purge(expired_only=bool(data.get('expired_only', False)))
+    if data.get('channels'):
+        channel_cache.purge()
+    return jsonify({'success': True, 'removed': removed, **result_cache.stats(), 'channels': channel_cache.stats()})
+
+@app.route('/admin/quota', methods=['GET'])
+def quota_stats():
+    """Report YouTube quota units used today per API key"""
+    if not admin_authorized():
+        return jsonify({'error': 'Invalid admin token.'}), 403
+    return jsonify(youtube_quota.stats())
+
+@app.route('/admin/ratelimits', methods=['GET'])
+def rate_limit_stats():
+    """Report throttling, retries and time lost to rate limits per provider and API key"""
+    if not admin_authorized():
+        return jsonify({'error': 'Invalid admin token.'}), 403
+    return jsonify(rate_limiters.stats())
+
+@app.route('/admin/llm_router', methods=['GET'])
+def llm_router_stats():
+    """Report latency, failures, failovers and hedged requests per model and API key"""
+    if not admin_authorized():
+        return jsonify({'error': 'Invalid admin token.'}), 403
+    return jsonify(llm_router.stats())
+
+@app.route('/admin/preclassifier', methods=['GET'])
+def preclassifier_stats():
+    """Report the local pre-classifier's validation accuracy, coverage and live agreement with the LLM"""
+    if not admin_authorized():
+        return jsonify({'error': 'Invalid admin token.'}), 403
+    return jsonify({'enabled': app.config['PRECLASSIFIER_ENABLED'], **preclassifier.stats()})
+
+@app.route('/admin/preclassifier/train', methods=['POST'])
+def train_preclassifier():
+    """Train the pre-classifier on cached analyses ({"model": ..., "all_prompt_versions": false})"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': ADMIN_TOKEN_REQUIRED}), 403
+    if result_cache is None:
+        return jsonify({'error': 'Result cache is disabled, so there is nothing to train on.'}), 400
+    data = request.get_json(silent=True) or {}
+    prompt_version = None if data.get('all_prompt_versions') else get_prompt_version()
+    entries = result_cache.iter_entries(
+        model=data.get('model') or None, prompt_version=prompt_version,
+        limit=app.config['PRECLASSIFIER_MAX_EXAMPLES']
+    )
+    try:
+        info = preclassifier.train(entries, min_examples=app.config['PRECLASSIFIER_MIN_EXAMPLES'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True, **info})
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of timing spans, LLM usage, cache, quota and rate limiter state"""
+    if not admin_authorized():
+        return jsonify({'error': 'Invalid admin token.'}), 403
+    gauges = []
+    if result_cache is not None:
+        cache = result_cache.stats()
+        gauges.append(('result_cache_entries', {}, cache['entries']))
+        gauges.append(('result_cache_hit_ratio', {}, cache['hit_rate']))
+        channels = channel_cache.stats()
+        lookups = channels['hits'] + channels['misses']
+        gauges.append(('channel_cache_hit_ratio', {}, round(channels['hits'] / lookups, 4) if lookups else 0.0))
+    for key, usage in youtube_quota.stats()['keys'].items():
+        gauges.append(('youtube_quota_units_used', {'key': key}, usage['units_used']))
+    for name, limiter in rate_limiters.stats().items():
+        provider, key = name.split(':', 1)
+        for stat in ('concurrency_limit', 'in_flight', 'throttled', 'retries', 'throttle_delay_seconds'):
+            gauges.append((f'ratelimit_{stat}', {'provider': provider, 'key': key}, limiter[stat]))
+    for name, target in llm_router.stats().items():
+        model, key = name.split(':', 1)
+        for stat in ('failovers', 'hedges', 'hedge_wins', 'cooling_down_seconds'):
+            gauges.append((f'llm_router_{stat}', {'model': model, 'key': key}, target[stat]))
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+def export_response(rows, export_format, channel_name, llm_model):
+    """Stream result rows as a download in one of EXPORT_FORMATS, never holding the whole file"""
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    write = EXPORT_WRITERS[export_format]
+    
+    def generate():
+        with metrics.span('export', format=export_format):
+            yield from write(rows)
+    
+    filename = f'{channel_name}_sentiment_analysis_{llm_model}.{extension}'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/jobs/<job_id>/export', methods=['GET'])
+def export_job(job_id):
+    """Download a job's results, read server-side in title order (?format=csv|jsonl.gz|parquet|arrow)"""
+    job = job_manager.get(job_id, include_results=False)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    export_format = request.args.get('format', 'csv')
+    try:
+        check_export_format(export_format)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return export_response(
+        job_manager.iter_results(job_id), export_format,
+        job['params'].get('channel_name', 'unknown_channel'), job['params'].get('llm_model', 'unknown_model')
+    )
+
+@app.route('/download_csv', methods=['POST'])
+def download_csv():
+    """Export posted results, or a job's stored results when the body names a job_id"""
+    try:
+        data = request.get_json()
+        export_format = data.get('format', 'csv')
+        check_export_format(export_format)
+        job_id = data.get('job_id')
+        if job_id:
+            job = job_manager.get(job_id, include_results=False)
+            if job is None:
+                return jsonify({'error': 'Job not found.'}), 404
+            return export_response(
+                job_manager.iter_results(job_id), export_format,
+                job['params'].get('channel_name', 'unknown_channel'), job['params'].get('llm_model', 'unknown_model')
+            )
         
+        return export_response(
+            data.get('results', []), export_format,
+            data.get('channel_name', 'unknown_channel'), data.get('llm_model', 'unknown_model')
+        )
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Error generating CSV: {str(e)}'}), 500
 
+# Endpoints that accept CSV uploads; their bodies may reach MAX_CONTENT_LENGTH (MAX_CSV_UPLOAD_MB),
+# every other request is held to MAX_REQUEST_BYTES (MAX_UPLOAD_MB)
+CSV_UPLOAD_ENDPOINTS = ('analyze_csv', 'submit_job', 'analyze_bulk')
+
+def request_size_limit():
+    """(bytes, setting name) of the body size limit for the current request"""
+    if request.endpoint in CSV_UPLOAD_ENDPOINTS:
+        return app.config['MAX_CONTENT_LENGTH'], 'MAX_CSV_UPLOAD_MB'
+    return app.config['MAX_REQUEST_BYTES'], 'MAX_UPLOAD_MB'
+
+@app.errorhandler(413)
+def request_too_large(error=None):
+    """Uploads above the request size limit are refused before they are read"""
+    limit, setting = request_size_limit()
+    return jsonify({'error': f'Upload too large. The limit is {limit // (1024 * 1024)} MB ({setting}).'}), 413
+
+@app.before_request
+def check_request_size():
+    # Checked up front because the handlers turn errors raised while parsing a body into 500s
+    limit, _ = request_size_limit()
+    if limit and request.content_length is not None and request.content_length > limit:
+        return request_too_large()
+
+def shutdown(timeout=None):
+    """Stop background work for a graceful exit: the watch scheduler first, then drain the job queue.
+
+    Jobs still running after timeout seconds stop at their next title and can
+    be resumed after the restart (see JobManager.shutdown).
+    """
+    logger.info("Shutting down: waiting up to %ss for running jobs", timeout)
+    watch_scheduler.stop(timeout)
+    job_manager.shutdown(wait=True, timeout=timeout)
+
 if __name__ == '__main__':
+    # Development server; use serve.py (or asgi.py) in production
     app.run(debug=True)
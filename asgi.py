@@ -0,0 +1,33 @@
+"""
+ASGI entry point for uvicorn, hypercorn and similar servers:
+
+    uvicorn asgi:application --workers 1
+
+The Flask views are synchronous. a2wsgi's WSGI adapter runs each request on a
+pool of SERVER_THREADS threads, so a long /analyze call or an open
+/jobs/<id>/events stream holds one of those threads and not the event loop.
+Request bodies are read from the connection as the view consumes them, so
+oversized uploads are refused before they are buffered. The lifespan shutdown
+event drains background jobs like serve.py does.
+"""
+
+import asyncio
+
+from a2wsgi import WSGIMiddleware
+
+from app import app, shutdown
+
+wsgi_application = WSGIMiddleware(app, workers=app.config['SERVER_THREADS'])
+
+async def application(scope, receive, send):
+    if scope['type'] != 'lifespan':
+        await wsgi_application(scope, receive, send)
+        return
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await asyncio.to_thread(shutdown, app.config['SHUTDOWN_TIMEOUT_SECONDS'])
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
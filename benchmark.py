@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the YouTube Sentiment Analyzer
+
+Drives /analyze, /analyze_csv and /download_csv through the Flask test client
+with local stand-ins for the LLM clients and the YouTube Data API, so no API
+keys or quota are needed. For each endpoint and title count it reports
+titles/sec, p50/p99 time until a title's result is ready, peak RSS and the
+number of LLM and YouTube calls per title.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --sizes 10 100 1000 10000 --latency 0.2 --error-rate 0.02 --malformed-rate 0.05
+    python benchmark.py --endpoints analyze_csv --json bench.json
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+
+from parsing import EMOTIONS, FRAMES, SENTIMENTS
+
+ENDPOINTS = ('analyze', 'analyze_csv', 'download_csv')
+
+WORDS = [
+    'modi', 'rahul', 'gandhi', 'election', 'parliament', 'budget', 'farmers', 'protest', 'supreme', 'court',
+    'india', 'pakistan', 'china', 'border', 'cricket', 'world', 'cup', 'economy', 'inflation', 'rally',
+    'delhi', 'mumbai', 'bihar', 'verdict', 'debate', 'opposition', 'minister', 'scheme', 'launch', 'attack',
+    'सरकार', 'चुनाव', 'किसान', 'बजट', 'संसद', 'खबर', 'मोदी', 'राहुल', 'विपक्ष', 'फैसला'
+]
+SUFFIXES = [' | LIVE', ' 🔴', ' (Breaking News)', ' #news', ' | Hindi News']
+
+
+class StubAPIError(Exception):
+    """Transient provider error, retried by the rate limiter like a real 503"""
+
+    def __init__(self, message, status_code=503):
+        super().__init__(message)
+        self.status_code = status_code
+
+class StubMessage:
+    def __init__(self, content):
+        self.content = content
+
+class BenchmarkStats:
+    """Counters shared by the stub clients"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = {'llm_calls': 0, 'llm_errors': 0, 'llm_malformed': 0, 'youtube_calls': 0}
+
+    def add(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+def stub_analysis(title):
+    """Deterministic fake analysis for a title"""
+    seed = int.from_bytes(hashlib.blake2b(title.encode('utf-8'), digest_size=4).digest(), 'big')
+    return {
+        'sentiment': SENTIMENTS[seed % len(SENTIMENTS)],
+        'emotion': EMOTIONS[seed % len(EMOTIONS)],
+        'frame': FRAMES[seed % len(FRAMES)],
+        'ideology_score': seed % 5 - 2,
+        'topics': title.split()[:2],
+        'language_mix': 'Hindi' if re.search(r'[ऀ-ॿ]', title) else 'English',
+        'agency_subject': title.split()[0] if title.split() else 'implied'
+    }
+
+class StubLLM:
+    """Stand-in for ChatGoogleGenerativeAI / OpenAI answering prompt.txt and batch_prompt.txt"""
+
+    BATCH_LINE = re.compile(r'^(\d+)\. (".*")$', re.MULTILINE)
+    SINGLE_TITLE = re.compile(r'^Video Title: "(.*)"$', re.MULTILINE)
+
+    def __init__(self, stats, rng, latency, jitter, error_rate, malformed_rate, chat=True):
+        self.stats = stats
+        self.rng = rng
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.chat = chat
+
+    def invoke(self, prompt):
+        self.stats.add('llm_calls')
+        time.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+        if self.rng.random() < self.error_rate:
+            self.stats.add('llm_errors')
+            raise StubAPIError('503 Service Unavailable (stub)')
+
+        numbered = self.BATCH_LINE.findall(prompt)
+        if numbered:
+            answer = [
+                {'index': int(number), **stub_analysis(json.loads(title))}
+                for number, title in numbered
+            ]
+        else:
+            match = self.SINGLE_TITLE.search(prompt)
+            answer = stub_analysis(match.group(1) if match else '')
+        text = '```json\n' + json.dumps(answer, ensure_ascii=False, indent=2) + '\n```'
+
+        if self.rng.random() < self.malformed_rate:
+            self.stats.add('llm_malformed')
+            # Cut the answer off mid-object, like a response that hit max_tokens
+            text = text[:max(1, len(text) // 2)]
+        return StubMessage(text) if self.chat else text
+
+class StubRequest:
+    def __init__(self, stats, latency, handler):
+        self.stats = stats
+        self.latency = latency
+        self.handler = handler
+
+    def execute(self):
+        self.stats.add('youtube_calls')
+        time.sleep(self.latency)
+        return self.handler()
+
+class StubYouTube:
+    """Stand-in for the YouTube discovery client serving one synthetic channel's uploads"""
+
+    CHANNEL_ID = 'UCbenchmarkbenchmarkbench'
+
+    def __init__(self, stats, titles, latency):
+        self.stats = stats
+        self.titles = titles
+        self.latency = latency
+
+    def search(self):
+        return self
+
+    def channels(self):
+        return self
+
+    def playlistItems(self):
+        return self
+
+    def list(self, **params):
+        if 'playlistId' in params:
+            return StubRequest(self.stats, self.latency, lambda: self._playlist_page(params))
+        if 'q' in params:
+            return StubRequest(self.stats, self.latency, lambda: {
+                'items': [{'id': {'channelId': self.CHANNEL_ID}, 'snippet': {'channelId': self.CHANNEL_ID}}]
+            })
+        return StubRequest(self.stats, self.latency, lambda: {
+            'items': [{
+                'id': self.CHANNEL_ID,
+                'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + self.CHANNEL_ID[2:]}}
+            }]
+        })
+
+    def _playlist_page(self, params):
+        start = int(params.get('pageToken') or 0)
+        end = min(start + params['maxResults'], len(self.titles))
+        items = []
+        for position in range(start, end):
+            # Newest first, one video per minute
+            published_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1700000000 - position * 60))
+            items.append({
+                'snippet': {'title': self.titles[position], 'publishedAt': published_at},
+                'contentDetails': {'videoId': f'video{position}', 'videoPublishedAt': published_at}
+            })
+        response = {'items': items}
+        if end < len(self.titles):
+            response['nextPageToken'] = str(end)
+        return response
+
+class RSSSampler:
+    """Samples resident set size in the background to find a run's peak"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            # No /proc (macOS, Windows): fall back to the process-wide high-water mark
+            try:
+                import resource
+                peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                return peak if sys.platform == 'darwin' else peak * 1024
+            except ImportError:
+                return 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+def make_titles(count, duplicate_rate, rng, prefix):
+    """Synthetic news titles; duplicate_rate of them re-use an earlier title with a tag added"""
+    titles = []
+    for position in range(count):
+        if titles and rng.random() < duplicate_rate:
+            titles.append(rng.choice(titles) + rng.choice(SUFFIXES))
+        else:
+            words = rng.sample(WORDS, rng.randint(5, 10))
+            titles.append(f"{prefix}{position} " + ' '.join(words))
+    return titles
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analysis endpoints against local stub APIs')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help='Title counts to run (default: 10 100 1000 10000)')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--llm', choices=['gemini', 'chatgpt'], default='gemini')
+    parser.add_argument('--gemini-model', default='gemini-2.5-flash')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stub LLM seconds per call')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Uniform +/- jitter on the LLM latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of LLM calls failing with a 503')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='Fraction of LLM answers cut off mid-JSON')
+    parser.add_argument('--youtube-latency', type=float, default=0.02, help='Stub YouTube seconds per call')
+    parser.add_argument('--duplicate-rate', type=float, default=0.05, help='Fraction of near-duplicate titles')
+    parser.add_argument('--rate-limits', action='store_true',
+                        help='Keep the configured per-minute rate limits (off by default so runs measure the code)')
+    parser.add_argument('--cache', action='store_true', help='Keep the result cache enabled')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help="Show the application's debug log")
+    args = parser.parse_args()
+
+    # Keep the benchmark's databases away from the real ones; must happen before app is imported
+    workdir = tempfile.mkdtemp(prefix='yt-sentiment-bench-')
+    os.environ['CACHE_PATH'] = os.path.join(workdir, 'cache.db')
+    os.environ['JOBS_DB_PATH'] = os.path.join(workdir, 'jobs.db')
+    os.environ['STORE_PATH'] = os.path.join(workdir, 'results.db')
+    os.environ['CACHE_ENABLED'] = 'True' if args.cache else 'False'
+    os.environ['LOG_LEVEL'] = 'DEBUG' if args.verbose else 'CRITICAL'
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    import app as app_module
+    from quota import QuotaTracker
+    from ratelimit import RateLimiterRegistry
+
+    stats = BenchmarkStats()
+    rng = random.Random(args.seed)
+    channel = StubYouTube(stats, [], args.youtube_latency)
+    llm = StubLLM(stats, rng, args.latency, args.jitter, args.error_rate, args.malformed_rate,
+                  chat=args.llm == 'gemini')
+
+    # Swap the real clients for the stubs
+    app_module.get_llm_client = lambda *a, **k: llm
+    app_module.get_youtube_client = lambda api_key: channel
+    app_module.youtube_quota = QuotaTracker(0)
+    if not args.rate_limits:
+        limits = {'rate_per_minute': 0, 'max_retries': app_module.app.config['API_MAX_RETRIES'], 'base_delay': 0.05}
+        app_module.rate_limiters = RateLimiterRegistry({
+            'chatgpt': dict(limits, max_concurrency=app_module.app.config['LLM_MAX_WORKERS']),
+            'gemini': dict(limits, max_concurrency=app_module.app.config['LLM_MAX_WORKERS']),
+            'youtube': dict(limits, max_concurrency=app_module.app.config['YOUTUBE_MAX_CONCURRENCY'])
+        })
+        app_module.llm_router.limiters = app_module.rate_limiters
+    app_module.app.config['MAX_VIDEOS_PER_ANALYSIS'] = max(app_module.app.config['MAX_VIDEOS_PER_ANALYSIS'], *args.sizes)
+
+    # Time from request start until each title's result is ready
+    title_latencies = []
+    request_started = [0.0]
+    analyze_titles_with_llm = app_module.analyze_titles_with_llm
+
+    def timed_analyze_titles(*a, on_result=None, **k):
+        def timed_on_result(position, title, result, error):
+            title_latencies.append(time.perf_counter() - request_started[0])
+            if on_result is not None:
+                on_result(position, title, result, error)
+        return analyze_titles_with_llm(*a, on_result=timed_on_result, **k)
+
+    app_module.analyze_titles_with_llm = timed_analyze_titles
+
+    client = app_module.app.test_client()
+    settings = {'llm_type': args.llm, 'gemini_model': args.gemini_model, 'llm_api_key': 'bench-llm-key'}
+    rows = []
+
+    def run(endpoint, size, send):
+        stats.reset()
+        del title_latencies[:]
+        with RSSSampler() as rss:
+            request_started[0] = time.perf_counter()
+            response = send()
+            # Streamed responses (download_csv) are only produced as the body is read
+            response.get_data()
+            elapsed = time.perf_counter() - request_started[0]
+        if response.status_code != 200:
+            print(f"✗ {endpoint} with {size} titles failed: {response.status_code} {response.get_data(as_text=True)[:200]}")
+            return None
+        counts = stats.snapshot()
+        latencies = title_latencies or [elapsed]
+        row = {
+            'endpoint': endpoint,
+            'titles': size,
+            'seconds': round(elapsed, 3),
+            'titles_per_sec': round(size / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'peak_rss_mb': round(rss.peak / (1024 * 1024), 1),
+            'llm_calls_per_title': round(counts['llm_calls'] / size, 3),
+            'youtube_calls_per_title': round(counts['youtube_calls'] / size, 3),
+            'llm_errors': counts['llm_errors'],
+            'llm_malformed': counts['llm_malformed']
+        }
+        if response.is_json:
+            payload = response.get_json()
+            row['analyzed'] = payload.get('total_analyzed', 0)
+            row['failed'] = payload.get('total_failed', 0)
+        rows.append(row)
+        return response
+
+    print("YouTube Sentiment Analyzer - Offline Benchmark")
+    print("=" * 50)
+    print(f"LLM stub: {args.llm}, {args.latency * 1000:.0f}±{args.jitter * 1000:.0f} ms, "
+          f"{args.error_rate:.0%} errors, {args.malformed_rate:.0%} malformed; "
+          f"batch size {app_module.get_batch_size(args.llm, args.gemini_model)}, "
+          f"{app_module.app.config['LLM_MAX_WORKERS']} workers")
+
+    for size in args.sizes:
+        results = []
+        titles = make_titles(size, args.duplicate_rate, rng, prefix=f"s{size}-")
+
+        if 'analyze' in args.endpoints:
+            channel.titles = titles
+            response = run('analyze', size, lambda: client.post('/analyze', json={
+                **settings,
+                'input_method': 'channel',
+                'channel_input': '@benchmark',
+                'num_videos': size,
+                'youtube_api_key': 'bench-youtube-key'
+            }))
+            if response is not None:
+                results = response.get_json()['results']
+
+        if 'analyze_csv' in args.endpoints:
+            # A different run prefix so the CSV run cannot reuse cached analyses
+            csv_titles = [title.replace(f"s{size}-", f"c{size}-", 1) for title in titles]
+            lines = ['video_title'] + ['"' + title.replace('"', '""') + '"' for title in csv_titles]
+            body = ('\n'.join(lines) + '\n').encode('utf-8')
+            response = run('analyze_csv', size, lambda: client.post('/analyze_csv', data={
+                **settings,
+                'csv_file': (io.BytesIO(body), 'benchmark.csv')
+            }, content_type='multipart/form-data'))
+            if response is not None and not results:
+                results = response.get_json()['results']
+
+        if 'download_csv' in args.endpoints:
+            if not results:
+                results = [{'video_title': title, **stub_analysis(title), 'topics': ''} for title in titles]
+            run('download_csv', size, lambda: client.post('/download_csv', json={
+                'results': results, 'channel_name': 'benchmark', 'llm_model': args.llm
+            }))
+
+    columns = ['endpoint', 'titles', 'seconds', 'titles_per_sec', 'p50_ms', 'p99_ms', 'peak_rss_mb',
+               'llm_calls_per_title', 'youtube_calls_per_title']
+    widths = [max(len(column), *(len(str(row[column])) for row in rows)) if rows else len(column) for column in columns]
+    print()
+    print('  '.join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row[column]).rjust(width) for column, width in zip(columns, widths)))
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': rows}, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+    app_module.job_manager.shutdown(wait=False)
+    return 0 if rows else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+def normalize_title(title):
+    """Canonical form of a title used for cache keys"""
+    title = unicodedata.normalize('NFKC', title)
+    return re.sub(r'\s+', ' ', title).strip()
+
+def make_cache_key(title, model, prompt_version):
+    """Content address of one analysis: normalized title + model + prompt version"""
+    payload = '\x1f'.join([normalize_title(title), model, prompt_version])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResultCache:
+    """SQLite-backed cache of title analyses with TTL and LRU eviction"""
+
+    def __init__(self, path, ttl_seconds=0, max_entries=0, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache (accessed_at)')
+        self._conn.commit()
+        self._entries = self._conn.execute('SELECT COUNT(*) FROM analysis_cache').fetchone()[0]
+
+    def _expired(self, created_at, now):
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def get(self, title, model, prompt_version):
+        """Return the cached analysis dict, or None on a miss"""
+        key = make_cache_key(title, model, prompt_version)
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT analysis, created_at FROM analysis_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or self._expired(row[1], now):
+                if row is not None:
+                    self._conn.execute('DELETE FROM analysis_cache WHERE key = ?', (key,))
+                    self._conn.commit()
+                    self._entries -= 1
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE analysis_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, title, model, prompt_version, analysis):
+        """Store an analysis, evicting the least recently used entries past max_entries"""
+        key = make_cache_key(title, model, prompt_version)
+        now = self.clock()
+        with self._lock:
+            existed = self._conn.execute('SELECT 1 FROM analysis_cache WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO analysis_cache VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, normalize_title(title), model, prompt_version,
+                 json.dumps(analysis, ensure_ascii=False), now, now)
+            )
+            if not existed:
+                self._entries += 1
+            if self.max_entries > 0 and self._entries > self.max_entries:
+                overflow = self._entries - self.max_entries
+                self._conn.execute(
+                    'DELETE FROM analysis_cache WHERE key IN '
+                    '(SELECT key FROM analysis_cache ORDER BY accessed_at LIMIT ?)', (overflow,)
+                )
+                self._entries -= overflow
+                self.evictions += overflow
+            self._conn.commit()
+
+    def iter_entries(self, model=None, prompt_version=None, limit=None, chunk_size=1000):
+        """Yield (title, analysis) for cached entries, optionally of one model and prompt version"""
+        conditions = []
+        params = []
+        if model is not None:
+            conditions.append('model = ?')
+            params.append(model)
+        if prompt_version is not None:
+            conditions.append('prompt_version = ?')
+            params.append(prompt_version)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        offset = 0
+        while limit is None or offset < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - offset)
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT title, analysis FROM analysis_cache {where} ORDER BY rowid LIMIT ? OFFSET ?',
+                    (*params, size, offset)
+                ).fetchall()
+            for title, analysis in rows:
+                yield title, json.loads(analysis)
+            if len(rows) < size:
+                return
+            offset += len(rows)
+
+    def purge(self, expired_only=False):
+        """Delete all entries (or only expired ones) and return how many were removed"""
+        with self._lock:
+            if expired_only:
+                if self.ttl_seconds <= 0:
+                    return 0
+                cursor = self._conn.execute(
+                    'DELETE FROM analysis_cache WHERE created_at < ?', (self.clock() - self.ttl_seconds,)
+                )
+            else:
+                cursor = self._conn.execute('DELETE FROM analysis_cache')
+            self._conn.commit()
+            removed = cursor.rowcount
+            self._entries -= removed
+            self.evictions += removed
+        return removed
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': self._entries,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+class ChannelCache:
+    """SQLite-backed map of channel inputs to channel IDs and uploads playlists"""
+
+    def __init__(self, path, ttl_seconds=0, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS channel_lookups (
+                lookup TEXT PRIMARY KEY,
+                channel_id TEXT NOT NULL,
+                resolved_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS channel_playlists (
+                channel_id TEXT PRIMARY KEY,
+                uploads_playlist_id TEXT NOT NULL
+            )
+        ''')
+        self._conn.commit()
+
+    def get_channel_id(self, lookup):
+        """Channel ID previously resolved for a lookup key such as 'handle:foo', or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT channel_id, resolved_at FROM channel_lookups WHERE lookup = ?', (lookup,)
+            ).fetchone()
+            # Handles and names can be reassigned, so lookups expire; IDs and playlists do not
+            if row is None or (self.ttl_seconds > 0 and self.clock() - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def set_channel_id(self, lookup, channel_id):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO channel_lookups VALUES (?, ?, ?)', (lookup, channel_id, self.clock())
+            )
+            self._conn.commit()
+
+    def get_uploads_playlist_id(self, channel_id):
+        """Uploads playlist of a channel, or None if it has not been looked up yet"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT uploads_playlist_id FROM channel_playlists WHERE channel_id = ?', (channel_id,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def set_uploads_playlist_id(self, channel_id, uploads_playlist_id):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO channel_playlists VALUES (?, ?)', (channel_id, uploads_playlist_id)
+            )
+            self._conn.commit()
+
+    def purge(self):
+        """Forget every resolved channel and return how many lookups were removed"""
+        with self._lock:
+            removed = self._conn.execute('DELETE FROM channel_lookups').rowcount
+            self._conn.execute('DELETE FROM channel_playlists')
+            self._conn.commit()
+        return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self._conn.execute('SELECT COUNT(*) FROM channel_lookups').fetchone()[0]
+            playlists = self._conn.execute('SELECT COUNT(*) FROM channel_playlists').fetchone()[0]
+            return {
+                'lookups': lookups,
+                'playlists': playlists,
+                'hits': self.hits,
+                'misses': self.misses
+            }
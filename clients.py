@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+
+import httpx
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from langchain.llms import OpenAI
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+# Clients kept per cache; keys come from users, so the least recently used are dropped beyond this
+MAX_CACHED_CLIENTS = 256
+
+# Reused clients, keyed by (llm_type, api_key, model, json_mode), least recently used first
+_llm_clients = OrderedDict()
+_llm_lock = threading.Lock()
+
+# One pooled HTTP client shared by every OpenAI client so connections stay warm
+_openai_http_client = None
+
+# The YouTube discovery document is parsed once; Resources are built per thread
+# because the underlying httplib2 connection is not thread-safe
+_youtube_discovery_doc = None
+_youtube_lock = threading.Lock()
+_youtube_local = threading.local()
+
+def get_openai_http_client(max_connections=20):
+    """Shared httpx client with keep-alive connections for OpenAI requests"""
+    global _openai_http_client
+    with _llm_lock:
+        if _openai_http_client is None:
+            _openai_http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=httpx.Timeout(60.0, connect=10.0)
+            )
+        return _openai_http_client
+
+def supports_json_mode(llm_type):
+    """Whether the installed client for llm_type can ask the provider for JSON-only output.
+
+    Gemini clients from langchain-google-genai 1.0 on expose response_mime_type;
+    the OpenAI completions client has no JSON mode, so its answers rely on
+    parsing.repair_json and schema validation alone.
+    """
+    return llm_type == 'gemini' and 'response_mime_type' in getattr(ChatGoogleGenerativeAI, '__fields__', {})
+
+def get_llm_client(llm_type, api_key, gemini_model="gemini-2.5-flash", max_connections=20, json_mode=False):
+    """Return a cached LangChain client for this provider, key and model"""
+    model = gemini_model if llm_type == 'gemini' else llm_type
+    json_mode = json_mode and supports_json_mode(llm_type)
+    key = (llm_type, api_key, model, json_mode)
+    with _llm_lock:
+        client = _llm_clients.get(key)
+        if client is not None:
+            _llm_clients.move_to_end(key)
+            return client
+
+    if llm_type == 'chatgpt':
+        # max_tokens=-1 sizes the completion to the prompt so batched answers are not truncated
+        client = OpenAI(
+            api_key=api_key,
+            temperature=0,
+            max_tokens=-1,
+            # Retries are handled by the shared rate limiter so throttling stays visible
+            max_retries=0,
+            http_client=get_openai_http_client(max_connections)
+        )
+    elif llm_type == 'gemini':
+        options = {'response_mime_type': 'application/json'} if json_mode else {}
+        client = ChatGoogleGenerativeAI(
+            model=gemini_model,
+            google_api_key=api_key,
+            temperature=0,
+            **options
+        )
+    else:
+        raise ValueError(f"Unsupported LLM type: {llm_type}")
+
+    with _llm_lock:
+        client = _llm_clients.setdefault(key, client)
+        _llm_clients.move_to_end(key)
+        while len(_llm_clients) > MAX_CACHED_CLIENTS:
+            _llm_clients.popitem(last=False)
+        return client
+
+def get_youtube_client(api_key):
+    """Return this thread's YouTube Data API client for the given key"""
+    global _youtube_discovery_doc
+    clients = getattr(_youtube_local, 'clients', None)
+    if clients is None:
+        clients = _youtube_local.clients = OrderedDict()
+    client = clients.get(api_key)
+    if client is not None:
+        clients.move_to_end(api_key)
+        return client
+
+    with _youtube_lock:
+        if _youtube_discovery_doc is None:
+            _youtube_discovery_doc = get_static_doc('youtube', 'v3')
+    if _youtube_discovery_doc:
+        client = build_from_document(_youtube_discovery_doc, developerKey=api_key)
+    else:
+        client = build('youtube', 'v3', developerKey=api_key)
+    clients[api_key] = client
+    while len(clients) > MAX_CACHED_CLIENTS:
+        clients.popitem(last=False)
+    return client
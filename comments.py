@@ -0,0 +1,257 @@
+import heapq
+import itertools
+import random
+import threading
+from collections import Counter
+
+# Fields comment_prompt.txt asks for; the allowed values are those of the title analysis
+COMMENT_FIELDS = ('sentiment', 'emotion')
+
+# all: every comment read, in API order; top: the most engaged; stratified: a random
+# sample spread over engagement tiers in proportion to their size
+SAMPLING_MODES = ('all', 'top', 'stratified')
+
+# Lower bounds of the engagement tiers (likes + replies) stratified sampling draws from
+ENGAGEMENT_TIERS = (0, 1, 10, 100, 1000)
+
+def engagement(comment):
+    return comment.get('like_count', 0) + comment.get('reply_count', 0)
+
+def engagement_tier(comment):
+    score = engagement(comment)
+    return max(index for index, bound in enumerate(ENGAGEMENT_TIERS) if score >= bound)
+
+class TopSampler:
+    """Keeps the size most engaged comments seen, in a heap of at most size entries"""
+
+    def __init__(self, size):
+        self.size = size
+        self._heap = []
+        self._sequence = itertools.count()
+
+    def add(self, comment):
+        # The sequence number breaks ties in favour of earlier comments and keeps dicts out of comparisons
+        entry = (engagement(comment), -next(self._sequence), comment)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def sample(self):
+        return [comment for _, _, comment in sorted(self._heap, reverse=True)]
+
+class StratifiedSampler:
+    """Proportional stratified sample over engagement tiers, drawn in one pass.
+
+    Each tier keeps a reservoir sample of up to size comments, so memory stays
+    at size * len(ENGAGEMENT_TIERS) however many comments stream past. At the
+    end every non-empty tier gets at least one comment and the rest of the
+    sample is split in proportion to how many comments each tier saw.
+    """
+
+    def __init__(self, size, rng=None):
+        self.size = size
+        self.rng = rng or random.Random()
+        self._reservoirs = [[] for _ in ENGAGEMENT_TIERS]
+        self._seen = [0] * len(ENGAGEMENT_TIERS)
+
+    def add(self, comment):
+        tier = engagement_tier(comment)
+        self._seen[tier] += 1
+        reservoir = self._reservoirs[tier]
+        if len(reservoir) < self.size:
+            reservoir.append(comment)
+        else:
+            slot = self.rng.randrange(self._seen[tier])
+            if slot < self.size:
+                reservoir[slot] = comment
+
+    def allocation(self):
+        """Comments to draw from each tier"""
+        total = sum(self._seen)
+        if total <= self.size:
+            return list(self._seen)
+        nonempty = sorted((tier for tier, seen in enumerate(self._seen) if seen), key=lambda tier: -self._seen[tier])
+        if len(nonempty) >= self.size:
+            return [1 if tier in nonempty[:self.size] else 0 for tier in range(len(self._seen))]
+        counts = [min(1, seen) for seen in self._seen]
+        remaining = self.size - sum(counts)
+        shares = [remaining * seen / total for seen in self._seen]
+        for tier, share in enumerate(shares):
+            counts[tier] = min(self._seen[tier], counts[tier] + int(share))
+        # Hand out what rounding left over to the tiers with the largest remainders
+        leftover = self.size - sum(counts)
+        for tier in sorted(range(len(shares)), key=lambda tier: shares[tier] - int(shares[tier]), reverse=True):
+            if leftover <= 0:
+                break
+            if counts[tier] < min(self._seen[tier], self.size):
+                counts[tier] += 1
+                leftover -= 1
+        return counts
+
+    def sample(self):
+        sample = []
+        for reservoir, count in zip(self._reservoirs, self.allocation()):
+            sample.extend(self.rng.sample(reservoir, min(count, len(reservoir))))
+        return sample
+
+def sample_comments(comments, mode='top', size=100, rng=None):
+    """Yield a sample of up to size comments from an iterable of comment dicts.
+
+    'all' streams comments straight through; 'top' and 'stratified' read the
+    whole iterable first and hold only the sample in memory.
+    """
+    if mode == 'all':
+        yield from itertools.islice(comments, size)
+        return
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unsupported sampling mode: {mode}. Choose from: {', '.join(SAMPLING_MODES)}")
+    sampler = TopSampler(size) if mode == 'top' else StratifiedSampler(size, rng)
+    for comment in comments:
+        sampler.add(comment)
+    yield from sampler.sample()
+
+class CommentAggregator:
+    """Per-video comment sentiment distributions, updated as analyses stream in.
+
+    Only counters are kept, never the comments themselves, so memory grows with
+    the number of videos rather than the number of comments. Safe to update
+    from several threads. on_video_done(row) is called with a video's summary
+    row once its sampling has finished and every sampled comment is counted.
+    """
+
+    def __init__(self, on_video_done=None):
+        self._lock = threading.Lock()
+        self._videos = {}
+        self._on_video_done = on_video_done
+
+    def _video(self, video_id):
+        video = self._videos.get(video_id)
+        if video is None:
+            video = self._videos[video_id] = {
+                'video_title': None,
+                'fetched': 0,
+                'sampled': 0,
+                'analyzed': 0,
+                'failed': 0,
+                'error': None,
+                'sampling_done': False,
+                'reported': False,
+                'likes': 0,
+                'counts': {field: Counter() for field in COMMENT_FIELDS},
+                'liked_sentiment': Counter()
+            }
+        return video
+
+    def add_video(self, video_id, video_title=None):
+        with self._lock:
+            self._video(video_id)['video_title'] = video_title
+
+    def record_fetched(self, video_id, count=1):
+        with self._lock:
+            self._video(video_id)['fetched'] += count
+
+    def record_sampled(self, video_id, count=1):
+        with self._lock:
+            self._video(video_id)['sampled'] += count
+
+    def record_error(self, video_id, error):
+        """A video whose comments could not be read (e.g. comments turned off)"""
+        with self._lock:
+            self._video(video_id)['error'] = error
+
+    def finish_sampling(self, video_id):
+        """No more comments of this video will be sampled"""
+        with self._lock:
+            video = self._video(video_id)
+            video['sampling_done'] = True
+            row = self._take_done_row(video_id, video)
+        self._report(row)
+
+    def record(self, comment, analysis):
+        """Count one analyzed comment; a None analysis counts as a failure"""
+        with self._lock:
+            video = self._video(comment['video_id'])
+            if analysis is None:
+                video['failed'] += 1
+            else:
+                video['analyzed'] += 1
+                video['likes'] += comment.get('like_count', 0)
+                for field in COMMENT_FIELDS:
+                    video['counts'][field][analysis[field]] += 1
+                # Sentiment weighted by likes: what the audience endorsed, not only what was written
+                video['liked_sentiment'][analysis['sentiment']] += 1 + comment.get('like_count', 0)
+            row = self._take_done_row(comment['video_id'], video)
+        self._report(row)
+
+    def _take_done_row(self, video_id, video):
+        # The summary row of a video that has just finished, once; called with the lock held
+        if video['reported'] or not video['sampling_done'] or video['analyzed'] + video['failed'] < video['sampled']:
+            return None
+        video['reported'] = True
+        return self._row(video_id, video)
+
+    def _report(self, row):
+        if row is not None and self._on_video_done is not None:
+            self._on_video_done(row)
+
+    @staticmethod
+    def _distribution(video):
+        analyzed = video['analyzed']
+        sentiment = video['counts']['sentiment']
+        liked = video['liked_sentiment']
+        liked_total = sum(liked.values())
+        return {
+            'sentiment': dict(sentiment.most_common()),
+            'sentiment_share': {value: round(count / analyzed, 3) for value, count in sentiment.most_common()} if analyzed else {},
+            'emotion': dict(video['counts']['emotion'].most_common()),
+            'net_sentiment': round((sentiment['positive'] - sentiment['negative']) / analyzed, 3) if analyzed else None,
+            'like_weighted_net_sentiment': round((liked['positive'] - liked['negative']) / liked_total, 3) if liked_total else None
+        }
+
+    @classmethod
+    def _row(cls, video_id, video):
+        row = {
+            'video_id': video_id,
+            'video_title': video['video_title'],
+            'comments_fetched': video['fetched'],
+            'comments_sampled': video['sampled'],
+            'comments_analyzed': video['analyzed'],
+            'comments_failed': video['failed'],
+            **cls._distribution(video)
+        }
+        if video['error']:
+            row['error'] = video['error']
+        return row
+
+    def summary(self):
+        """Per-video distributions plus the same figures over every video"""
+        with self._lock:
+            videos = []
+            overall = self._video_totals()
+            for video_id, video in self._videos.items():
+                videos.append(self._row(video_id, video))
+        return {
+            'videos': videos,
+            'overall': {
+                'videos': len(videos),
+                'comments_fetched': overall['fetched'],
+                'comments_sampled': overall['sampled'],
+                'comments_analyzed': overall['analyzed'],
+                'comments_failed': overall['failed'],
+                **self._distribution(overall)
+            }
+        }
+
+    def _video_totals(self):
+        totals = {
+            'fetched': 0, 'sampled': 0, 'analyzed': 0, 'failed': 0,
+            'counts': {field: Counter() for field in COMMENT_FIELDS}, 'liked_sentiment': Counter()
+        }
+        for video in self._videos.values():
+            for key in ('fetched', 'sampled', 'analyzed', 'failed'):
+                totals[key] += video[key]
+            for field in COMMENT_FIELDS:
+                totals['counts'][field].update(video['counts'][field])
+            totals['liked_sentiment'].update(video['liked_sentiment'])
+        return totals
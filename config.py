@@ -10,7 +10,7 @@ class Config:
     # YouTube API Configuration
     YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY', 'your_youtube_api_key_here')
     
-    # LLM API Keys (optional - users can provide in UI)
+    # LLM API Keys (optional - users can provide in UI); separate several keys with commas to pool them
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
     GOOGLE_AI_API_KEY = os.getenv('GOOGLE_AI_API_KEY', '')
     
@@ -18,10 +18,148 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-this')
     DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
     
+    # DEBUG logs every title and raw LLM response; INFO and above keep the hot path quiet
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    
+    # Token required in the X-Admin-Token header for /admin endpoints (empty = no check, except that
+    # the watchlist endpoints that register or poll channels on the server's keys are refused)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    
+    # Production server (serve.py): request threads, open connections and how long a
+    # shutdown waits for running jobs before interrupting them (they resume after a restart)
+    SERVER_HOST = os.getenv('HOST', '0.0.0.0')
+    SERVER_PORT = int(os.getenv('PORT', '5000'))
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', '32'))
+    # Each open /jobs/<id>/events stream holds a server thread for the whole job; beyond this many the
+    # request gets a 503 and clients poll GET /jobs/<id> instead. Keep it well below SERVER_THREADS
+    SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '16'))
+    SERVER_CONNECTION_LIMIT = int(os.getenv('SERVER_CONNECTION_LIMIT', '500'))
+    SHUTDOWN_TIMEOUT_SECONDS = int(os.getenv('SHUTDOWN_TIMEOUT_SECONDS', '30'))
+    
+    # Largest accepted request body; bigger requests get a 413. CSV uploads (CSV_UPLOAD_ENDPOINTS in app.py)
+    # are spooled to a temporary file and read as a stream, so they may be much larger than other requests
+    MAX_REQUEST_BYTES = int(os.getenv('MAX_UPLOAD_MB', '50')) * 1024 * 1024
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CSV_UPLOAD_MB', '1024')) * 1024 * 1024
+    
     # Application Settings
-    MAX_VIDEOS_PER_ANALYSIS = 50
+    MAX_VIDEOS_PER_ANALYSIS = int(os.getenv('MAX_VIDEOS_PER_ANALYSIS', '5000'))
     DEFAULT_VIDEOS_COUNT = 10
+    MAX_BULK_CHANNELS = int(os.getenv('MAX_BULK_CHANNELS', '50'))  # channels per /analyze_bulk request
     
     # API Rate Limiting (requests per minute)
     YOUTUBE_RATE_LIMIT = 100
     LLM_RATE_LIMIT = 60
+    
+    # Concurrent YouTube API calls per key (halved automatically while throttled)
+    YOUTUBE_MAX_CONCURRENCY = 8
+    
+    # Retries with exponential backoff for throttled (429) or failing (5xx) API calls
+    API_MAX_RETRIES = int(os.getenv('API_MAX_RETRIES', '4'))
+    
+    # YouTube Data API units available per key per day (search = 100, list calls = 1)
+    YOUTUBE_DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', '10000'))
+    
+    # Videos fetched ahead of the analysis while earlier titles are being analyzed
+    YOUTUBE_PREFETCH_VIDEOS = 100
+    
+    # Duplicate titles (same canonical text) share one LLM analysis. DEDUP_FUZZY also merges titles
+    # whose character 3-gram Jaccard similarity is >= DEDUP_SIMILARITY, unless they differ in a
+    # number or a negation; off by default because similar headlines can still mean different things
+    DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'True').lower() == 'true'
+    DEDUP_FUZZY = os.getenv('DEDUP_FUZZY', 'False').lower() == 'true'
+    DEDUP_SIMILARITY = float(os.getenv('DEDUP_SIMILARITY', '0.85'))
+    
+    # Tags stripped before comparing titles, e.g. "| LIVE" or "(Breaking News)"; None uses dedup.DEFAULT_BOILERPLATE
+    TITLE_BOILERPLATE = None
+    
+    # Local pre-classifier: a script detector plus naive Bayes models trained from the result cache
+    # answer titles whose every field clears its confidence threshold; topics and agency_subject stay empty
+    PRECLASSIFIER_ENABLED = os.getenv('PRECLASSIFIER_ENABLED', 'False').lower() == 'true'
+    PRECLASSIFIER_PATH = os.getenv('PRECLASSIFIER_PATH', 'preclassifier.json')
+    PRECLASSIFIER_THRESHOLDS = {
+        'language_mix': 0.9,
+        'sentiment': 0.9,
+        'emotion': 0.9,
+        'frame': 0.9,
+        'ideology_score': 0.9,
+    }
+    PRECLASSIFIER_MIN_EXAMPLES = 200
+    PRECLASSIFIER_MAX_EXAMPLES = 50000
+    
+    # Distinct CSV titles remembered for on-the-fly duplicate removal (bounds memory per upload)
+    CSV_DEDUP_WINDOW = int(os.getenv('CSV_DEDUP_WINDOW', '200000'))
+    
+    # Maximum number of LLM calls in flight at once across all requests
+    LLM_MAX_WORKERS = int(os.getenv('LLM_MAX_WORKERS', '8'))
+    
+    # Titles packed into one LLM request (see batch_prompt.txt); 1 disables batching
+    LLM_BATCH_SIZE = int(os.getenv('LLM_BATCH_SIZE', '10'))
+    
+    # Per-model overrides of LLM_BATCH_SIZE, keyed by 'chatgpt' or the Gemini model name
+    LLM_BATCH_SIZES = {
+        'chatgpt': 5,
+        'gemini-2.5-pro': 20,
+        'gemini-2.5-flash': 15,
+        'gemini-2.5-flash-lite': 10,
+    }
+    
+    # Comment analysis (/analyze_comments): comments read per video (pages of 100 at 1 quota unit each),
+    # how many of those are analyzed, and comments packed into one LLM request
+    COMMENT_MAX_SCANNED = int(os.getenv('COMMENT_MAX_SCANNED', '2000'))
+    COMMENT_SAMPLE_SIZE = int(os.getenv('COMMENT_SAMPLE_SIZE', '100'))
+    COMMENT_BATCH_SIZE = int(os.getenv('COMMENT_BATCH_SIZE', '50'))
+    COMMENT_MAX_CHARS = 500  # longer comments are cut before analysis
+    MAX_COMMENT_VIDEOS = int(os.getenv('MAX_COMMENT_VIDEOS', '500'))  # videos per /analyze_comments request
+
+    # Structured output: ask providers for JSON-only responses where the client supports it, and
+    # how many times fields that fail validation are asked for again (0 = fail the title instead)
+    LLM_JSON_MODE = os.getenv('LLM_JSON_MODE', 'True').lower() == 'true'
+    LLM_FIELD_REPAIR_ATTEMPTS = int(os.getenv('LLM_FIELD_REPAIR_ATTEMPTS', '1'))
+    
+    # Provider failover: models tried in order once every key of the requested model has failed
+    # or is cooling down. Switching provider needs a key for it (the request's fallback_api_key)
+    LLM_FAILOVER_ENABLED = os.getenv('LLM_FAILOVER_ENABLED', 'True').lower() == 'true'
+    LLM_FALLBACKS = {
+        'chatgpt': ['gemini-2.5-flash'],
+        'gemini-2.5-pro': ['gemini-2.5-flash', 'chatgpt'],
+        'gemini-2.5-flash': ['gemini-2.5-flash-lite', 'chatgpt'],
+        'gemini-2.5-flash-lite': ['gemini-2.5-flash', 'chatgpt'],
+    }
+    LLM_COOLDOWN_SECONDS = 30  # a failed key or model is skipped this long, doubling with repeated failures
+    
+    # Hedged requests: a call slower than this quantile of its key's recent latencies is
+    # duplicated on the next key or model and the first answer wins (0 = off, e.g. 0.95)
+    LLM_HEDGE_QUANTILE = float(os.getenv('LLM_HEDGE_QUANTILE', '0'))
+    LLM_HEDGE_MIN_SECONDS = 2.0
+    
+    # Approximate USD price per million (input, output) tokens, for the cost counters at /metrics
+    LLM_PRICES = {
+        'chatgpt': (1.50, 2.00),
+        'gemini-2.5-pro': (1.25, 10.00),
+        'gemini-2.5-flash': (0.30, 2.50),
+        'gemini-2.5-flash-lite': (0.10, 0.40),
+    }
+    
+    # Result Cache (analyses are deterministic at temperature=0)
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'True').lower() == 'true'
+    CACHE_PATH = os.getenv('CACHE_PATH', 'cache.db')
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '200000'))
+    
+    # How long a resolved handle/name -> channel ID mapping is trusted
+    CHANNEL_CACHE_TTL_SECONDS = int(os.getenv('CHANNEL_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+    
+    # Channel watchlist: scheduled runs analyze only uploads newer than each channel's
+    # high-water mark, using the server-side API keys above
+    STORE_PATH = os.getenv('STORE_PATH', 'results.db')
+    WATCH_ENABLED = os.getenv('WATCH_ENABLED', 'False').lower() == 'true'
+    WATCH_INTERVAL_SECONDS = int(os.getenv('WATCH_INTERVAL_SECONDS', '3600'))  # default per channel
+    WATCH_MIN_INTERVAL_SECONDS = 300
+    WATCH_TICK_SECONDS = 60  # how often the scheduler looks for due channels
+    WATCH_INITIAL_VIDEOS = int(os.getenv('WATCH_INITIAL_VIDEOS', '50'))  # first poll of a new channel
+    WATCH_MAX_ATTEMPTS = int(os.getenv('WATCH_MAX_ATTEMPTS', '3'))  # analyses of a failing video before polls give up on it
+    
+    # Background Jobs
+    JOBS_DB_PATH = os.getenv('JOBS_DB_PATH', 'jobs.db')
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_EVENT_INTERVAL = 1.0  # seconds between Server-Sent Events progress updates
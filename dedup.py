@@ -0,0 +1,141 @@
+import hashlib
+import re
+import unicodedata
+
+# Trailing or bracketed tags news channels attach to otherwise identical titles
+DEFAULT_BOILERPLATE = [
+    'live', 'live updates', 'breaking', 'breaking news', 'latest news', 'top news', 'news',
+    'hindi news', 'english news', 'full episode', 'full video', 'exclusive', 'watch', 'shorts',
+    'live now', 'latest', 'today', 'update', 'updates', 'headlines'
+]
+
+_HASHTAG = re.compile(r'#[^\s#]+')
+_BRACKETED = re.compile(r'[\(\[\{]([^\)\]\}]*)[\)\]\}]')
+_SEPARATORS = re.compile(r'\s*(?:\||｜|¦|•|::|\s-\s|\s–\s|\s—\s)\s*')
+_SPACES = re.compile(r'\s+')
+
+# Words that flip a headline's meaning; titles differing in one of these (or in a
+# number) are never treated as near-duplicates. "n't" contractions canonicalize to a
+# separate "t" token, e.g. "isn't" -> "isn t"
+NEGATIONS = {
+    'not', 'no', 'never', 'nor', 'neither', 'none', 'nothing', 'nobody', 'nowhere', 'without',
+    'cannot', 't', 'nahi', 'nahin', 'na', 'mat', 'नहीं', 'नही', 'न', 'ना', 'मत', 'बिना'
+}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+def _words_only(text):
+    # Keep letters, combining marks (Devanagari matras and viramas) and digits; everything else splits words
+    return ''.join(ch if unicodedata.category(ch)[0] in 'LMN' else ' ' for ch in text)
+
+def _strip_symbols(text):
+    # Emoji, pictographs and other symbol/format characters (skin tones, ZWJ, variation selectors)
+    return ''.join(
+        ch for ch in text
+        if unicodedata.category(ch) not in ('So', 'Sk', 'Cf', 'Cs', 'Co') and not 0xFE00 <= ord(ch) <= 0xFE0F
+    )
+
+def canonicalize_title(title, boilerplate=None):
+    """Reduce a title to the form used for duplicate detection.
+
+    Applies NFKC, drops emoji, hashtags and boilerplate tags such as "| LIVE"
+    or "(Breaking News)", then case-folds and collapses punctuation and
+    whitespace. Devanagari and other scripts are kept intact.
+    """
+    boilerplate = {tag.casefold() for tag in (boilerplate if boilerplate is not None else DEFAULT_BOILERPLATE)}
+    text = unicodedata.normalize('NFKC', title)
+    text = _strip_symbols(text)
+    text = _HASHTAG.sub(' ', text)
+    text = _BRACKETED.sub(lambda m: ' ' if _tag(m.group(1)) in boilerplate else f' {m.group(1)} ', text)
+
+    # Drop separator-delimited segments that are pure boilerplate, e.g. "Title | LIVE | News"
+    segments = [segment for segment in _SEPARATORS.split(text) if segment.strip()]
+    kept = [segment for segment in segments if _tag(segment) not in boilerplate]
+    text = ' '.join(kept or segments)
+
+    return _SPACES.sub(' ', _words_only(text.casefold())).strip()
+
+def _tag(text):
+    return _SPACES.sub(' ', _words_only(text.casefold())).strip()
+
+def _shingles(text, size=3):
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def meaning_differs(canonical, other):
+    """True when two canonical titles differ in a number or a negation word"""
+    differing = set(canonical.split()) ^ set(other.split())
+    return any(token in NEGATIONS or any(ch.isdigit() for ch in token) for token in differing)
+
+class TitleDeduplicator:
+    """Groups exact and, optionally, near-duplicate titles.
+
+    assign() returns the group of each title as it arrives: exact matches of
+    the canonical form are found with a dict lookup. With fuzzy set,
+    near-duplicates are also found by MinHash signatures of character 3-grams
+    bucketed into LSH bands, then confirmed with the true Jaccard similarity
+    against the group's first member; titles whose differing words include a
+    number or a negation are never merged.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=32, bands=8, boilerplate=None, fuzzy=False):
+        self.threshold = threshold
+        self.fuzzy = fuzzy
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.boilerplate = boilerplate
+        # Universal hash permutations (a*x + b mod p) over the shingle hashes
+        self._perms = [
+            (_hash64(f'a{i}') % (_MERSENNE_PRIME - 1) + 1, _hash64(f'b{i}') % _MERSENNE_PRIME)
+            for i in range(self.rows * bands)
+        ]
+        self._exact = {}
+        self._buckets = {}
+        self._group_shingles = []
+        self._group_canonical = []
+
+    def _signature(self, shingles):
+        # The built-in hash is fast and only needs to be consistent within one index
+        hashed = [hash(shingle) % _MERSENNE_PRIME for shingle in shingles]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashed) for a, b in self._perms]
+
+    def assign(self, title):
+        """Return (group_id, is_new) for a title"""
+        canonical = canonicalize_title(title, self.boilerplate)
+        group = self._exact.get(canonical)
+        if group is not None:
+            return group, False
+        if not self.fuzzy:
+            group = len(self._group_canonical)
+            self._group_canonical.append(canonical)
+            self._exact[canonical] = group
+            return group, True
+
+        shingles = _shingles(canonical)
+        signature = self._signature(shingles)
+        bands = [
+            (band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+        candidates = set()
+        for key in bands:
+            candidates.update(self._buckets.get(key, ()))
+        for candidate in sorted(candidates):
+            other = self._group_shingles[candidate]
+            if meaning_differs(canonical, self._group_canonical[candidate]):
+                continue
+            if len(shingles & other) / len(shingles | other) >= self.threshold:
+                self._exact[canonical] = candidate
+                return candidate, False
+
+        group = len(self._group_canonical)
+        self._group_shingles.append(shingles)
+        self._group_canonical.append(canonical)
+        self._exact[canonical] = group
+        for key in bands:
+            self._buckets.setdefault(key, []).append(group)
+        return group, True
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Prompt and model A/B evaluation for the YouTube Sentiment Analyzer
+
+Replays a stored set of titles through several prompt/model variants in
+parallel and reports, per variant, how often its answers agree with a
+reference, how many titles failed or came back with invalid fields, the
+tokens and approximate cost per title, and the latency of the provider calls
+(rate limit waits left out). Titles come from the result store, the result
+cache or a CSV file; the reference is the stored analysis of each title or one
+of the variants. Results are not cached or stored, so evaluating never changes
+what the application serves.
+
+A variant is NAME=PROMPT_FILE[:MODEL]. Prompt files with a {titles}
+placeholder are sent as batches like batch_prompt.txt, the others one title
+per call like prompt.txt. API keys come from OPENAI_API_KEY and
+GOOGLE_AI_API_KEY (comma-separated pools work).
+
+Usage:
+    python evaluate.py --variant current=prompt.txt --variant short=prompts/short.txt
+    python evaluate.py --source cache --model gemini-2.5-flash --limit 500 \\
+        --variant flash=prompt.txt:gemini-2.5-flash --variant lite=prompt.txt:gemini-2.5-flash-lite
+    python evaluate.py --source csv --csv titles.csv --reference current --variant current=prompt.txt --json eval.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import percentile
+from parsing import validate_analysis
+from router import LLMRouter, model_provider
+
+# Fields compared with the reference; topics are compared by overlap and agency_subject is free text
+COMPARED_FIELDS = ('sentiment', 'emotion', 'frame', 'ideology_score', 'language_mix')
+
+# Seconds the last provider call of this thread took
+_call_seconds = threading.local()
+
+def parse_variant(spec, default_model):
+    """(name, prompt path, model) from NAME=PROMPT_FILE[:MODEL]"""
+    name, separator, rest = spec.partition('=')
+    if not separator or not name or not rest:
+        raise argparse.ArgumentTypeError(f"Variant must look like NAME=PROMPT_FILE[:MODEL], got {spec!r}")
+    path, _, model = rest.partition(':')
+    return name, path, model or default_model
+
+def load_titles(args, app_module):
+    """[(title, stored analysis or None)] from the chosen source, without repeated titles"""
+    items = []
+    if args.source == 'csv':
+        with open(args.csv, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                title = (row.get('video_title') or '').strip()
+                if title:
+                    items.append((title, None))
+    elif args.source == 'cache':
+        if app_module.result_cache is None:
+            raise SystemExit('The result cache is disabled (CACHE_ENABLED=false).')
+        items = list(app_module.result_cache.iter_entries(
+            model=args.model, prompt_version=args.prompt_version, limit=args.limit
+        ))
+    else:
+        filters = {'model': args.model, 'prompt_version': args.prompt_version}
+        since = 0
+        while len(items) < args.limit:
+            rows = app_module.result_store.results(
+                channel_id=args.channel_id, since=since, limit=min(1000, args.limit - len(items)),
+                include_failed=False, **filters
+            )
+            if not rows:
+                break
+            items.extend((row['video_title'], row['result']) for row in rows)
+            since = rows[-1]['id']
+
+    seen = set()
+    unique = []
+    for title, analysis in items:
+        if title not in seen:
+            seen.add(title)
+            unique.append((title, analysis))
+    return unique[:args.limit]
+
+class VariantRun:
+    """Answers, failures, tokens and call latencies collected for one variant"""
+
+    def __init__(self, name, path, model, prompt_version, batched):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.prompt_version = prompt_version
+        self.batched = batched
+        self.answers = {}
+        self.failed = 0
+        self.invalid_fields = 0
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def record_call(self, seconds, input_tokens, output_tokens):
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.latencies.append(seconds)
+
+    def record_answer(self, title, analysis):
+        cleaned, invalid = validate_analysis(analysis)
+        with self._lock:
+            self.answers[title] = cleaned
+            self.invalid_fields += len(invalid)
+
+    def record_failure(self, count=1):
+        with self._lock:
+            self.failed += count
+
+def timed_call_target(app_module):
+    """app_module.call_llm_target that also notes how long the provider call took, leaving out rate limit waits"""
+    def call_target(target, formatted_prompt):
+        started = time.perf_counter()
+        try:
+            return app_module.call_llm_target(target, formatted_prompt)
+        finally:
+            _call_seconds.value = time.perf_counter() - started
+    return call_target
+
+def run_variant_chunk(app_module, router, run, keys, titles):
+    """One LLM call of a variant: a single title, or a batch when the prompt takes {titles}"""
+    llm_type = model_provider(run.model)
+    if run.batched:
+        prompt = app_module.format_batch_prompt(titles, run.path)
+    else:
+        prompt = app_module.get_prompt_template(run.path).format(title=titles[0])
+    try:
+        text, _, input_tokens, output_tokens = app_module.call_llm(
+            prompt, llm_type, keys, run.model, router=router, call_target=timed_call_target(app_module)
+        )
+    except Exception as e:
+        app_module.logger.error("Error evaluating %s: %s", run.name, e)
+        run.record_failure(len(titles))
+        return
+    run.record_call(_call_seconds.value, input_tokens, output_tokens)
+    try:
+        if run.batched:
+            parsed = app_module.parse_batch_response(text, len(titles))
+        else:
+            parsed = {0: app_module.parse_analysis_response(text)}
+    except ValueError as e:
+        app_module.logger.warning("Error parsing %s response: %s", run.name, e)
+        parsed = {}
+    for position, title in enumerate(titles):
+        if position in parsed:
+            run.record_answer(title, parsed[position])
+        else:
+            run.record_failure()
+
+def topic_overlap(topics, reference_topics):
+    """Jaccard similarity of two topic lists, ignoring case"""
+    topics = {str(topic).strip().casefold() for topic in topics}
+    reference_topics = {str(topic).strip().casefold() for topic in reference_topics}
+    if not topics and not reference_topics:
+        return 1.0
+    return len(topics & reference_topics) / len(topics | reference_topics)
+
+def agreement(answers, reference):
+    """Share of titles answered by both where each field matches, plus all compared fields at once"""
+    titles = [title for title in answers if title in reference]
+    report = {'compared': len(titles)}
+    if not titles:
+        return report
+    for field in COMPARED_FIELDS:
+        report[field] = round(sum(answers[title].get(field) == reference[title].get(field) for title in titles) / len(titles), 3)
+    report['all_fields'] = round(sum(
+        all(answers[title].get(field) == reference[title].get(field) for field in COMPARED_FIELDS) for title in titles
+    ) / len(titles), 3)
+    scores = [(answers[title].get('ideology_score'), reference[title].get('ideology_score')) for title in titles]
+    scores = [(score, expected) for score, expected in scores if score is not None and expected is not None]
+    report['ideology_mean_abs_error'] = round(sum(abs(score - expected) for score, expected in scores) / len(scores), 3) if scores else None
+    report['topic_overlap'] = round(sum(
+        topic_overlap(answers[title].get('topics', []), reference[title].get('topics', [])) for title in titles
+    ) / len(titles), 3)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare prompt/model variants on a stored set of titles')
+    parser.add_argument('--variant', dest='variants', action='append', default=[],
+                        help='NAME=PROMPT_FILE[:MODEL]; repeat for each variant (default: current=prompt.txt)')
+    parser.add_argument('--source', choices=['store', 'cache', 'csv'], default='store',
+                        help='Where the titles (and stored reference answers) come from')
+    parser.add_argument('--csv', help='CSV file with a video_title column, for --source csv')
+    parser.add_argument('--channel-id', help='Only titles of this channel (--source store)')
+    parser.add_argument('--model', help='Only titles analyzed by this model; also the default variant model')
+    parser.add_argument('--prompt-version', help='Only titles analyzed with this prompt version')
+    parser.add_argument('--limit', type=int, default=200, help='Titles to evaluate (default: 200)')
+    parser.add_argument('--reference', default='stored',
+                        help="'stored' to compare with the stored answers, or a variant name (default: stored)")
+    parser.add_argument('--batch-size', type=int, help='Titles per call for batch prompts (default: LLM_BATCH_SIZE)')
+    parser.add_argument('--workers', type=int, help='Concurrent LLM calls (default: LLM_MAX_WORKERS)')
+    parser.add_argument('--json', dest='json_path', help='Also write the report to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help="Show the application's debug log")
+    args = parser.parse_args()
+    if args.source == 'csv' and not args.csv:
+        parser.error('--source csv needs --csv')
+
+    os.environ.setdefault('LOG_LEVEL', 'DEBUG' if args.verbose else 'WARNING')
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+
+    # Every call of a variant is answered by the variant's own model, without failover or hedging
+    router = LLMRouter(app_module.rate_limiters, cooldown_seconds=app_module.app.config['LLM_COOLDOWN_SECONDS'])
+    default_model = args.model or 'gemini-2.5-flash'
+    variants = [parse_variant(spec, default_model) for spec in args.variants or ['current=prompt.txt']]
+    names = [name for name, _, _ in variants]
+    if len(set(names)) != len(names):
+        parser.error('Variant names must be unique')
+    if args.reference != 'stored' and args.reference not in names:
+        parser.error(f"--reference must be 'stored' or one of: {', '.join(names)}")
+
+    items = load_titles(args, app_module)
+    if not items:
+        print('No titles found for these filters.')
+        return 1
+    titles = [title for title, _ in items]
+    reference = None
+    if args.reference == 'stored':
+        if all(analysis is None for _, analysis in items):
+            parser.error('The titles have no stored answers; pass --reference with a variant name')
+        reference = {title: validate_analysis(analysis)[0] for title, analysis in items if analysis is not None}
+
+    runs = []
+    for name, path, model in variants:
+        template = app_module.get_prompt_template(path)
+        runs.append(VariantRun(name, path, model, app_module.hash_prompt_files((path,)),
+                               'titles' in template.input_variables))
+
+    batch_size = args.batch_size or app_module.app.config['LLM_BATCH_SIZE']
+    workers = args.workers or app_module.app.config['LLM_MAX_WORKERS']
+    print("YouTube Sentiment Analyzer - Prompt Evaluation")
+    print("=" * 50)
+    print(f"{len(titles)} titles from {args.source}, {len(runs)} variants, {workers} workers; "
+          f"reference: {args.reference}")
+
+    started = time.perf_counter()
+    # Variants are interleaved so each one sees the same rate limits and provider conditions
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='evaluate') as executor:
+        futures = []
+        for offset in range(0, len(titles), batch_size):
+            chunk = titles[offset:offset + batch_size]
+            for run in runs:
+                keys = app_module.get_server_llm_keys(model_provider(run.model))
+                if run.batched:
+                    futures.append(executor.submit(run_variant_chunk, app_module, router, run, keys, chunk))
+                else:
+                    futures.extend(executor.submit(run_variant_chunk, app_module, router, run, keys, [title]) for title in chunk)
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    if reference is None:
+        reference = next(run.answers for run in runs if run.name == args.reference)
+    prices = app_module.app.config['LLM_PRICES']
+    rows = []
+    for run in runs:
+        price = prices.get(run.model)
+        cost = (run.input_tokens * price[0] + run.output_tokens * price[1]) / 1_000_000 if price else None
+        rows.append({
+            'variant': run.name,
+            'prompt': run.path,
+            'prompt_version': run.prompt_version,
+            'model': run.model,
+            'titles': len(titles),
+            'analyzed': len(run.answers),
+            'failed': run.failed,
+            'invalid_fields': run.invalid_fields,
+            'agreement': agreement(run.answers, reference),
+            'calls': run.calls,
+            'input_tokens_per_title': round(run.input_tokens / len(titles), 1),
+            'output_tokens_per_title': round(run.output_tokens / len(titles), 1),
+            'cost_usd': round(cost, 6) if cost is not None else None,
+            'cost_per_1k_titles_usd': round(cost * 1000 / len(titles), 4) if cost is not None else None,
+            'p50_ms': round(percentile(run.latencies, 0.5) * 1000, 1),
+            'p95_ms': round(percentile(run.latencies, 0.95) * 1000, 1)
+        })
+
+    columns = ['variant', 'model', 'prompt_version', 'analyzed', 'failed', 'invalid_fields', 'agree_all',
+               'input_tokens_per_title', 'output_tokens_per_title', 'cost_per_1k_titles_usd', 'p50_ms', 'p95_ms']
+    table = [dict(row, agree_all=row['agreement'].get('all_fields')) for row in rows]
+    widths = [max(len(column), *(len(str(row[column])) for row in table)) for column in columns]
+    print()
+    print('  '.join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in table:
+        print('  '.join(str(row[column]).rjust(width) for column, width in zip(columns, widths)))
+    print(f"\nPer-field agreement with {args.reference}:")
+    for row in rows:
+        fields = ', '.join(f"{field} {row['agreement'][field]}" for field in COMPARED_FIELDS if field in row['agreement'])
+        print(f"  {row['variant']}: {fields or 'nothing to compare'}")
+    print(f"\nFinished in {elapsed:.1f}s")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': rows}, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.json_path}")
+
+    app_module.job_manager.shutdown(wait=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import csv
+import io
+import json
+import zlib
+
+# (CSV header, result field) in export order; the CSV layout predates the other formats
+EXPORT_COLUMNS = [
+    ('Video Title', 'video_title'),
+    ('Sentiment', 'sentiment'),
+    ('Emotion', 'emotion'),
+    ('Frame', 'frame'),
+    ('Ideology Score', 'ideology_score'),
+    ('Topics', 'topics'),
+    ('Language Mix', 'language_mix'),
+    ('Agency Subject', 'agency_subject'),
+    ('Model', 'model'),
+    ('Prompt Version', 'prompt_version'),
+    ('Channel ID', 'channel_id'),
+    ('Channel Name', 'channel_name'),
+]
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl.gz': ('application/gzip', 'jsonl.gz'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+# Rows serialized before a chunk is handed to the response
+CHUNK_ROWS = 500
+
+def iter_csv(rows, chunk_rows=CHUNK_ROWS):
+    """Yield a UTF-8 CSV export of result rows in chunks"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([row.get(field, '') for _, field in EXPORT_COLUMNS])
+        if count % chunk_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def iter_jsonl_gz(rows, chunk_rows=CHUNK_ROWS):
+    """Yield a gzip-compressed JSON Lines export, one full result object per line"""
+    # wbits=31 writes the gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= chunk_rows:
+            chunk = compressor.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+            lines = []
+            if chunk:
+                yield chunk
+    if lines:
+        chunk = compressor.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+class _ChunkSink:
+    """Write-only file object that hands bytes back to a generator instead of keeping them"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        # Parquet footers record absolute offsets, so report bytes written so far
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ('position', pa.int64()),
+        ('video_title', pa.string()),
+        ('sentiment', pa.string()),
+        ('emotion', pa.string()),
+        ('frame', pa.string()),
+        ('ideology_score', pa.int64()),
+        ('topics', pa.string()),
+        ('language_mix', pa.string()),
+        ('agency_subject', pa.string()),
+        ('model', pa.string()),
+        ('prompt_version', pa.string()),
+        ('channel_id', pa.string()),
+        ('channel_name', pa.string()),
+        ('duplicate_of', pa.string()),
+    ])
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _arrow_batches(pa, schema, rows, chunk_rows):
+    columns = {name: [] for name in schema.names}
+    for row in rows:
+        for name in schema.names:
+            value = row.get(name)
+            if name in ('position', 'ideology_score'):
+                value = _to_int(value)
+            elif value is not None:
+                value = str(value)
+            columns[name].append(value)
+        if len(columns['position']) >= chunk_rows:
+            yield pa.RecordBatch.from_pydict(columns, schema=schema)
+            columns = {name: [] for name in schema.names}
+    if columns['position']:
+        yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError('Parquet and Arrow exports require pyarrow (pip install pyarrow).')
+    return pyarrow
+
+def iter_parquet(rows, chunk_rows=CHUNK_ROWS * 10):
+    """Yield a Parquet export, one row group per chunk_rows results (requires pyarrow)"""
+    pa = _import_pyarrow()
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    writer = pa.parquet.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='zstd')
+    for batch in _arrow_batches(pa, schema, rows, chunk_rows):
+        writer.write_table(pa.Table.from_batches([batch], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def iter_arrow(rows, chunk_rows=CHUNK_ROWS * 10):
+    """Yield an Arrow IPC stream export, one record batch per chunk_rows results (requires pyarrow)"""
+    pa = _import_pyarrow()
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+    for batch in _arrow_batches(pa, schema, rows, chunk_rows):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'jsonl.gz': iter_jsonl_gz,
+    'parquet': iter_parquet,
+    'arrow': iter_arrow,
+}
+
+def check_export_format(export_format):
+    """Raise ValueError for an unknown format or one whose optional dependency is missing"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}. Choose from: {', '.join(EXPORT_FORMATS)}")
+    if export_format in ('parquet', 'arrow'):
+        _import_pyarrow()
@@ -0,0 +1,304 @@
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
+
+# Statuses a job can be in; 'interrupted' jobs were running when the server stopped
+ACTIVE_STATUSES = ('queued', 'running')
+FINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+logger = logging.getLogger(__name__)
+
+class JobManager:
+    """Persistent queue of analysis jobs processed by a background worker pool.
+
+    Job state, titles and per-title results live in SQLite so progress survives
+    a restart. API keys are only ever held in memory: jobs that were running
+    when the process stopped come back as 'interrupted' and are resumed by
+    supplying the keys again.
+    """
+
+    def __init__(self, path, runner, max_workers=2):
+        self._runner = runner
+        self._lock = threading.Lock()
+        self._cancel_events = {}
+        self._futures = {}
+        self._closing = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                titles_complete INTEGER NOT NULL DEFAULT 0,
+                analyzed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                summary TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_titles (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                video_title TEXT NOT NULL,
+                video_id TEXT,
+                published_at TEXT,
+                PRIMARY KEY (job_id, position)
+            );
+            CREATE TABLE IF NOT EXISTS job_results (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                result TEXT,
+                error TEXT,
+                UNIQUE (job_id, position)
+            );
+        ''')
+        self._conn.execute(
+            "UPDATE jobs SET status = 'interrupted', updated_at = ? WHERE status IN ('queued', 'running')",
+            (time.time(),)
+        )
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def create(self, kind, params, titles=None):
+        """Register a new job; titles may be given up front (CSV) or added while it runs"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, kind, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, kind, 'queued', json.dumps(params), now, now)
+            )
+            self._conn.commit()
+        if titles is not None:
+            self.add_titles(job_id, titles)
+            self.mark_titles_complete(job_id)
+        return job_id
+
+    def start(self, job_id, secrets):
+        """Queue a job on the worker pool with the API keys it needs"""
+        if self._closing:
+            raise RuntimeError('Server is shutting down; submit the job again later.')
+        cancel_event = threading.Event()
+        with self._lock:
+            self._cancel_events[job_id] = cancel_event
+        self._execute("UPDATE jobs SET status = 'queued', error = NULL, updated_at = ? WHERE id = ?", (time.time(), job_id))
+        future = self._executor.submit(self._run, job_id, secrets, cancel_event)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget_future(job_id, future))
+
+    def _forget_future(self, job_id, future):
+        with self._lock:
+            if self._futures.get(job_id) is future:
+                del self._futures[job_id]
+
+    def _run(self, job_id, secrets, cancel_event):
+        job = self.get(job_id, include_results=False)
+        if job is None or cancel_event.is_set():
+            self.set_status(job_id, 'cancelled')
+            return
+        self.set_status(job_id, 'running')
+        try:
+            self._runner(job_id, job['params'], secrets, cancel_event)
+            if not cancel_event.is_set():
+                self.set_status(job_id, 'completed')
+            else:
+                # Jobs stopped by a shutdown can be resumed like those of a crashed process
+                self.set_status(job_id, 'interrupted' if self._closing else 'cancelled')
+        except Exception as e:
+            logger.error("Error running job %s: %s", job_id, e)
+            self.set_status(job_id, 'failed', str(e))
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+
+    def cancel(self, job_id):
+        """Stop a queued or running job; titles already in flight still finish"""
+        with self._lock:
+            cancel_event = self._cancel_events.get(job_id)
+        if cancel_event is not None:
+            cancel_event.set()
+            return True
+        job = self.get(job_id, include_results=False)
+        if job is not None and job['status'] == 'interrupted':
+            self.set_status(job_id, 'cancelled')
+            return True
+        return False
+
+    def set_status(self, job_id, status, error=None):
+        self._execute('UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?',
+                      (status, error, time.time(), job_id))
+
+    def set_summary(self, job_id, summary):
+        """Keep the job-level outcome of a run, e.g. the per-channel summaries of a bulk job"""
+        self._execute('UPDATE jobs SET summary = ?, updated_at = ? WHERE id = ?',
+                      (json.dumps(summary, ensure_ascii=False), time.time(), job_id))
+
+    def add_titles(self, job_id, titles, start=None, chunk_size=1000):
+        """Append titles (any iterable) to a job and return the position after the last one.
+
+        Items are title strings or video dicts with video_title, video_id and published_at.
+        """
+        if start is None:
+            with self._lock:
+                start = self._conn.execute('SELECT total FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]
+        end = start
+        titles = iter(titles)
+        while True:
+            chunk = list(itertools.islice(titles, chunk_size))
+            if not chunk:
+                break
+            with self._lock:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO job_titles (job_id, position, video_title, video_id, published_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    [
+                        (job_id, end + offset, item['video_title'], item.get('video_id'), item.get('published_at'))
+                        if isinstance(item, dict) else (job_id, end + offset, item, None, None)
+                        for offset, item in enumerate(chunk)
+                    ]
+                )
+                end += len(chunk)
+                self._conn.execute('UPDATE jobs SET total = MAX(total, ?), updated_at = ? WHERE id = ?',
+                                   (end, time.time(), job_id))
+                self._conn.commit()
+        return end
+
+    def mark_titles_complete(self, job_id):
+        self._execute('UPDATE jobs SET titles_complete = 1, updated_at = ? WHERE id = ?', (time.time(), job_id))
+
+    def reset(self, job_id):
+        """Drop titles and results so a job can be rebuilt from its source"""
+        with self._lock:
+            self._conn.execute('DELETE FROM job_titles WHERE job_id = ?', (job_id,))
+            self._conn.execute('DELETE FROM job_results WHERE job_id = ?', (job_id,))
+            self._conn.execute(
+                'UPDATE jobs SET total = 0, analyzed = 0, failed = 0, titles_complete = 0, summary = NULL, updated_at = ? '
+                'WHERE id = ?',
+                (time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def pending_titles(self, job_id):
+        """(position, title, video_id, published_at) of titles that have no result yet, in order"""
+        with self._lock:
+            return self._conn.execute('''
+                SELECT t.position, t.video_title, t.video_id, t.published_at FROM job_titles t
+                LEFT JOIN job_results r ON r.job_id = t.job_id AND r.position = t.position
+                WHERE t.job_id = ? AND r.seq IS NULL ORDER BY t.position
+            ''', (job_id,)).fetchall()
+
+    def record_result(self, job_id, position, result=None, error=None):
+        """Store the outcome of one title and update the job's counters"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO job_results (job_id, position, result, error) VALUES (?, ?, ?, ?)',
+                (job_id, position, json.dumps(result, ensure_ascii=False) if result is not None else None, error)
+            )
+            if cursor.rowcount:
+                column = 'analyzed' if result is not None else 'failed'
+                self._conn.execute(f'UPDATE jobs SET {column} = {column} + 1, updated_at = ? WHERE id = ?',
+                                   (time.time(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id, since=0, include_results=True):
+        """Job status plus results recorded after sequence number `since`"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, kind, status, params, total, titles_complete, analyzed, failed, error, created_at, updated_at, '
+                'summary FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = {
+                'job_id': row[0],
+                'kind': row[1],
+                'status': row[2],
+                'params': json.loads(row[3]),
+                'total': row[4],
+                'titles_complete': bool(row[5]),
+                'total_analyzed': row[6],
+                'total_failed': row[7],
+                'error': row[8],
+                'created_at': row[9],
+                'updated_at': row[10],
+                'summary': json.loads(row[11]) if row[11] is not None else None
+            }
+            if include_results:
+                rows = self._conn.execute('''
+                    SELECT r.seq, r.position, t.video_title, r.result, r.error FROM job_results r
+                    JOIN job_titles t ON t.job_id = r.job_id AND t.position = r.position
+                    WHERE r.job_id = ? AND r.seq > ? ORDER BY r.seq
+                ''', (job_id, since)).fetchall()
+                job['results'] = [
+                    {'position': position, **json.loads(result)}
+                    for _, position, _, result, _ in rows if result is not None
+                ]
+                job['failed'] = [
+                    {'position': position, 'video_title': title, 'error': error}
+                    for _, position, title, result, error in rows if result is None
+                ]
+                job['next_since'] = rows[-1][0] if rows else since
+        job['done'] = job['status'] in FINAL_STATUSES or job['status'] == 'interrupted'
+        return job
+
+    def iter_results(self, job_id, chunk_size=1000):
+        """Yield a job's successful results in title order, reading chunk_size rows at a time"""
+        position = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute('''
+                    SELECT position, result FROM job_results
+                    WHERE job_id = ? AND position > ? AND result IS NOT NULL
+                    ORDER BY position LIMIT ?
+                ''', (job_id, position, chunk_size)).fetchall()
+            for position, result in rows:
+                yield {'position': position, **json.loads(result)}
+            if len(rows) < chunk_size:
+                return
+
+    def list(self, limit=50):
+        """Most recent jobs, newest first, without their results"""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                'SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)
+            ).fetchall()]
+        return [self.get(job_id, include_results=False) for job_id in ids]
+
+    def shutdown(self, wait=True, timeout=None):
+        """Stop accepting jobs and, if wait is set, let running ones finish.
+
+        Jobs still queued are dropped and come back as 'interrupted' on the next
+        start. Jobs still running after timeout seconds are told to stop reading
+        new titles; they finish their in-flight batches and are marked
+        'interrupted' so they can be resumed.
+        """
+        self._closing = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if not wait:
+            return
+        with self._lock:
+            futures = list(self._futures.values())
+        _, running = futures_wait(futures, timeout=timeout)
+        if running:
+            logger.warning("Interrupting %d job(s) still running at shutdown", len(running))
+            with self._lock:
+                for cancel_event in self._cancel_events.values():
+                    cancel_event.set()
+            futures_wait(running)
@@ -0,0 +1,123 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the span duration histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) for providers that do not report usage"""
+    return math.ceil(len(text) / 4) if text else 0
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+class Metrics:
+    """Thread-safe counters and duration histograms rendered in the Prometheus text format"""
+
+    def __init__(self, prefix='ytsa', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration in a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0}
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the enclosed block into the <name>_seconds histogram, failed or not"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f'{name}_seconds', time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        """Counters and histogram count/sum as plain dicts, for JSON"""
+        with self._lock:
+            return {
+                'counters': {
+                    name + _format_labels(labels): value for (name, labels), value in self._counters.items()
+                },
+                'spans': {
+                    name + _format_labels(labels): {'count': histogram['count'], 'sum': round(histogram['sum'], 6)}
+                    for (name, labels), histogram in self._histograms.items()
+                }
+            }
+
+    def render(self, gauges=()):
+        """Prometheus text exposition of every metric plus (name, labels, value) gauges computed by the caller"""
+        lines = []
+
+        def header(name, kind):
+            full_name = f'{self.prefix}_{name}'
+            if name in self._help:
+                lines.append(f'# HELP {full_name} {self._help[name]}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            return full_name
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, dict(value, buckets=list(value['buckets'])))
+                                for key, value in self._histograms.items())
+
+        previous = None
+        for (name, labels), value in counters:
+            if name != previous:
+                full_name = header(name, 'counter')
+                previous = name
+            lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+
+        previous = None
+        for (name, labels), histogram in histograms:
+            if name != previous:
+                full_name = header(name, 'histogram')
+                previous = name
+            for bound, count in zip(self.buckets, histogram['buckets']):
+                lines.append(f'{full_name}_bucket{_format_labels(labels + (("le", repr(bound)),))} {count}')
+            lines.append(f'{full_name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {histogram["count"]}')
+            lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(histogram["sum"])}')
+            lines.append(f'{full_name}_count{_format_labels(labels)} {histogram["count"]}')
+
+        previous = None
+        for name, labels, value in sorted(gauges, key=lambda gauge: gauge[0]):
+            if name != previous:
+                full_name = header(name, 'gauge')
+                previous = name
+            lines.append(f'{full_name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
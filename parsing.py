@@ -0,0 +1,239 @@
+import json
+import re
+
+_decoder = json.JSONDecoder()
+
+# The seven fields prompt.txt asks for and the values each one allows
+SENTIMENTS = ('positive', 'neutral', 'negative')
+EMOTIONS = ('high_arousal_positive', 'high_arousal_negative', 'low_arousal_positive',
+            'low_arousal_negative', 'mixed', 'other')
+FRAMES = ('conflict', 'human-interest', 'responsibility', 'morality', 'economic', 'strategy',
+          'justice/rights', 'other')
+LANGUAGE_MIXES = ('Hindi', 'English', 'Hinglish', 'Other')
+IDEOLOGY_RANGE = (-2, 2)
+MAX_TOPICS = 3
+ANALYSIS_FIELDS = ('sentiment', 'emotion', 'frame', 'ideology_score', 'topics', 'language_mix', 'agency_subject')
+
+# Near-miss spellings of the frame values
+FRAME_ALIASES = {
+    'justice': 'justice/rights',
+    'rights': 'justice/rights',
+    'justice-rights': 'justice/rights',
+    'justice-and-rights': 'justice/rights',
+    'human': 'human-interest'
+}
+
+# How each field is described when it is asked for again on its own
+FIELD_DESCRIPTIONS = {
+    'sentiment': 'one of ' + ', '.join(f'"{value}"' for value in SENTIMENTS),
+    'emotion': 'one of ' + ', '.join(f'"{value}"' for value in EMOTIONS),
+    'frame': 'one of ' + ', '.join(f'"{value}"' for value in FRAMES),
+    'ideology_score': 'an integer from -2 (strongly anti-government) to 2 (strongly pro-government)',
+    'topics': f'a list of up to {MAX_TOPICS} key topics or named entities',
+    'language_mix': 'one of ' + ', '.join(f'"{value}"' for value in LANGUAGE_MIXES),
+    'agency_subject': 'the main actor driving the action in at most 3 words, or "implied"'
+}
+
+# Python literals models sometimes write instead of JSON ones
+_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_CLOSING = {'{': '}', '[': ']'}
+_NEXT_CHAR = re.compile(r'\s*(.?)', re.DOTALL)
+_WORD = re.compile(r'\w+')
+
+def strip_code_fences(text):
+    """Remove Markdown code fences such as ```json ... ``` around a response"""
+    return re.sub(r'```[a-zA-Z]*', '', text)
+
+def repair_json(text, start=0):
+    """Rewrite the JSON value starting at text[start] into strict JSON.
+
+    Fixes the defects models commonly produce: single-quoted strings, trailing
+    commas, Python True/False/None, curly quotes and raw newlines inside
+    strings. Returns (json_text, end) where end is the index just past the
+    value in text, or None when the brackets never balance (a truncated answer).
+    """
+    out = []
+    stack = []
+    quote = None  # closing delimiter of the string being copied
+    i = start
+    while i < len(text):
+        char = text[i]
+        if quote is not None:
+            if char == '\\' and i + 1 < len(text):
+                following = text[i + 1]
+                # \' is not a JSON escape
+                out.append(following if following == "'" else char + following)
+                i += 2
+                continue
+            closes = char == quote
+            if closes and quote == "'":
+                # An apostrophe inside a single-quoted string, unless a delimiter follows
+                closes = _NEXT_CHAR.match(text, i + 1).group(1) in ('', ',', ':', '}', ']')
+            if closes:
+                out.append('"')
+                quote = None
+            elif char == '"':
+                out.append('\\"')
+            elif char == '\n':
+                out.append('\\n')
+            else:
+                out.append(char)
+            i += 1
+            continue
+
+        if char in '"\'“':
+            quote = '”' if char == '“' else char
+            out.append('"')
+        elif char in _CLOSING:
+            stack.append(_CLOSING[char])
+            out.append(char)
+        elif char in '}]':
+            if not stack or stack.pop() != char:
+                return None
+            out.append(char)
+            if not stack:
+                return ''.join(out), i + 1
+        elif char == ',':
+            if _NEXT_CHAR.match(text, i + 1).group(1) not in ('}', ']'):
+                out.append(char)
+        elif char.isalpha():
+            word = _WORD.match(text, i).group()
+            out.append(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(char)
+        i += 1
+    return None
+
+def extract_json_values(text):
+    """Return every top-level JSON object or array found in the text, in order.
+
+    Values that are not strict JSON go through repair_json before being given up on.
+    """
+    text = strip_code_fences(text)
+    values = []
+    position = 0
+    while True:
+        starts = [i for i in (text.find('{', position), text.find('[', position)) if i != -1]
+        if not starts:
+            break
+        start = min(starts)
+        try:
+            value, end = _decoder.raw_decode(text, start)
+        except ValueError:
+            repaired = repair_json(text, start)
+            try:
+                value, end = json.loads(repaired[0]), repaired[1]
+            except (TypeError, ValueError):
+                position = start + 1
+                continue
+        values.append(value)
+        position = end
+    return values
+
+def _normalize_ideology(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and re.fullmatch(r'\s*[+-]?\d+(\.0+)?\s*', value):
+        value = float(value)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int) and IDEOLOGY_RANGE[0] <= value <= IDEOLOGY_RANGE[1]:
+        return value
+    return None
+
+def _normalize_topics(value):
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(topic, (str, int, float)) for topic in value):
+        return None
+    topics = [str(topic).strip() for topic in value if str(topic).strip()]
+    return topics[:MAX_TOPICS]
+
+def normalize_field(field, value):
+    """Canonical form of one analysis field, or None when the value is not allowed"""
+    if field == 'ideology_score':
+        return _normalize_ideology(value)
+    if field == 'topics':
+        return _normalize_topics(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    if field == 'agency_subject':
+        return value
+    if field == 'language_mix':
+        matches = [allowed for allowed in LANGUAGE_MIXES if allowed.lower() == value.lower()]
+        return matches[0] if matches else None
+    value = value.lower()
+    if field == 'sentiment':
+        return value if value in SENTIMENTS else None
+    if field == 'emotion':
+        value = re.sub(r'[\s-]+', '_', value)
+        return value if value in EMOTIONS else None
+    if field == 'frame':
+        value = re.sub(r'[\s_]+', '-', re.sub(r'\s*/\s*', '/', value))
+        value = FRAME_ALIASES.get(value, value)
+        return value if value in FRAMES else None
+    return None
+
+def validate_analysis(analysis, fields=ANALYSIS_FIELDS):
+    """Check an analysis against the prompt's schema; returns (cleaned, invalid fields).
+
+    cleaned holds the normalized value of every valid field in fields; a field
+    that is missing or has a value outside its allowed set is listed as invalid.
+    """
+    cleaned = {}
+    invalid = []
+    for field in fields:
+        value = normalize_field(field, analysis.get(field))
+        if value is None:
+            invalid.append(field)
+        else:
+            cleaned[field] = value
+    return cleaned, invalid
+
+def describe_fields(fields):
+    """Bullet list of fields and their allowed values, for asking again for just those fields"""
+    return '\n'.join(f'- "{field}": {FIELD_DESCRIPTIONS[field]}' for field in fields)
+
+def parse_analysis_response(text):
+    """Return the first JSON object in a single-title response"""
+    for value in extract_json_values(text):
+        if isinstance(value, dict):
+            return value
+    raise ValueError("No JSON object found in LLM response")
+
+def parse_batch_response(text, count):
+    """Parse a batched response into a {position: analysis} dict.
+
+    Titles are numbered from 1 in the batch prompt; returned positions are
+    0-based. Objects with a missing or out-of-range index are skipped, so the
+    caller can retry exactly the titles that are absent from the result.
+    """
+    items = None
+    for value in extract_json_values(text):
+        if isinstance(value, dict) and isinstance(value.get('results'), list):
+            value = value['results']
+        if isinstance(value, list):
+            items = value
+            break
+    if items is None:
+        raise ValueError("No JSON array found in LLM response")
+
+    objects = [item for item in items if isinstance(item, dict)]
+    parsed = {}
+    for item in objects:
+        try:
+            position = int(item.get('index')) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= position < count and position not in parsed:
+            analysis = dict(item)
+            analysis.pop('index', None)
+            parsed[position] = analysis
+
+    # Fall back to list order when the model left out the indices entirely
+    if not parsed and len(objects) == count:
+        parsed = {position: item for position, item in enumerate(objects)}
+    return parsed
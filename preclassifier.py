@@ -0,0 +1,351 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+
+# Fields the linear classifier learns from cached LLM analyses; language_mix comes from the script detector
+CLASSIFIER_FIELDS = ('sentiment', 'emotion', 'frame', 'ideology_score')
+
+# Common romanized Hindi function words; Latin-script titles using them are Hinglish
+HINGLISH_WORDS = {
+    'hai', 'hain', 'ka', 'ki', 'ke', 'ko', 'se', 'ne', 'mein', 'main', 'par', 'pe', 'aur', 'bhi', 'nahi',
+    'nahin', 'kya', 'kyun', 'kaise', 'kab', 'kaun', 'ye', 'yeh', 'wo', 'woh', 'tak', 'wala', 'wali', 'hua',
+    'hui', 'kar', 'karo', 'diya', 'gaya', 'gayi', 'raha', 'rahi', 'sab', 'abhi', 'ab', 'jab', 'tab', 'toh',
+    'bada', 'badi', 'sarkar', 'desh', 'log', 'baat', 'khabar', 'kahani', 'sach', 'jhooth', 'bhai', 'ji'
+}
+
+_WORD = re.compile(r'\w+')
+
+def _script(ch):
+    code = ord(ch)
+    if 0x0900 <= code <= 0x097F or 0xA8E0 <= code <= 0xA8FF:
+        return 'devanagari'
+    if ch.isascii():
+        return 'latin'
+    if unicodedata.category(ch).startswith('L') and 'LATIN' in unicodedata.name(ch, ''):
+        return 'latin'
+    return 'other'
+
+def detect_language_mix(title):
+    """Infer prompt.txt's language_mix from the title's scripts; returns (label, confidence)"""
+    counts = {'devanagari': 0, 'latin': 0, 'other': 0}
+    for ch in title:
+        if unicodedata.category(ch)[0] in 'LM':
+            counts[_script(ch)] += 1
+    letters = sum(counts.values())
+    if not letters:
+        return 'Other', 0.0
+    devanagari = counts['devanagari'] / letters
+    latin = counts['latin'] / letters
+    if counts['other'] / letters > 0.5:
+        return 'Other', counts['other'] / letters
+
+    words = [word.lower() for word in _WORD.findall(title) if word.isascii()]
+    hinglish_words = sum(1 for word in words if word in HINGLISH_WORDS)
+    if devanagari >= 0.9:
+        return 'Hindi', devanagari
+    if latin >= 0.9:
+        if hinglish_words >= 2:
+            return 'Hinglish', min(0.95, 0.6 + 0.1 * hinglish_words)
+        if hinglish_words == 1:
+            return 'English', 0.6
+        # Short all-Latin titles are often names or romanized Hindi
+        return 'English', min(0.98, 0.7 + 0.04 * len(words))
+    # Both scripts in substantial amounts
+    return 'Hinglish', 1 - abs(devanagari - latin)
+
+def extract_features(title, buckets=1 << 18):
+    """Hashed word unigrams, bigrams and character 4-grams of a title"""
+    text = unicodedata.normalize('NFKC', title).casefold()
+    words = _WORD.findall(text)
+    tokens = [f'w:{word}' for word in words]
+    tokens += [f'b:{first} {second}' for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f' {word} '
+        tokens += [f'c:{padded[i:i + 4]}' for i in range(max(1, len(padded) - 3))]
+    # crc32 is stable across processes, unlike hash(), so saved models stay valid
+    return {zlib.crc32(token.encode('utf-8')) % buckets for token in tokens}
+
+def _label(analysis, field):
+    value = analysis.get(field)
+    if value is None or value == '':
+        return None
+    return str(value).strip().lower()
+
+class _NaiveBayes:
+    """Multinomial naive Bayes over hashed features with a temperature for calibrated confidences"""
+
+    def __init__(self, classes, log_priors, log_likelihoods, temperature=1.0):
+        self.classes = classes
+        self.log_priors = log_priors
+        self.log_likelihoods = log_likelihoods
+        self.temperature = temperature
+
+    @classmethod
+    def train(cls, examples, alpha=0.5, min_count=2):
+        """examples: [(feature set, label)]"""
+        classes = sorted({label for _, label in examples})
+        index = {label: position for position, label in enumerate(classes)}
+        class_counts = [0] * len(classes)
+        feature_counts = {}
+        for features, label in examples:
+            position = index[label]
+            class_counts[position] += 1
+            for feature in features:
+                counts = feature_counts.get(feature)
+                if counts is None:
+                    counts = feature_counts[feature] = [0] * len(classes)
+                counts[position] += 1
+        # Rare features mostly add noise and size
+        feature_counts = {feature: counts for feature, counts in feature_counts.items() if sum(counts) >= min_count}
+        totals = [0] * len(classes)
+        for counts in feature_counts.values():
+            for position, count in enumerate(counts):
+                totals[position] += count
+        vocabulary = len(feature_counts) + 1
+        denominators = [math.log(total + alpha * vocabulary) for total in totals]
+        log_likelihoods = {
+            feature: [math.log(count + alpha) - denominators[position] for position, count in enumerate(counts)]
+            for feature, counts in feature_counts.items()
+        }
+        log_priors = [math.log(count / len(examples)) for count in class_counts]
+        return cls(classes, log_priors, log_likelihoods)
+
+    def scores(self, features):
+        # Features never seen in training carry no evidence for any class
+        scores = list(self.log_priors)
+        for feature in features:
+            likelihoods = self.log_likelihoods.get(feature)
+            if likelihoods is None:
+                continue
+            for position, value in enumerate(likelihoods):
+                scores[position] += value
+        return scores
+
+    def predict(self, features, temperature=None):
+        """(label, probability) of the most likely class"""
+        scores = self.scores(features)
+        temperature = temperature or self.temperature
+        best = max(scores)
+        weights = [math.exp((score - best) / temperature) for score in scores]
+        position = weights.index(max(weights))
+        return self.classes[position], weights[position] / sum(weights)
+
+    def calibrate(self, examples):
+        """Pick the temperature minimising log loss on held-out examples (naive Bayes is overconfident)"""
+        scored = [(self.scores(features), self.classes.index(label) if label in self.classes else None)
+                  for features, label in examples]
+        scored = [(scores, target) for scores, target in scored if target is not None]
+        if not scored:
+            return
+        best_loss = None
+        for temperature in (1, 2, 3, 5, 8, 12, 20, 30, 50):
+            loss = 0.0
+            for scores, target in scored:
+                top = max(scores)
+                total = sum(math.exp((score - top) / temperature) for score in scores)
+                loss -= (scores[target] - top) / temperature - math.log(total)
+            if best_loss is None or loss < best_loss:
+                best_loss = loss
+                self.temperature = temperature
+
+    def to_dict(self):
+        return {
+            'classes': self.classes,
+            'log_priors': self.log_priors,
+            'temperature': self.temperature,
+            'log_likelihoods': {str(feature): [round(value, 4) for value in values]
+                                for feature, values in self.log_likelihoods.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['classes'], data['log_priors'],
+            {int(feature): values for feature, values in data['log_likelihoods'].items()},
+            data['temperature']
+        )
+
+class PreClassifier:
+    """Local CPU-only tier answering easy titles without an LLM call.
+
+    language_mix comes from a Devanagari/Latin script detector; sentiment,
+    emotion, frame and ideology_score from per-field naive Bayes models trained
+    on cached LLM analyses. A title is answered locally only when every field
+    clears its confidence threshold; for the rest the LLM answer is compared
+    with the local guess to track agreement.
+    """
+
+    def __init__(self, path=None, thresholds=None):
+        self.path = path
+        self.thresholds = thresholds or {}
+        self.models = {}
+        self.info = {}
+        self._lock = threading.Lock()
+        self._reset_counters()
+        if path:
+            try:
+                self.load(path)
+            except FileNotFoundError:
+                pass
+
+    def _reset_counters(self):
+        self.counters = {'predicted': 0, 'answered_locally': 0, 'sent_to_llm': 0}
+        self.agreement = {
+            field: {'compared': 0, 'agreed': 0, 'confident_compared': 0, 'confident_agreed': 0}
+            for field in CLASSIFIER_FIELDS + ('language_mix',)
+        }
+
+    @property
+    def trained(self):
+        return bool(self.models)
+
+    def train(self, entries, min_examples=200, holdout=0.1, seed=0):
+        """Fit the field models on (title, analysis) pairs from the result cache and save them"""
+        entries = list(entries)
+        if len(entries) < min_examples:
+            raise ValueError(f"Need at least {min_examples} cached analyses to train, found {len(entries)}")
+        random.Random(seed).shuffle(entries)
+        split = max(1, int(len(entries) * holdout))
+        validation, training = entries[:split], entries[split:]
+        training_features = [extract_features(title) for title, _ in training]
+        validation_features = [extract_features(title) for title, _ in validation]
+
+        models = {}
+        evaluation = {}
+        for field in CLASSIFIER_FIELDS:
+            examples = [(features, _label(analysis, field))
+                        for features, (_, analysis) in zip(training_features, training)]
+            examples = [(features, label) for features, label in examples if label is not None]
+            held_out = [(features, _label(analysis, field))
+                        for features, (_, analysis) in zip(validation_features, validation)]
+            held_out = [(features, label) for features, label in held_out if label is not None]
+            if not examples:
+                continue
+            model = _NaiveBayes.train(examples)
+            model.calibrate(held_out)
+            models[field] = model
+            evaluation[field] = self._evaluate(field, model, held_out)
+
+        language_mix = [(detect_language_mix(title), _label(analysis, 'language_mix')) for title, analysis in validation]
+        evaluation['language_mix'] = self._summarize(
+            'language_mix', [(label.lower(), confidence, target) for (label, confidence), target in language_mix if target]
+        )
+
+        with self._lock:
+            self.models = models
+            self.info = {
+                'trained_at': time.time(),
+                'examples': len(training),
+                'validation_examples': len(validation),
+                'validation': evaluation
+            }
+            self._reset_counters()
+        if self.path:
+            self.save(self.path)
+        return self.info
+
+    def _evaluate(self, field, model, held_out):
+        predictions = []
+        for features, target in held_out:
+            label, confidence = model.predict(features)
+            predictions.append((label, confidence, target))
+        return self._summarize(field, predictions)
+
+    def _summarize(self, field, predictions):
+        """Accuracy overall and on the titles above the field's threshold (its coverage)"""
+        threshold = self.thresholds.get(field, 0.9)
+        confident = [(label, target) for label, confidence, target in predictions if confidence >= threshold]
+        total = len(predictions)
+        return {
+            'accuracy': round(sum(label == target for label, _, target in predictions) / total, 4) if total else 0.0,
+            'threshold': threshold,
+            'coverage': round(len(confident) / total, 4) if total else 0.0,
+            'confident_accuracy': round(sum(label == target for label, target in confident) / len(confident), 4)
+            if confident else 0.0
+        }
+
+    def predict(self, title):
+        """Local guess for every field: {field: (value, confidence)}; empty if untrained"""
+        with self._lock:
+            models = dict(self.models)
+        if not models:
+            return {}
+        features = extract_features(title)
+        prediction = {'language_mix': detect_language_mix(title)}
+        for field, model in models.items():
+            label, confidence = model.predict(features)
+            if field == 'ideology_score' and re.fullmatch(r'-?\d+', label):
+                label = int(label)
+            prediction[field] = (label, confidence)
+        with self._lock:
+            self.counters['predicted'] += 1
+        return prediction
+
+    def is_confident(self, prediction):
+        return bool(prediction) and all(
+            confidence >= self.thresholds.get(field, 0.9) for field, (_, confidence) in prediction.items()
+        ) and all(field in prediction for field in CLASSIFIER_FIELDS)
+
+    def answer(self, title, prediction):
+        """Partial analysis from a confident prediction; topics and agency_subject need the LLM and are left out"""
+        with self._lock:
+            self.counters['answered_locally'] += 1
+        return {field: value for field, (value, _) in prediction.items()}
+
+    def record_agreement(self, prediction, analysis):
+        """Compare a local guess with the LLM's answer for the same title"""
+        if not prediction:
+            return
+        with self._lock:
+            self.counters['sent_to_llm'] += 1
+            for field, (value, confidence) in prediction.items():
+                target = _label(analysis, field)
+                if target is None:
+                    continue
+                agreed = str(value).lower() == target
+                stats = self.agreement[field]
+                stats['compared'] += 1
+                stats['agreed'] += agreed
+                if confidence >= self.thresholds.get(field, 0.9):
+                    stats['confident_compared'] += 1
+                    stats['confident_agreed'] += agreed
+
+    def stats(self):
+        with self._lock:
+            agreement = {
+                field: dict(
+                    counts,
+                    agreement_rate=round(counts['agreed'] / counts['compared'], 4) if counts['compared'] else 0.0,
+                    confident_agreement_rate=round(counts['confident_agreed'] / counts['confident_compared'], 4)
+                    if counts['confident_compared'] else 0.0
+                )
+                for field, counts in self.agreement.items()
+            }
+            return {
+                'trained': bool(self.models),
+                'thresholds': self.thresholds,
+                **self.info,
+                **self.counters,
+                'agreement': agreement
+            }
+
+    def save(self, path):
+        with self._lock:
+            data = {
+                'info': self.info,
+                'models': {field: model.to_dict() for field, model in self.models.items()}
+            }
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+
+    def load(self, path):
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        with self._lock:
+            self.models = {field: _NaiveBayes.from_dict(model) for field, model in data['models'].items()}
+            self.info = data.get('info', {})
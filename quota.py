@@ -0,0 +1,73 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+# YouTube Data API v3 cost in quota units per call
+YOUTUBE_QUOTA_COSTS = {
+    'search.list': 100,
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'commentThreads.list': 1,
+}
+
+class QuotaExceededError(Exception):
+    """Raised when a call would take an API key past its daily quota"""
+
+def mask_key(api_key):
+    """Identify a key in reports without revealing it"""
+    return f"...{api_key[-4:]}" if api_key and len(api_key) > 4 else '...'
+
+class QuotaTracker:
+    """Per-key accounting of YouTube quota units used today; clock returns epoch seconds"""
+
+    def __init__(self, daily_units, clock=time.time):
+        self.daily_units = daily_units
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._day = None
+        self._units = {}
+        self._calls = {}
+
+    def _roll_day(self):
+        # YouTube quotas reset at midnight Pacific; UTC days are close enough for accounting
+        today = datetime.fromtimestamp(self._clock(), timezone.utc).date()
+        if today != self._day:
+            self._day = today
+            self._units.clear()
+            self._calls.clear()
+
+    def charge(self, api_key, method):
+        """Account for one call, refusing calls that would exceed the daily quota"""
+        cost = YOUTUBE_QUOTA_COSTS.get(method, 1)
+        with self._lock:
+            self._roll_day()
+            used = self._units.get(api_key, 0)
+            if self.daily_units > 0 and used + cost > self.daily_units:
+                raise QuotaExceededError(
+                    f"YouTube quota exhausted for key {mask_key(api_key)} ({used}/{self.daily_units} units used today)"
+                )
+            self._units[api_key] = used + cost
+            self._calls[api_key] = self._calls.get(api_key, 0) + 1
+
+    def remaining(self, api_key):
+        """Units left today for this key"""
+        with self._lock:
+            self._roll_day()
+            return self.daily_units - self._units.get(api_key, 0)
+
+    def stats(self):
+        """Units and calls used today per (masked) key"""
+        with self._lock:
+            self._roll_day()
+            return {
+                'day': self._day.isoformat(),
+                'daily_units': self.daily_units,
+                'keys': {
+                    mask_key(api_key): {
+                        'units_used': units,
+                        'calls': self._calls.get(api_key, 0),
+                        'units_remaining': self.daily_units - units
+                    }
+                    for api_key, units in self._units.items()
+                }
+            }
@@ -0,0 +1,260 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from quota import QuotaExceededError, mask_key
+
+# HTTP statuses worth retrying: throttling and transient server errors
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429}
+
+def get_status_code(error):
+    """Best-effort HTTP status of an exception raised by the OpenAI, Gemini or YouTube clients"""
+    for attribute in ('status_code', 'code', 'http_status'):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, 'resp', None)  # googleapiclient.errors.HttpError
+    status = getattr(response, 'status', None)
+    if status is not None:
+        try:
+            return int(status)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+def get_retry_after(error):
+    """Seconds a throttled provider asked us to wait (its Retry-After header), or None"""
+    response = getattr(error, 'response', None)  # OpenAI and other httpx-based clients
+    headers = getattr(response, 'headers', None)
+    if headers is None:
+        # googleapiclient.errors.HttpError keeps the headers on resp, an httplib2 Response (a dict)
+        headers = getattr(error, 'resp', None)
+    if not hasattr(headers, 'get'):
+        return None
+    value = headers.get('retry-after') or headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        # HTTP-date form, e.g. "Wed, 21 Oct 2015 07:28:00 GMT"
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def classify_error(error):
+    """Return 'throttled', 'transient' or None (not retryable) for an exception"""
+    if isinstance(error, QuotaExceededError):
+        # Our own daily quota check; retrying cannot help until tomorrow
+        return None
+    status = get_status_code(error)
+    if status in THROTTLE_STATUSES:
+        return 'throttled'
+    if status in RETRYABLE_STATUSES:
+        return 'transient'
+    if status is not None:
+        return None
+    message = str(error).lower()
+    if 'rate limit' in message or 'resource has been exhausted' in message or 'quota' in message:
+        return 'throttled'
+    if 'timed out' in message or 'timeout' in message or 'connection' in message or 'unavailable' in message:
+        return 'transient'
+    return None
+
+class TokenBucket:
+    """Classic token bucket refilled at rate_per_minute, holding up to burst tokens.
+
+    clock and sleep default to time.monotonic and time.sleep; tests pass fakes.
+    """
+
+    def __init__(self, rate_per_minute, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, rate_per_minute // 6))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def wait_time(self):
+        """Seconds until a token would be available, without taking one"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            tokens = min(self.capacity, self._tokens + (self._clock() - self._updated) * self.rate)
+            return max(0.0, (1 - tokens) / self.rate)
+
+class AdaptiveLimiter:
+    """Token bucket plus an AIMD concurrency limit and retries with jittered backoff.
+
+    The concurrency limit halves whenever the provider throttles us, shrinks by
+    a quarter on transient server errors, and grows back by roughly one slot per
+    limit's worth of successful calls. A retry waits at least as long as the
+    provider's Retry-After header asks, up to max_delay.
+    """
+
+    def __init__(self, rate_per_minute, max_concurrency, max_retries=4, base_delay=1.0, max_delay=60.0,
+                 clock=time.monotonic, sleep=time.sleep, rng=None):
+        self.bucket = TokenBucket(rate_per_minute, clock=clock, sleep=sleep)
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self.stats = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'throttled': 0,
+            'transient_errors': 0,
+            'retries': 0,
+            'rate_wait_seconds': 0.0,
+            'concurrency_wait_seconds': 0.0,
+            'backoff_seconds': 0.0,
+        }
+
+    def _enter(self):
+        started = self._clock()
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+            self.stats['concurrency_wait_seconds'] += self._clock() - started
+
+    def _exit(self, outcome):
+        with self._condition:
+            self._in_flight -= 1
+            if outcome == 'throttled':
+                self._limit = max(1.0, self._limit / 2)
+            elif outcome == 'transient':
+                self._limit = max(1.0, self._limit * 0.75)
+            elif outcome == 'success':
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    def call(self, function, *args, **kwargs):
+        """Run function under the rate and concurrency limits, retrying throttles and transient errors"""
+        return self._call(self.max_retries, function, args, kwargs)
+
+    def attempt(self, function, *args, **kwargs):
+        """Run function under the rate and concurrency limits once, without retries"""
+        return self._call(0, function, args, kwargs)
+
+    def _call(self, max_retries, function, args, kwargs):
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            self._enter()
+            outcome = 'error'
+            retry_after = None
+            try:
+                result = function(*args, **kwargs)
+                outcome = 'success'
+                return result
+            except Exception as e:
+                kind = classify_error(e)
+                if kind is not None:
+                    outcome = kind
+                    retry_after = get_retry_after(e)
+                if kind is None or attempt >= max_retries:
+                    raise
+            finally:
+                self._exit(outcome)
+                with self._condition:
+                    self.stats['calls'] += 1
+                    self.stats['rate_wait_seconds'] += waited
+                    if outcome == 'success':
+                        self.stats['successes'] += 1
+                    elif outcome == 'throttled':
+                        self.stats['throttled'] += 1
+                    elif outcome == 'transient':
+                        self.stats['transient_errors'] += 1
+                    if outcome != 'success' and (outcome == 'error' or attempt >= max_retries):
+                        self.stats['failures'] += 1
+
+            # Exponential backoff with full jitter, but never sooner than the provider asked
+            delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, min(self.max_delay, retry_after))
+            with self._condition:
+                self.stats['retries'] += 1
+                self.stats['backoff_seconds'] += delay
+            self._sleep(delay)
+            attempt += 1
+
+    def expected_wait(self, call_seconds):
+        """Rough seconds until a new call would complete: waiting for a token, then the call slowed by the load"""
+        with self._condition:
+            return self.bucket.wait_time() + call_seconds * (1 + self._in_flight / max(1, int(self._limit)))
+
+    def snapshot(self):
+        with self._condition:
+            stats = dict(self.stats)
+            stats['concurrency_limit'] = int(self._limit)
+            stats['max_concurrency'] = self.max_concurrency
+            stats['in_flight'] = self._in_flight
+            stats['throttle_rate'] = round(stats['throttled'] / stats['calls'], 4) if stats['calls'] else 0.0
+            # Time spent waiting on limits or backing off rather than doing work
+            stats['throttle_delay_seconds'] = round(
+                stats['rate_wait_seconds'] + stats['concurrency_wait_seconds'] + stats['backoff_seconds'], 3
+            )
+            for key in ('rate_wait_seconds', 'concurrency_wait_seconds', 'backoff_seconds'):
+                stats[key] = round(stats[key], 3)
+            return stats
+
+class RateLimiterRegistry:
+    """One AdaptiveLimiter per (provider, API key), created on first use"""
+
+    def __init__(self, settings):
+        # provider -> dict(rate_per_minute=..., max_concurrency=..., max_retries=...)
+        self._settings = settings
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider, api_key):
+        key = (provider, api_key)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = AdaptiveLimiter(**self._settings[provider])
+            return limiter
+
+    def call(self, provider, api_key, function, *args, **kwargs):
+        return self.get(provider, api_key).call(function, *args, **kwargs)
+
+    def attempt(self, provider, api_key, function, *args, **kwargs):
+        return self.get(provider, api_key).attempt(function, *args, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            limiters = list(self._limiters.items())
+        return {
+            f"{provider}:{mask_key(api_key)}": limiter.snapshot()
+            for (provider, api_key), limiter in limiters
+        }
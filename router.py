@@ -0,0 +1,223 @@
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from quota import mask_key
+
+# Latency samples kept per target for the hedging quantile
+LATENCY_WINDOW = 200
+
+def split_keys(value):
+    """API keys in a comma, whitespace or newline separated pool string, in order and without repeats"""
+    keys = []
+    for key in re.split(r'[\s,]+', value or ''):
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+def model_provider(model):
+    """Provider serving a model name as returned by get_model_name"""
+    return 'chatgpt' if model == 'chatgpt' else 'gemini'
+
+class TargetStats:
+    """Observed latency and failures of one (provider, model, key) target"""
+
+    def __init__(self):
+        self.latency = None  # exponentially weighted moving average, seconds
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def record(self, seconds):
+        self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+        self.samples.append(seconds)
+
+    def quantile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class LLMRouter:
+    """Chooses which (provider, model, API key) target serves each LLM call.
+
+    Every key of the requested model's pool is a candidate; the fallback models
+    of LLM_FALLBACKS follow once they have a key of their own. Candidates are
+    ranked by model preference, then by expected completion time from observed
+    latency and how busy the key's rate limiter is. A failed call moves on to
+    the next key right away and puts the failed target in a cooldown that
+    doubles with consecutive failures; the last key tried for a model gets the
+    limiter's retries with backoff before the next model is. With hedging on, a call still running past
+    the hedge_quantile of its target's latency is duplicated on the next
+    candidate and the first answer wins.
+    """
+
+    def __init__(self, limiters, fallbacks=None, cooldown_seconds=30.0, hedge_quantile=0.0,
+                 hedge_min_seconds=2.0, hedge_min_samples=20, max_workers=8, clock=time.time):
+        self.limiters = limiters
+        self.fallbacks = fallbacks or {}
+        self.cooldown_seconds = cooldown_seconds
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self.clock = clock
+        self._stats = {}
+        self._lock = threading.Lock()
+        # Hedged calls run on their own pool so waiting on them never blocks the LLM workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='llm-hedge'
+        ) if hedge_quantile > 0 else None
+
+    def targets(self, provider, model, keys):
+        """Candidate targets for a call to model; keys maps provider -> pool string or list"""
+        targets = []
+        for candidate in [model] + list(self.fallbacks.get(model, [])):
+            candidate_provider = provider if candidate == model else model_provider(candidate)
+            pool = keys.get(candidate_provider) or []
+            for key in (split_keys(pool) if isinstance(pool, str) else pool):
+                target = (candidate_provider, candidate, key)
+                if target not in targets:
+                    targets.append(target)
+        return targets
+
+    def _target_stats(self, target):
+        with self._lock:
+            stats = self._stats.get(target)
+            if stats is None:
+                stats = self._stats[target] = TargetStats()
+            return stats
+
+    def rank(self, targets):
+        """Targets in the order they should be tried"""
+        now = self.clock()
+        models = []
+        for _, model, _ in targets:
+            if model not in models:
+                models.append(model)
+
+        def score(target):
+            stats = self._target_stats(target)
+            # Targets never measured go first so every key gets a latency estimate
+            latency = stats.latency if stats.latency is not None else 0.0
+            limiter = self.limiters.get(target[0], target[2])
+            return (stats.cooldown_until > now, models.index(target[1]), limiter.expected_wait(latency))
+        return sorted(targets, key=score)
+
+    def _hedge_delay(self, target):
+        stats = self._target_stats(target)
+        with self._lock:
+            if len(stats.samples) < self.hedge_min_samples:
+                return None
+            return max(self.hedge_min_seconds, stats.quantile(self.hedge_quantile))
+
+    def _attempt(self, target, function, retry):
+        provider, _, api_key = target
+        stats = self._target_stats(target)
+        # Latency of the call itself, leaving out rate limit waits and backoff
+        seconds = []
+
+        def timed():
+            started = time.monotonic()
+            result = function(target)
+            seconds.append(time.monotonic() - started)
+            return result
+        try:
+            if retry:
+                result = self.limiters.call(provider, api_key, timed)
+            else:
+                result = self.limiters.attempt(provider, api_key, timed)
+        except Exception:
+            with self._lock:
+                stats.calls += 1
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                backoff = 2 ** min(stats.consecutive_failures - 1, 5)
+                stats.cooldown_until = self.clock() + self.cooldown_seconds * backoff
+            raise
+        with self._lock:
+            stats.calls += 1
+            stats.consecutive_failures = 0
+            stats.cooldown_until = 0.0
+            stats.record(seconds[-1])
+        return result
+
+    def _count(self, target, counter):
+        stats = self._target_stats(target)
+        with self._lock:
+            setattr(stats, counter, getattr(stats, counter) + 1)
+
+    def call(self, targets, function):
+        """Run function(target) on the best target, failing over (and hedging) as needed; returns (result, target)"""
+        if not targets:
+            raise ValueError('No API key available for this model.')
+        candidates = self.rank(targets)
+        if self._executor is None:
+            for index, target in enumerate(candidates):
+                last = index == len(candidates) - 1
+                try:
+                    return self._attempt(target, function, last or candidates[index + 1][1] != target[1]), target
+                except Exception:
+                    if last:
+                        raise
+                    self._count(target, 'failovers')
+
+        # future -> (target, launched as a hedge)
+        pending = {}
+        error = None
+
+        def launch(hedge=False):
+            target = candidates.pop(0)
+            retry = not candidates or candidates[0][1] != target[1]
+            pending[self._executor.submit(self._attempt, target, function, retry)] = (target, hedge)
+            return target
+
+        latest = launch()
+        while pending:
+            delay = self._hedge_delay(latest) if candidates else None
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slow tail: race the same call on the next candidate
+                self._count(latest, 'hedges')
+                latest = launch(hedge=True)
+                continue
+            for future in done:
+                target, hedge = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    if candidates and not pending:
+                        self._count(target, 'failovers')
+                        latest = launch()
+                    continue
+                if hedge:
+                    self._count(target, 'hedge_wins')
+                # The losing call finishes in the background and is discarded
+                return result, target
+        raise error
+
+    def stats(self):
+        """Latency, failures, failovers and hedges per target (keys are masked)"""
+        now = self.clock()
+        with self._lock:
+            return {
+                f"{model}:{mask_key(api_key)}": {
+                    'provider': provider,
+                    'calls': stats.calls,
+                    'failures': stats.failures,
+                    'failovers': stats.failovers,
+                    'hedges': stats.hedges,
+                    'hedge_wins': stats.hedge_wins,
+                    'latency_seconds': round(stats.latency, 3) if stats.latency is not None else None,
+                    'p99_seconds': round(stats.quantile(0.99), 3) if stats.samples else None,
+                    'cooling_down_seconds': round(max(0.0, stats.cooldown_until - now), 1)
+                }
+                for (provider, model, api_key), stats in self._stats.items()
+            }
@@ -0,0 +1,46 @@
+"""
+Production server for the YouTube Sentiment Analyzer: python serve.py
+
+Serves the app with waitress (pip install waitress) when it is installed,
+otherwise with Werkzeug's threaded server. SIGTERM or Ctrl+C stops accepting
+requests, then drains background jobs for up to SHUTDOWN_TIMEOUT_SECONDS;
+jobs still running after that are interrupted and resume after a restart.
+"""
+
+import logging
+import signal
+
+from app import app, shutdown
+
+logger = logging.getLogger(__name__)
+
+def make_server(host, port, threads, connection_limit):
+    """Return the run function of a waitress server, or of Werkzeug's threaded server without waitress"""
+    try:
+        from waitress.server import create_server
+    except ImportError:
+        from werkzeug.serving import make_server as make_werkzeug_server
+        logger.warning("waitress is not installed (pip install waitress); using Werkzeug's threaded server")
+        return make_werkzeug_server(host, port, app, threaded=True).serve_forever
+    return create_server(app, host=host, port=port, threads=threads, connection_limit=connection_limit).run
+
+def main():
+    def stop(signum, frame):
+        # Both servers return from their loop on KeyboardInterrupt
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    config = app.config
+    run = make_server(config['SERVER_HOST'], config['SERVER_PORT'],
+                      config['SERVER_THREADS'], config['SERVER_CONNECTION_LIMIT'])
+    logger.info("Serving on http://%s:%s with %s threads", config['SERVER_HOST'], config['SERVER_PORT'],
+                config['SERVER_THREADS'])
+    try:
+        run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown(config['SHUTDOWN_TIMEOUT_SECONDS'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+# strftime() patterns for the time buckets of the aggregation queries
+TIME_BUCKETS = {
+    'hour': '%Y-%m-%dT%H:00',
+    'day': '%Y-%m-%d',
+    'week': '%Y-W%W',
+    'month': '%Y-%m',
+    'year': '%Y',
+}
+
+# Analysis fields copied into their own columns so they can be indexed and aggregated in SQL
+CATEGORICAL_FIELDS = ('sentiment', 'emotion', 'frame', 'language_mix')
+NUMERIC_FIELDS = ('ideology_score',)
+
+def title_video_id(title):
+    """Stable stand-in video id for titles without one (CSV uploads)"""
+    return 'title:' + hashlib.blake2b(title.encode('utf-8'), digest_size=8).hexdigest()
+
+def _timestamp(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _integer(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _split_topics(topics):
+    if isinstance(topics, str):
+        topics = topics.split(',')
+    seen = []
+    for topic in topics or []:
+        topic = ' '.join(str(topic).split()).casefold()
+        if topic and topic not in seen:
+            seen.append(topic)
+    return seen
+
+class ResultStore:
+    """SQLite store of watched channels and every analysis made by the application.
+
+    Each analysis is kept with its channel, video id, publish time, model and
+    prompt version, and the text behind every prompt version is kept too;
+    the classification fields and topics get their own indexed columns and
+    table so time-bucketed aggregates run in SQL. Each
+    watched channel keeps a high-water mark (newest video id and publishedAt
+    already analyzed) so a poll only fetches and analyzes newer uploads.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS watchlist (
+                channel_id TEXT PRIMARY KEY,
+                channel_input TEXT NOT NULL,
+                channel_name TEXT NOT NULL,
+                llm_type TEXT NOT NULL,
+                gemini_model TEXT NOT NULL,
+                interval_seconds INTEGER NOT NULL,
+                last_video_id TEXT,
+                last_published_at TEXT,
+                last_checked_at REAL,
+                next_check_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS analyses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                channel_id TEXT NOT NULL,
+                channel_name TEXT,
+                video_id TEXT NOT NULL,
+                video_title TEXT NOT NULL,
+                published_at TEXT,
+                timestamp REAL NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                sentiment TEXT,
+                emotion TEXT,
+                frame TEXT,
+                ideology_score INTEGER,
+                language_mix TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                analyzed_at REAL NOT NULL,
+                UNIQUE (channel_id, video_id, model, prompt_version)
+            );
+            CREATE INDEX IF NOT EXISTS idx_analyses_channel_time ON analyses (channel_id, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_analyses_time ON analyses (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_analyses_model ON analyses (model, prompt_version, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_analyses_video ON analyses (video_id);
+            CREATE TABLE IF NOT EXISTS analysis_topics (
+                analysis_id INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                PRIMARY KEY (analysis_id, topic)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_analysis_topics_topic ON analysis_topics (topic, analysis_id);
+            CREATE TABLE IF NOT EXISTS prompt_versions (
+                version TEXT PRIMARY KEY,
+                prompts TEXT NOT NULL,
+                first_seen REAL NOT NULL
+            );
+        ''')
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def add_channel(self, channel_id, channel_input, channel_name, llm_type, gemini_model, interval_seconds):
+        """Watch a channel (or update its settings), keeping any existing high-water mark"""
+        now = time.time()
+        self._execute('''
+            INSERT INTO watchlist (channel_id, channel_input, channel_name, llm_type, gemini_model,
+                                   interval_seconds, next_check_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (channel_id) DO UPDATE SET
+                channel_input = excluded.channel_input, channel_name = excluded.channel_name,
+                llm_type = excluded.llm_type, gemini_model = excluded.gemini_model,
+                interval_seconds = excluded.interval_seconds
+        ''', (channel_id, channel_input, channel_name, llm_type, gemini_model, interval_seconds, now, now))
+        return self.get_channel(channel_id)
+
+    def remove_channel(self, channel_id):
+        """Stop watching a channel; its stored results are kept"""
+        return self._execute('DELETE FROM watchlist WHERE channel_id = ?', (channel_id,)).rowcount > 0
+
+    def get_channel(self, channel_id):
+        rows = self._query('SELECT * FROM watchlist WHERE channel_id = ?', (channel_id,))
+        return rows[0] if rows else None
+
+    def list_channels(self):
+        """Watched channels with their stored result counts"""
+        return self._query('''
+            SELECT w.*,
+                   (SELECT COUNT(*) FROM analyses a WHERE a.channel_id = w.channel_id AND a.result IS NOT NULL) AS analyzed,
+                   (SELECT COUNT(*) FROM analyses a WHERE a.channel_id = w.channel_id AND a.result IS NULL) AS failed
+            FROM watchlist w ORDER BY w.created_at
+        ''')
+
+    def due_channels(self, now=None):
+        """Channels whose next check time has passed, most overdue first"""
+        return self._query('SELECT * FROM watchlist WHERE next_check_at <= ? ORDER BY next_check_at',
+                           (now if now is not None else time.time(),))
+
+    def schedule(self, channel_id, next_check_at):
+        self._execute('UPDATE watchlist SET next_check_at = ? WHERE channel_id = ?', (next_check_at, channel_id))
+
+    def mark_checked(self, channel_id, error=None):
+        """Record a poll and schedule the next one interval_seconds from now"""
+        now = time.time()
+        self._execute('''
+            UPDATE watchlist SET last_checked_at = ?, next_check_at = ? + interval_seconds, last_error = ?
+            WHERE channel_id = ?
+        ''', (now, now, error, channel_id))
+
+    def set_high_water_mark(self, channel_id, video_id, published_at):
+        """Remember the newest video analyzed so the next poll stops there"""
+        self._execute('UPDATE watchlist SET last_video_id = ?, last_published_at = ? WHERE channel_id = ?',
+                      (video_id, published_at, channel_id))
+
+    def add_result(self, channel_id, video_id, video_title, published_at, model, result=None, error=None,
+                   prompt_version='', channel_name=None, source='watch', analyzed_at=None):
+        """Store one analysis.
+
+        A success replaces an earlier failure of the same video, model and
+        prompt version but never another success; failures of a video are
+        dropped once it has been analyzed. Repeated failures count attempts.
+        """
+        analyzed_at = analyzed_at or time.time()
+        timestamp = _timestamp(published_at) or analyzed_at
+        fields = result or {}
+        with self._lock:
+            cursor = self._conn.execute('''
+                INSERT INTO analyses (source, channel_id, channel_name, video_id, video_title, published_at,
+                                      timestamp, model, prompt_version, sentiment, emotion, frame, ideology_score,
+                                      language_mix, result, error, analyzed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (channel_id, video_id, model, prompt_version) DO UPDATE SET
+                    video_title = excluded.video_title, sentiment = excluded.sentiment, emotion = excluded.emotion,
+                    frame = excluded.frame, ideology_score = excluded.ideology_score,
+                    language_mix = excluded.language_mix, result = excluded.result, error = excluded.error,
+                    attempts = analyses.attempts + 1, analyzed_at = excluded.analyzed_at
+                WHERE analyses.result IS NULL
+            ''', (
+                source, channel_id, channel_name, video_id, video_title, published_at, timestamp, model,
+                prompt_version, fields.get('sentiment'), fields.get('emotion'), fields.get('frame'),
+                _integer(fields.get('ideology_score')), fields.get('language_mix'),
+                json.dumps(result, ensure_ascii=False) if result is not None else None, error, analyzed_at
+            ))
+            if cursor.rowcount and result is not None:
+                analysis_id = self._conn.execute(
+                    'SELECT id FROM analyses WHERE channel_id = ? AND video_id = ? AND model = ? AND prompt_version = ?',
+                    (channel_id, video_id, model, prompt_version)
+                ).fetchone()[0]
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO analysis_topics (analysis_id, topic) VALUES (?, ?)',
+                    [(analysis_id, topic) for topic in _split_topics(fields.get('topics'))]
+                )
+                self._conn.execute(
+                    'DELETE FROM analyses WHERE channel_id = ? AND video_id = ? AND result IS NULL',
+                    (channel_id, video_id)
+                )
+            self._conn.commit()
+
+    def failed_videos(self, channel_id, limit=100, max_attempts=None):
+        """Videos whose analysis failed, to be retried on the next poll.
+
+        Videos already tried max_attempts times are left out.
+        """
+        where, params = 'channel_id = ? AND result IS NULL', [channel_id]
+        if max_attempts is not None:
+            where += ' AND attempts < ?'
+            params.append(max_attempts)
+        return self._query(f'''
+            SELECT video_id, video_title, published_at, attempts FROM analyses
+            WHERE {where} ORDER BY id LIMIT ?
+        ''', params + [limit])
+
+    def _filters(self, channel_id=None, model=None, prompt_version=None, start=None, end=None, analyzed_only=True):
+        """WHERE clause over analyses (aliased `a`); start and end are epoch seconds"""
+        conditions = ['a.result IS NOT NULL'] if analyzed_only else ['1 = 1']
+        params = []
+        for column, value in (('channel_id', channel_id), ('model', model), ('prompt_version', prompt_version)):
+            if value is not None:
+                conditions.append(f'a.{column} = ?')
+                params.append(value)
+        if start is not None:
+            conditions.append('a.timestamp >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('a.timestamp < ?')
+            params.append(end)
+        return ' AND '.join(conditions), params
+
+    def results(self, channel_id=None, since=0, limit=1000, include_failed=True, **filters):
+        """Stored analyses with id greater than since, oldest first"""
+        where, params = self._filters(channel_id=channel_id, analyzed_only=not include_failed, **filters)
+        rows = self._query(f'''
+            SELECT a.id, a.source, a.channel_id, a.channel_name, a.video_id, a.video_title, a.published_at,
+                   a.model, a.prompt_version, a.result, a.error, a.analyzed_at
+            FROM analyses a WHERE {where} AND a.id > ? ORDER BY a.id LIMIT ?
+        ''', (*params, since, limit))
+        for row in rows:
+            row['result'] = json.loads(row['result']) if row['result'] is not None else None
+        return rows
+
+    def aggregate(self, field, bucket='week', **filters):
+        """Per channel and time bucket: average, min and max of a numeric field, or counts per value of a categorical one"""
+        if bucket not in TIME_BUCKETS:
+            raise ValueError(f"Unsupported bucket: {bucket}. Choose from: {', '.join(TIME_BUCKETS)}")
+        where, params = self._filters(**filters)
+        bucket_sql = f"strftime('{TIME_BUCKETS[bucket]}', a.timestamp, 'unixepoch')"
+        if field in NUMERIC_FIELDS:
+            return self._query(f'''
+                SELECT a.channel_id, MAX(a.channel_name) AS channel_name, {bucket_sql} AS bucket,
+                       ROUND(AVG(a.{field}), 4) AS average, MIN(a.{field}) AS min, MAX(a.{field}) AS max,
+                       COUNT(a.{field}) AS count
+                FROM analyses a WHERE {where}
+                GROUP BY a.channel_id, bucket ORDER BY a.channel_id, bucket
+            ''', params)
+        if field in CATEGORICAL_FIELDS:
+            return self._query(f'''
+                SELECT a.channel_id, MAX(a.channel_name) AS channel_name, {bucket_sql} AS bucket,
+                       a.{field} AS value, COUNT(*) AS count,
+                       ROUND(1.0 * COUNT(*) / SUM(COUNT(*)) OVER (PARTITION BY a.channel_id, {bucket_sql}), 4) AS share
+                FROM analyses a WHERE {where}
+                GROUP BY a.channel_id, bucket, a.{field} ORDER BY a.channel_id, bucket, count DESC
+            ''', params)
+        raise ValueError(f"Unsupported field: {field}. Choose from: {', '.join(NUMERIC_FIELDS + CATEGORICAL_FIELDS)}")
+
+    def topic_counts(self, limit=50, bucket=None, **filters):
+        """Most frequent topics, optionally broken down by time bucket"""
+        where, params = self._filters(**filters)
+        if bucket is None:
+            return self._query(f'''
+                SELECT t.topic, COUNT(*) AS count, COUNT(DISTINCT a.channel_id) AS channels
+                FROM analysis_topics t JOIN analyses a ON a.id = t.analysis_id
+                WHERE {where} GROUP BY t.topic ORDER BY count DESC, t.topic LIMIT ?
+            ''', (*params, limit))
+        if bucket not in TIME_BUCKETS:
+            raise ValueError(f"Unsupported bucket: {bucket}. Choose from: {', '.join(TIME_BUCKETS)}")
+        # Counts per bucket for the overall top topics
+        return self._query(f'''
+            WITH top AS (
+                SELECT t.topic FROM analysis_topics t JOIN analyses a ON a.id = t.analysis_id
+                WHERE {where} GROUP BY t.topic ORDER BY COUNT(*) DESC, t.topic LIMIT ?
+            )
+            SELECT strftime('{TIME_BUCKETS[bucket]}', a.timestamp, 'unixepoch') AS bucket, t.topic, COUNT(*) AS count
+            FROM analysis_topics t JOIN analyses a ON a.id = t.analysis_id
+            WHERE {where} AND t.topic IN (SELECT topic FROM top)
+            GROUP BY bucket, t.topic ORDER BY bucket, count DESC
+        ''', (*params, limit, *params))
+
+    def add_prompt_version(self, version, prompts):
+        """Remember the prompt texts ({file name: text}) behind a prompt version the first time it is seen"""
+        self._execute(
+            'INSERT OR IGNORE INTO prompt_versions (version, prompts, first_seen) VALUES (?, ?, ?)',
+            (version, json.dumps(prompts, ensure_ascii=False), time.time())
+        )
+
+    def prompt_versions(self):
+        """Known prompt versions, newest first, with their prompt texts and number of stored analyses"""
+        rows = self._query('''
+            SELECT p.version, p.first_seen, p.prompts,
+                   (SELECT COUNT(*) FROM analyses a WHERE a.prompt_version = p.version) AS analyses
+            FROM prompt_versions p ORDER BY p.first_seen DESC
+        ''')
+        for row in rows:
+            row['prompts'] = json.loads(row['prompts'])
+        return rows
+
+    def summary(self):
+        """Row counts per source, channel count and the models and prompt versions present"""
+        rows = self._query('''
+            SELECT source, model, prompt_version, COUNT(*) AS analyses, COUNT(DISTINCT channel_id) AS channels,
+                   SUM(result IS NULL) AS failed, MIN(timestamp) AS first, MAX(timestamp) AS last
+            FROM analyses GROUP BY source, model, prompt_version ORDER BY source, model, prompt_version
+        ''')
+        return {'groups': rows, 'total': sum(row['analyses'] for row in rows)}
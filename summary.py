@@ -0,0 +1,52 @@
+from collections import Counter
+
+# Result fields summarized as value counts
+CATEGORICAL_FIELDS = ('sentiment', 'emotion', 'frame', 'language_mix')
+
+def ideology_score(result):
+    """Numeric ideology_score of a result row, or None when missing or malformed"""
+    try:
+        return float(result.get('ideology_score'))
+    except (TypeError, ValueError):
+        return None
+
+def summarize(results, top_topics=10):
+    """Value counts of the categorical fields, ideology score statistics and top topics of result rows"""
+    summary = {'total': len(results)}
+    for field in CATEGORICAL_FIELDS:
+        counts = Counter(result.get(field) for result in results if result.get(field))
+        summary[field] = dict(counts.most_common())
+    scores = [score for score in map(ideology_score, results) if score is not None]
+    summary['ideology_score'] = {
+        'average': round(sum(scores) / len(scores), 3) if scores else None,
+        'min': min(scores) if scores else None,
+        'max': max(scores) if scores else None,
+        'count': len(scores)
+    }
+    topics = Counter(
+        topic.strip().lower()
+        for result in results
+        for topic in (result.get('topics') or '').split(',') if topic.strip()
+    )
+    summary['topics'] = [{'topic': topic, 'count': count} for topic, count in topics.most_common(top_topics)]
+    return summary
+
+def compare_channels(channel_summaries):
+    """Cross-channel view: channels ranked by average ideology score and their share of each sentiment.
+
+    channel_summaries maps channel name -> summarize() output.
+    """
+    ranked = sorted(
+        ((name, summary['ideology_score']['average']) for name, summary in channel_summaries.items()
+         if summary['ideology_score']['average'] is not None),
+        key=lambda item: item[1]
+    )
+    return {
+        'ideology_ranking': [{'channel_name': name, 'average': average} for name, average in ranked],
+        'sentiment_share': {
+            name: {
+                value: round(count / summary['total'], 3) for value, count in summary['sentiment'].items()
+            }
+            for name, summary in channel_summaries.items() if summary['total']
+        }
+    }
@@ -0,0 +1,40 @@
+import pytest
+
+import app as app_module
+from cache import ChannelCache, ResultCache
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+def test_cache_purge_is_refused_without_an_admin_token(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'ADMIN_TOKEN', '')
+    response = client.post('/admin/cache/purge', json={})
+    assert response.status_code == 403
+    assert 'ADMIN_TOKEN' in response.get_json()['error']
+
+def test_cache_purge_needs_the_configured_token(client, monkeypatch, tmp_path):
+    path = str(tmp_path / 'cache.db')
+    monkeypatch.setattr(app_module, 'result_cache', ResultCache(path))
+    monkeypatch.setattr(app_module, 'channel_cache', ChannelCache(path))
+    app_module.result_cache.set('Title', 'gemini-2.5-flash', 'v1', {'sentiment': 'neutral'})
+    monkeypatch.setitem(app_module.app.config, 'ADMIN_TOKEN', 'secret')
+    assert client.post('/admin/cache/purge', json={}, headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    response = client.post('/admin/cache/purge', json={}, headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 200
+    assert response.get_json()['removed'] == 1
+
+def test_preclassifier_training_is_refused_without_an_admin_token(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'ADMIN_TOKEN', '')
+    assert client.post('/admin/preclassifier/train', json={}).status_code == 403
+
+@pytest.mark.parametrize('path', ['/store', '/store/prompt_versions', '/store/results', '/store/aggregate', '/store/topics'])
+def test_store_endpoints_are_refused_without_an_admin_token(client, monkeypatch, path):
+    monkeypatch.setitem(app_module.app.config, 'ADMIN_TOKEN', '')
+    assert client.get(path).status_code == 403
+
+def test_watchlist_results_reject_a_non_numeric_since(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'ADMIN_TOKEN', '')
+    response = client.get('/watchlist/UC1/results?since=abc')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'since must be a whole number.'
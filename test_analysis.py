@@ -0,0 +1,151 @@
+import json
+import threading
+
+import pytest
+
+import app as app_module
+from store import ResultStore
+
+VALID = {
+    'sentiment': 'negative', 'emotion': 'high_arousal_negative', 'frame': 'conflict', 'ideology_score': -1,
+    'topics': ['Delhi'], 'language_mix': 'English', 'agency_subject': 'police'
+}
+
+@pytest.fixture
+def llm(monkeypatch, tmp_path):
+    """Scripted LLM: each call pops the next response; a response that is an exception is raised"""
+    monkeypatch.setattr(app_module, 'result_cache', None)
+    monkeypatch.setattr(app_module, 'result_store', ResultStore(str(tmp_path / 'results.db')))
+    monkeypatch.setitem(app_module.app.config, 'LLM_FIELD_REPAIR_ATTEMPTS', 1)
+    responses = []
+    prompts = []
+
+    def invoke_llm(formatted_prompt, llm_type, api_key, gemini_model='gemini-2.5-flash'):
+        prompts.append(formatted_prompt)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response, gemini_model
+
+    monkeypatch.setattr(app_module, 'invoke_llm', invoke_llm)
+    return responses, prompts
+
+def test_batch_keeps_other_titles_when_one_follow_up_call_fails(llm):
+    responses, _ = llm
+    responses.extend([
+        # Out of order, so only matching by index puts each answer with its title
+        json.dumps([dict(VALID, index=3, ideology_score=2), dict(VALID, index=1), dict(VALID, index=2, sentiment='furious')]),
+        RuntimeError('503 Service Unavailable')
+    ])
+    parsed, errors = app_module.run_batch_sentiment_analysis(['one', 'two', 'three'], 'gemini', 'key')
+    assert sorted(parsed) == [0, 2]
+    assert (parsed[0]['ideology_score'], parsed[2]['ideology_score']) == (-1, 2)
+    assert errors == {1: '503 Service Unavailable'}
+
+def test_only_invalid_fields_are_asked_for_again(llm):
+    responses, prompts = llm
+    responses.extend([
+        json.dumps(dict(VALID, frame='war', ideology_score=7)),
+        json.dumps({'frame': 'conflict', 'ideology_score': -2, 'sentiment': 'positive'})
+    ])
+    analysis = app_module.run_sentiment_analysis('Clashes in Delhi', 'gemini', 'key', use_cache=False)
+    assert '"frame"' in prompts[1] and '"ideology_score"' in prompts[1]
+    assert '"sentiment"' not in prompts[1] and '"topics"' not in prompts[1]
+    # Fields that were already valid keep their first answer
+    assert (analysis['frame'], analysis['ideology_score'], analysis['sentiment']) == ('conflict', -2, 'negative')
+    assert analysis['model'] == 'gemini-2.5-flash'
+
+def test_fields_still_invalid_after_the_follow_up_fail_the_title(llm):
+    responses, prompts = llm
+    responses.extend([json.dumps(dict(VALID, emotion='rage')), "{'emotion': 'fury',}"])
+    with pytest.raises(ValueError, match='emotion'):
+        app_module.run_sentiment_analysis('Clashes in Delhi', 'gemini', 'key', use_cache=False)
+    assert len(prompts) == 2
+
+def test_no_follow_up_when_repair_attempts_are_off(llm, monkeypatch):
+    responses, prompts = llm
+    monkeypatch.setitem(app_module.app.config, 'LLM_FIELD_REPAIR_ATTEMPTS', 0)
+    responses.append(json.dumps(dict(VALID, sentiment='angry')))
+    with pytest.raises(ValueError, match='sentiment'):
+        app_module.run_sentiment_analysis('Clashes in Delhi', 'gemini', 'key', use_cache=False)
+    assert len(prompts) == 1
+
+def test_batch_retries_missing_titles_but_not_repaired_ones(llm):
+    responses, prompts = llm
+    responses.extend([
+        # Title 2 is missing and title 3 has an invalid sentiment
+        json.dumps([dict(VALID, index=1), dict(VALID, index=3, sentiment='meh')]),
+        json.dumps({'sentiment': 'neutral'}),
+        json.dumps(dict(VALID, sentiment='positive'))
+    ])
+    outcomes = app_module.analyze_batch_with_llm(['one', 'two', 'three'], 'gemini', 'key')
+    assert [analysis['sentiment'] for analysis, _ in outcomes] == ['negative', 'positive', 'neutral']
+    assert len(prompts) == 3
+    # The follow-up for title 3 asks for its sentiment only; title 2 goes through the one-title prompt
+    assert 'three' in prompts[1] and '"emotion"' not in prompts[1]
+    assert 'two' in prompts[2] and 'three' not in prompts[2]
+
+def test_local_answers_ask_the_llm_only_for_the_fields_they_leave_out(llm, monkeypatch):
+    responses, prompts = llm
+    preclassifier = app_module.PreClassifier()
+    monkeypatch.setattr(preclassifier, 'models', {'sentiment': None})
+    monkeypatch.setattr(preclassifier, 'predict', lambda title: {
+        field: (VALID[field], 1.0) for field in ('sentiment', 'emotion', 'frame', 'ideology_score', 'language_mix')
+    })
+    monkeypatch.setattr(app_module, 'preclassifier', preclassifier)
+    monkeypatch.setitem(app_module.app.config, 'PRECLASSIFIER_ENABLED', True)
+    # One call at a time, so the scripted responses go to the titles in order
+    monkeypatch.setitem(app_module.app.config, 'LLM_MAX_WORKERS', 1)
+    responses.extend([json.dumps({'topics': ['Delhi'], 'agency_subject': 'police'}), RuntimeError('503')])
+
+    results, failed = app_module.analyze_titles_with_llm(['Clashes in Delhi', 'Another title'], 'gemini', 'key')
+    assert len(prompts) == 2
+    assert '"topics"' in prompts[0] and '"agency_subject"' in prompts[0] and '"sentiment"' not in prompts[0]
+    assert [result['video_title'] for result in results] == ['Clashes in Delhi']
+    assert (results[0]['topics'], results[0]['agency_subject'], results[0]['source']) == ('Delhi', 'police', 'local')
+    assert results[0]['model'] == 'preclassifier'
+    # A local answer whose follow-up call fails is reported as failed, never stored with empty fields
+    assert failed == [{'video_title': 'Another title', 'error': '503'}]
+
+def test_hashing_prompt_files_for_evaluation_records_nothing(monkeypatch, tmp_path):
+    store = ResultStore(str(tmp_path / 'results.db'))
+    monkeypatch.setattr(app_module, 'result_store', store)
+    monkeypatch.setattr(app_module, '_prompt_versions', {})
+    version = app_module.hash_prompt_files(('prompt.txt',))
+    assert store.prompt_versions() == []
+    # The application's own version of the same files is recorded with its prompt text
+    assert app_module.get_prompt_version(('prompt.txt',)) == version
+    assert [(row['version'], list(row['prompts'])) for row in store.prompt_versions()] == [(version, ['prompt.txt'])]
+
+def test_results_keep_input_order_when_calls_finish_out_of_order(monkeypatch):
+    monkeypatch.setattr(app_module, 'result_cache', None)
+    monkeypatch.setitem(app_module.app.config, 'LLM_BATCH_SIZE', 1)
+    monkeypatch.setitem(app_module.app.config, 'LLM_BATCH_SIZES', {})
+    monkeypatch.setitem(app_module.app.config, 'LLM_MAX_WORKERS', 4)
+    monkeypatch.setitem(app_module.app.config, 'PRECLASSIFIER_ENABLED', False)
+    titles = ['Qalpha rally', 'Qbravo rally', 'Qcharlie rally', 'Qdelta rally']
+    finished = []
+    # The first title only answers once every other title has finished
+    others_done = threading.Event()
+
+    def invoke_llm(formatted_prompt, llm_type, api_key, gemini_model='gemini-2.5-flash'):
+        title = next(title for title in titles if title in formatted_prompt)
+        if title == 'Qalpha rally':
+            assert others_done.wait(5)
+        elif title == 'Qcharlie rally':
+            raise RuntimeError('500 Internal error')
+        return json.dumps(dict(VALID, topics=[title])), gemini_model
+
+    def on_result(position, title, result, error):
+        finished.append((position, error))
+        if len(finished) == 3:
+            others_done.set()
+
+    monkeypatch.setattr(app_module, 'invoke_llm', invoke_llm)
+    results, failed = app_module.analyze_titles_with_llm(titles, 'gemini', 'key', on_result=on_result)
+    assert finished[-1] == (0, None)
+    assert [(result['video_title'], result['topics']) for result in results] == [
+        (title, title) for title in ('Qalpha rally', 'Qbravo rally', 'Qdelta rally')
+    ]
+    assert failed == [{'video_title': 'Qcharlie rally', 'error': '500 Internal error'}]
+    assert dict(finished)[2] == '500 Internal error'
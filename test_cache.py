@@ -0,0 +1,61 @@
+from cache import ChannelCache, ResultCache
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    clock = Clock()
+    cache = ResultCache(str(tmp_path / 'cache.db'), ttl_seconds=60, clock=clock)
+    cache.set('Delhi  blast', 'gemini-2.5-flash', 'v1', {'sentiment': 'negative'})
+    clock.now += 60
+    # The key is the normalized title, model and prompt version
+    assert cache.get('Delhi blast', 'gemini-2.5-flash', 'v1') == {'sentiment': 'negative'}
+    assert cache.get('Delhi blast', 'gemini-2.5-flash', 'v2') is None
+    clock.now += 1
+    assert cache.get('Delhi blast', 'gemini-2.5-flash', 'v1') is None
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses'], stats['evictions']) == (0, 1, 2, 1)
+
+def test_purging_expired_entries_keeps_fresh_ones(tmp_path):
+    clock = Clock()
+    cache = ResultCache(str(tmp_path / 'cache.db'), ttl_seconds=60, clock=clock)
+    cache.set('Old title', 'chatgpt', 'v1', {})
+    clock.now += 100
+    cache.set('New title', 'chatgpt', 'v1', {})
+    assert cache.purge(expired_only=True) == 1
+    assert [title for title, _ in cache.iter_entries()] == ['New title']
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    clock = Clock()
+    cache = ResultCache(str(tmp_path / 'cache.db'), max_entries=2, clock=clock)
+    for title in ('one', 'two'):
+        cache.set(title, 'chatgpt', 'v1', {'title': title})
+        clock.now += 1
+    # Reading 'one' makes 'two' the least recently used
+    assert cache.get('one', 'chatgpt', 'v1') == {'title': 'one'}
+    clock.now += 1
+    cache.set('three', 'chatgpt', 'v1', {'title': 'three'})
+    assert cache.get('two', 'chatgpt', 'v1') is None
+    assert cache.get('one', 'chatgpt', 'v1') == {'title': 'one'}
+    # Replacing an existing entry does not count as a new one
+    cache.set('three', 'chatgpt', 'v1', {'title': 'three'})
+    assert (cache.stats()['entries'], cache.stats()['evictions']) == (2, 1)
+
+def test_channel_lookups_expire_but_uploads_playlists_do_not(tmp_path):
+    clock = Clock()
+    cache = ChannelCache(str(tmp_path / 'cache.db'), ttl_seconds=3600, clock=clock)
+    cache.set_channel_id('handle:ndtv', 'UC1')
+    cache.set_uploads_playlist_id('UC1', 'UU1')
+    clock.now += 3600
+    assert cache.get_channel_id('handle:ndtv') == 'UC1'
+    assert cache.get_channel_id('handle:aajtak') is None
+    clock.now += 1
+    assert cache.get_channel_id('handle:ndtv') is None
+    assert cache.get_uploads_playlist_id('UC1') == 'UU1'
+    assert cache.stats() == {'lookups': 1, 'playlists': 1, 'hits': 2, 'misses': 2}
+    assert cache.purge() == 1
+    assert cache.get_uploads_playlist_id('UC1') is None
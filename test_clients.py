@@ -0,0 +1,13 @@
+from collections import OrderedDict
+
+import clients
+
+def test_llm_client_cache_drops_the_least_recently_used(monkeypatch):
+    monkeypatch.setattr(clients, '_llm_clients', OrderedDict())
+    monkeypatch.setattr(clients, 'MAX_CACHED_CLIENTS', 2)
+    first = clients.get_llm_client('gemini', 'key-1')
+    clients.get_llm_client('gemini', 'key-2')
+    assert clients.get_llm_client('gemini', 'key-1') is first
+    clients.get_llm_client('gemini', 'key-3')
+    assert [key[1] for key in clients._llm_clients] == ['key-1', 'key-3']
+    assert clients.get_llm_client('gemini', 'key-1') is first
@@ -0,0 +1,40 @@
+import random
+
+from comments import CommentAggregator, StratifiedSampler, TopSampler, sample_comments
+
+def comment(index, likes=0, video_id='v1'):
+    return {'comment_id': str(index), 'video_id': video_id, 'text': f'comment {index}', 'like_count': likes, 'reply_count': 0}
+
+def test_top_sampler_keeps_most_engaged():
+    sampler = TopSampler(2)
+    for index, likes in enumerate([5, 50, 1, 20]):
+        sampler.add(comment(index, likes))
+    assert [c['like_count'] for c in sampler.sample()] == [50, 20]
+
+def test_stratified_sample_covers_every_tier():
+    comments = [comment(index, likes) for index, likes in enumerate([0] * 90 + [5] * 9 + [500])]
+    sample = list(sample_comments(comments, 'stratified', 10, random.Random(0)))
+    assert len(sample) == 10
+    assert {c['like_count'] for c in sample} == {0, 5, 500}
+    assert StratifiedSampler(10).allocation() == [0] * 5
+
+def test_video_is_reported_once_all_sampled_comments_are_counted():
+    done = []
+    aggregator = CommentAggregator(done.append)
+    comments = [comment(index) for index in range(3)]
+    aggregator.record_sampled('v1', 3)
+    aggregator.record(comments[0], {'sentiment': 'positive', 'emotion': 'other'})
+    aggregator.finish_sampling('v1')
+    assert done == []
+    aggregator.record(comments[1], None)
+    aggregator.record(comments[2], {'sentiment': 'negative', 'emotion': 'mixed'})
+    assert len(done) == 1
+    assert (done[0]['comments_analyzed'], done[0]['comments_failed'], done[0]['net_sentiment']) == (2, 1, 0.0)
+
+def test_video_without_comments_or_with_an_error_is_reported_when_sampling_ends():
+    done = []
+    aggregator = CommentAggregator(done.append)
+    aggregator.record_error('v2', 'commentsDisabled')
+    aggregator.finish_sampling('v2')
+    aggregator.finish_sampling('v2')
+    assert [(row['video_id'], row['error']) for row in done] == [('v2', 'commentsDisabled')]
@@ -0,0 +1,27 @@
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import app as app_module
+
+def upload(text):
+    return FileStorage(stream=io.BytesIO(text.encode('utf-8')), filename='titles.csv')
+
+def test_duplicates_within_the_window_are_skipped():
+    csv_file = upload('﻿channel,video_title\nx,One\nx,Two\nx,"One"\nx,  Two \nx,\nx,Three\n')
+    assert list(app_module.iter_csv_titles(csv_file, dedup_window=3)) == ['One', 'Two', 'Three']
+
+def test_titles_outside_the_window_are_kept_again():
+    csv_file = upload('title\nA\nB\nC\nA\nC\nB\n')
+    # With a window of two, A has been forgotten by the time it repeats
+    assert list(app_module.iter_csv_titles(csv_file, dedup_window=2)) == ['A', 'B', 'C', 'A', 'B']
+
+def test_a_repeat_keeps_its_title_in_the_window():
+    csv_file = upload('title\nA\nB\nA\nC\nA\n')
+    # A's repeat refreshes it, so C pushes out B instead
+    assert list(app_module.iter_csv_titles(csv_file, dedup_window=2)) == ['A', 'B', 'C']
+
+def test_a_file_without_a_title_column_is_refused():
+    with pytest.raises(ValueError, match='No video title column'):
+        app_module.iter_csv_titles(upload('channel,views\nx,1\n'))
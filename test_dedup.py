@@ -0,0 +1,41 @@
+from config import Config
+from dedup import TitleDeduplicator, canonicalize_title, meaning_differs
+
+def groups(titles, **options):
+    deduplicator = TitleDeduplicator(**options)
+    return [deduplicator.assign(title)[0] for title in titles]
+
+def test_fuzzy_matching_is_off_by_default():
+    assert Config.DEDUP_ENABLED
+    assert not Config.DEDUP_FUZZY
+    assert not TitleDeduplicator().fuzzy
+
+def test_exact_canonical_form_is_grouped():
+    assert canonicalize_title('Delhi blast: 5 killed | LIVE 🔴 #Breaking') == 'delhi blast 5 killed'
+    assert groups(['Delhi blast: 5 killed | LIVE', 'DELHI BLAST 5 killed (Breaking News)']) == [0, 0]
+
+def test_similar_titles_are_not_grouped_without_fuzzy():
+    assert groups(['PM Modi addresses the nation on Independence Day',
+                   'PM Modi address the nation on Independence Day']) == [0, 1]
+
+def test_fuzzy_groups_near_duplicates():
+    assert groups(['PM Modi addresses the nation on Independence Day',
+                   'PM Modi address the nation on Independence Day'], fuzzy=True) == [0, 0]
+
+def test_fuzzy_never_merges_negations():
+    assert groups(['Congress is not anti-national says Rahul Gandhi',
+                   'Congress is anti-national says Rahul Gandhi'], fuzzy=True, threshold=0.5) == [0, 1]
+    assert groups(["Congress isn't anti-national says Rahul Gandhi",
+                   'Congress is anti-national says Rahul Gandhi'], fuzzy=True, threshold=0.5) == [0, 1]
+    assert groups(['राहुल गांधी बोले कांग्रेस देशविरोधी नहीं है',
+                   'राहुल गांधी बोले कांग्रेस देशविरोधी है'], fuzzy=True, threshold=0.5) == [0, 1]
+
+def test_fuzzy_never_merges_different_numbers():
+    assert groups(['5 killed in Delhi blast | LIVE', '6 killed in Delhi blast'], fuzzy=True, threshold=0.5) == [0, 1]
+    assert groups(['BJP wins Bihar election 2020', 'BJP wins Bihar election 2025'], fuzzy=True, threshold=0.5) == [0, 1]
+
+def test_meaning_differs():
+    assert meaning_differs('no deal says pm', 'deal says pm')
+    assert meaning_differs('rahul gandhi nahi aayenge', 'rahul gandhi aayenge')
+    assert meaning_differs('3 dead', '4 dead')
+    assert not meaning_differs('pm addresses nation', 'pm address nation')
@@ -0,0 +1,84 @@
+import csv
+import gzip
+import io
+import json
+import threading
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from export import EXPORT_COLUMNS, iter_arrow, iter_csv, iter_jsonl_gz, iter_parquet
+
+ROW = {
+    'position': 0, 'video_title': 'Title', 'sentiment': 'neutral', 'emotion': 'other', 'frame': 'conflict',
+    'ideology_score': 0, 'topics': 'a, b', 'language_mix': 'English', 'agency_subject': 'implied',
+    'model': 'gemini-2.5-flash', 'prompt_version': 'abc123', 'channel_id': 'UC1', 'channel_name': 'First'
+}
+
+def test_parquet_export_round_trips():
+    rows = [dict(ROW, position=position) for position in range(25)]
+    table = pq.read_table(io.BytesIO(b''.join(iter_parquet(rows, chunk_rows=10))))
+    assert [field for _, field in EXPORT_COLUMNS if field not in table.column_names] == []
+    assert table.schema.field('ideology_score').type == pa.int64()
+    assert table.column('position').to_pylist() == list(range(25))
+    assert table.slice(0, 1).to_pylist()[0] == dict(ROW, duplicate_of=None)
+
+def test_arrow_export_round_trips():
+    rows = [dict(ROW, position=position) for position in range(25)]
+    reader = pa.ipc.open_stream(io.BytesIO(b''.join(iter_arrow(rows, chunk_rows=10))))
+    batches = list(reader)
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    table = pa.Table.from_batches(batches)
+    assert [field for _, field in EXPORT_COLUMNS if field not in table.column_names] == []
+    assert table.slice(24, 1).to_pylist()[0] == dict(ROW, position=24, duplicate_of=None)
+
+def test_csv_export_has_model_prompt_version_and_channel():
+    lines = b''.join(iter_csv([ROW])).decode('utf-8').splitlines()
+    assert lines[0].endswith('Model,Prompt Version,Channel ID,Channel Name')
+    assert lines[1].endswith('gemini-2.5-flash,abc123,UC1,First')
+
+def test_jsonl_gz_export_round_trips():
+    data = gzip.decompress(b''.join(iter_jsonl_gz([ROW, ROW], chunk_rows=1)))
+    assert [json.loads(line) for line in data.decode('utf-8').splitlines()] == [ROW, ROW]
+
+def test_bulk_job_export_keeps_the_channel_of_every_row(monkeypatch, tmp_path):
+    import app as app_module
+    from jobs import JobManager
+    from store import ResultStore
+
+    manager = JobManager(str(tmp_path / 'jobs.db'), app_module.run_job, max_workers=1)
+    monkeypatch.setattr(app_module, 'job_manager', manager)
+    monkeypatch.setattr(app_module, 'result_store', ResultStore(str(tmp_path / 'results.db')))
+
+    def iter_channel_videos_with_key(channel_id, api_key, max_results=None, **filters):
+        for index in range(max_results):
+            yield {'video_id': f'{channel_id}-{index}', 'video_title': f'{channel_id} story {index}', 'published_at': None}
+
+    def analyze_titles_with_llm(video_titles, llm_type, api_key, gemini_model, on_result=None, cancel_event=None):
+        for position, title in enumerate(video_titles):
+            on_result(position, title, dict(ROW, position=position, video_title=title), None)
+
+    monkeypatch.setattr(app_module, 'iter_channel_videos_with_key', iter_channel_videos_with_key)
+    monkeypatch.setattr(app_module, 'analyze_titles_with_llm', analyze_titles_with_llm)
+    channels = [{'channel_input': f'@{name}', 'channel_id': channel_id, 'channel_name': name,
+                 'uploads_playlist_id': 'UU' + channel_id}
+                for channel_id, name in (('UC1', 'First'), ('UC2', 'Second'))]
+    params = {'kind': 'bulk', 'channels': channels, 'unresolved': [], 'num_videos': 3, 'filters': {},
+              'llm_type': 'gemini', 'gemini_model': 'gemini-2.5-flash', 'llm_model': 'gemini-2.5-flash',
+              'channel_name': 'First, Second'}
+    job_id = manager.create('bulk', params)
+    app_module.run_bulk_job(job_id, params, {'youtube_api_key': 'y', 'llm_api_key': 'k'}, threading.Event())
+
+    client = app_module.app.test_client()
+    response = client.get(f'/jobs/{job_id}/export?format=parquet')
+    table = pq.read_table(io.BytesIO(response.get_data()))
+    rows = {row['video_title']: (row['channel_id'], row['channel_name']) for row in table.to_pylist()}
+    assert len(rows) == 6
+    assert rows['UC1 story 0'] == ('UC1', 'First')
+    assert rows['UC2 story 2'] == ('UC2', 'Second')
+
+    data = client.get(f'/jobs/{job_id}/export?format=csv').get_data(as_text=True)
+    rows = {row['Video Title']: (row['Channel ID'], row['Channel Name']) for row in csv.DictReader(io.StringIO(data))}
+    assert rows['UC2 story 0'] == ('UC2', 'Second')
+    manager.shutdown(wait=False)
@@ -0,0 +1,24 @@
+import pytest
+
+import app as app_module
+from jobs import JobManager
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    manager = JobManager(str(tmp_path / 'jobs.db'), app_module.run_job, max_workers=1)
+    monkeypatch.setattr(app_module, 'job_manager', manager)
+    yield app_module.app.test_client()
+    manager.shutdown(wait=False)
+
+def test_non_numeric_since_and_limit_are_rejected(client):
+    job_id = app_module.job_manager.create('csv', {'kind': 'csv'}, ['One title'])
+    for path in (f'/jobs/{job_id}?since=abc', f'/jobs/{job_id}/events?since=1.5', '/jobs?limit=ten', '/jobs?limit=-1'):
+        response = client.get(path)
+        assert response.status_code == 400, path
+        assert response.get_json()['error'].split()[0] in ('since', 'limit')
+
+def test_since_and_limit_default_when_left_out(client):
+    job_id = app_module.job_manager.create('csv', {'kind': 'csv'}, ['One title'])
+    assert client.get(f'/jobs/{job_id}?since=').get_json()['job_id'] == job_id
+    assert [job['job_id'] for job in client.get('/jobs?limit=5').get_json()['jobs']] == [job_id]
+    assert client.get('/jobs/missing?since=0').status_code == 404
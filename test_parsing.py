@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from parsing import (
+    extract_json_values, normalize_field, parse_analysis_response, parse_batch_response, repair_json,
+    validate_analysis
+)
+
+VALID = {
+    'sentiment': 'positive', 'emotion': 'low_arousal_positive', 'frame': 'economic', 'ideology_score': 1,
+    'topics': ['GDP', 'RBI'], 'language_mix': 'Hinglish', 'agency_subject': 'RBI'
+}
+
+def test_fenced_json_is_parsed():
+    text = 'Here you go:\n```json\n' + json.dumps(VALID) + '\n```'
+    assert parse_analysis_response(text) == VALID
+
+def test_trailing_commas_single_quotes_and_python_literals_are_repaired():
+    text = "{'sentiment': 'neutral', 'topics': ['a', 'b',], 'flag': True, 'none': None,}"
+    assert parse_analysis_response(text) == {'sentiment': 'neutral', 'topics': ['a', 'b'], 'flag': True, 'none': None}
+
+def test_apostrophes_and_curly_quotes_inside_strings_are_kept():
+    assert parse_analysis_response("{'agency_subject': 'Modi's cabinet'}") == {'agency_subject': "Modi's cabinet"}
+    assert parse_analysis_response('{“frame”: “conflict”}') == {'frame': 'conflict'}
+
+def test_truncated_json_is_not_repaired():
+    assert repair_json('{"sentiment": "positive", "topics": ["a"', 0) is None
+    assert extract_json_values('{"sentiment": "positive", "topics": ["a"') == []
+    with pytest.raises(ValueError):
+        parse_analysis_response('{"sentiment": "positive", "emotion": "mix')
+
+def test_truncated_batch_keeps_the_complete_items():
+    text = '[{"index": 1, "sentiment": "positive"}, {"index": 2, "sentiment": "neg'
+    # The outer array never closes, so only the first object can be recovered
+    assert extract_json_values(text)[0] == {'index': 1, 'sentiment': 'positive'}
+    with pytest.raises(ValueError):
+        parse_batch_response(text, 2)
+
+def test_ideology_score_outside_the_range_is_invalid():
+    for value in (3, -3, 1.5, '2.5', True, 'high'):
+        assert normalize_field('ideology_score', value) is None
+    assert normalize_field('ideology_score', '-2') == -2
+    assert normalize_field('ideology_score', 2.0) == 2
+    cleaned, invalid = validate_analysis(dict(VALID, ideology_score=5))
+    assert invalid == ['ideology_score']
+    assert 'ideology_score' not in cleaned
+
+def test_wrong_enum_values_are_invalid_and_near_misses_normalized():
+    cleaned, invalid = validate_analysis(dict(VALID, sentiment='joyful', emotion='joy', language_mix='Tamil'))
+    assert invalid == ['sentiment', 'emotion', 'language_mix']
+    assert normalize_field('frame', 'Justice / Rights') == 'justice/rights'
+    assert normalize_field('frame', 'human interest') == 'human-interest'
+    assert normalize_field('emotion', 'High Arousal Negative') == 'high_arousal_negative'
+    assert normalize_field('language_mix', 'hinglish') == 'Hinglish'
+
+def test_missing_fields_are_invalid_and_topics_are_capped():
+    cleaned, invalid = validate_analysis({'topics': 'a, b, c, d', 'agency_subject': ' implied '})
+    assert invalid == ['sentiment', 'emotion', 'frame', 'ideology_score', 'language_mix']
+    assert cleaned == {'topics': ['a', 'b', 'c'], 'agency_subject': 'implied'}
+
+def test_batch_response_skips_missing_and_out_of_range_items():
+    text = json.dumps([dict(VALID, index=3), dict(VALID, index=1), dict(VALID, index=9), dict(VALID, index='x')])
+    parsed = parse_batch_response(text, 3)
+    assert sorted(parsed) == [0, 2]
+    assert 'index' not in parsed[0]
+
+def test_batch_response_uses_first_of_duplicate_indices_and_results_wrapper():
+    text = json.dumps({'results': [dict(VALID, index=1), dict(VALID, index=1, sentiment='negative')]})
+    assert parse_batch_response(text, 2) == {0: VALID}
+
+def test_batch_response_falls_back_to_list_order_without_indices():
+    text = json.dumps([VALID, dict(VALID, sentiment='neutral')])
+    assert parse_batch_response(text, 2)[1]['sentiment'] == 'neutral'
+    assert parse_batch_response(text, 3) == {}
+
+def test_batch_response_without_an_array_raises():
+    with pytest.raises(ValueError):
+        parse_batch_response('Sorry, I cannot help with that.', 2)
@@ -0,0 +1,194 @@
+import pytest
+
+from quota import QuotaExceededError, QuotaTracker
+from ratelimit import AdaptiveLimiter, RateLimiterRegistry, TokenBucket, classify_error, get_retry_after
+
+class FakeClock:
+    """Monotonic clock that only moves when something sleeps"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class NoJitter:
+    def uniform(self, low, high):
+        return low
+
+class APIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+        self.response = type('Response', (), {'headers': headers or {}})()
+
+def limiter(clock, **options):
+    settings = dict(rate_per_minute=0, max_concurrency=8, max_retries=4, base_delay=1.0, max_delay=30.0)
+    settings.update(options)
+    return AdaptiveLimiter(clock=clock, sleep=clock.sleep, rng=NoJitter(), **settings)
+
+def failing(*errors):
+    """A call that raises the given errors in turn, then returns 'ok'"""
+    errors = list(errors)
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+    return call
+
+def test_token_bucket_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(60, burst=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    assert bucket.wait_time() == pytest.approx(1.0)
+    assert bucket.acquire() == pytest.approx(1.0)
+    assert clock.sleeps == [pytest.approx(1.0)]
+    clock.now += 30
+    # Refill stops at the burst size
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    assert bucket.wait_time() == pytest.approx(1.0)
+
+def test_throttle_halves_and_transient_error_shrinks_the_concurrency_limit():
+    clock = FakeClock()
+    adaptive = limiter(clock)
+    with pytest.raises(APIError):
+        adaptive.attempt(failing(APIError(429)))
+    assert adaptive.snapshot()['concurrency_limit'] == 4
+    with pytest.raises(APIError):
+        adaptive.attempt(failing(APIError(503)))
+    assert adaptive.snapshot()['concurrency_limit'] == 3
+    # Successes grow it back, but never past max_concurrency
+    for _ in range(40):
+        adaptive.attempt(failing())
+    assert adaptive.snapshot()['concurrency_limit'] == 8
+
+def test_concurrency_limit_grows_back_by_about_one_slot_per_limit_successes():
+    adaptive = limiter(FakeClock(), max_concurrency=8)
+    with pytest.raises(APIError):
+        adaptive.attempt(failing(APIError(429)))
+    for _ in range(4):
+        adaptive.attempt(failing())
+    assert adaptive.snapshot()['concurrency_limit'] == 4
+    adaptive.attempt(failing())
+    assert adaptive.snapshot()['concurrency_limit'] == 5
+
+def test_limit_never_drops_below_one():
+    adaptive = limiter(FakeClock(), max_concurrency=2, max_retries=5)
+    with pytest.raises(APIError):
+        adaptive.call(failing(*[APIError(429)] * 6))
+    assert adaptive.snapshot()['concurrency_limit'] == 1
+
+def test_retries_back_off_exponentially_and_count_throttling():
+    clock = FakeClock()
+
+    class FullJitter:
+        def uniform(self, low, high):
+            return high
+
+    adaptive = AdaptiveLimiter(0, 8, max_retries=4, base_delay=1.0, max_delay=30.0,
+                               clock=clock, sleep=clock.sleep, rng=FullJitter())
+    assert adaptive.call(failing(APIError(429), APIError(502), APIError(429))) == 'ok'
+    assert clock.sleeps == [1.0, 2.0, 4.0]
+    stats = adaptive.snapshot()
+    assert (stats['calls'], stats['successes'], stats['failures'], stats['retries']) == (4, 1, 0, 3)
+    assert (stats['throttled'], stats['transient_errors']) == (2, 1)
+    assert stats['backoff_seconds'] == 7.0
+    assert stats['throttle_rate'] == 0.5
+
+def test_retry_after_sets_the_minimum_delay_up_to_max_delay():
+    clock = FakeClock()
+    adaptive = limiter(clock, max_delay=10.0)
+    assert adaptive.call(failing(APIError(429, {'retry-after': '7'}), APIError(429, {'Retry-After': '120'}))) == 'ok'
+    assert clock.sleeps == [7.0, 10.0]
+
+def test_errors_that_cannot_be_retried_fail_at_once():
+    clock = FakeClock()
+    adaptive = limiter(clock)
+    with pytest.raises(APIError):
+        adaptive.call(failing(APIError(400)))
+    with pytest.raises(QuotaExceededError):
+        adaptive.call(failing(QuotaExceededError('quota')))
+    stats = adaptive.snapshot()
+    assert (stats['calls'], stats['failures'], stats['retries']) == (2, 2, 0)
+    assert clock.sleeps == []
+    assert stats['concurrency_limit'] == 8
+
+def test_call_gives_up_after_max_retries():
+    adaptive = limiter(FakeClock(), max_retries=2)
+    with pytest.raises(APIError):
+        adaptive.call(failing(*[APIError(503)] * 3))
+    stats = adaptive.snapshot()
+    assert (stats['calls'], stats['retries'], stats['failures']) == (3, 2, 1)
+
+def test_rate_limit_wait_is_accounted():
+    clock = FakeClock()
+    adaptive = limiter(clock, rate_per_minute=6)  # burst of one token every ten seconds
+    adaptive.call(failing())
+    adaptive.call(failing())
+    assert adaptive.snapshot()['rate_wait_seconds'] == 10.0
+    assert adaptive.snapshot()['throttle_delay_seconds'] == 10.0
+
+def test_get_retry_after():
+    assert get_retry_after(APIError(429, {'retry-after': '2.5'})) == 2.5
+    assert get_retry_after(APIError(429)) is None
+    assert get_retry_after(APIError(429, {'retry-after': 'soon'})) is None
+    assert get_retry_after(APIError(429, {'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'})) == 0.0
+
+    class HttpError(Exception):
+        resp = {'status': '429', 'retry-after': '3'}
+    assert get_retry_after(HttpError()) == 3.0
+
+def test_classify_error():
+    assert classify_error(APIError(429)) == 'throttled'
+    assert classify_error(APIError(504)) == 'transient'
+    assert classify_error(APIError(404)) is None
+    assert classify_error(Exception('429 Resource has been exhausted (e.g. check quota).')) == 'throttled'
+    assert classify_error(Exception('Read timed out')) == 'transient'
+    assert classify_error(ValueError('bad JSON')) is None
+
+def test_registry_keeps_one_limiter_per_provider_and_key():
+    clock = FakeClock()
+    settings = dict(rate_per_minute=0, max_concurrency=4, clock=clock, sleep=clock.sleep)
+    registry = RateLimiterRegistry({'gemini': settings, 'youtube': settings})
+    assert registry.get('gemini', 'key-1111') is registry.get('gemini', 'key-1111')
+    assert registry.get('gemini', 'key-2222') is not registry.get('gemini', 'key-1111')
+    assert registry.get('youtube', 'key-1111') is not registry.get('gemini', 'key-1111')
+    with pytest.raises(APIError):
+        registry.attempt('gemini', 'key-1111', failing(APIError(429)))
+    stats = registry.stats()
+    assert stats['gemini:...1111']['concurrency_limit'] == 2
+    assert stats['gemini:...2222']['concurrency_limit'] == 4
+
+def test_quota_charges_units_per_method_and_refuses_overruns():
+    now = [1_700_000_000.0]  # 2023-11-14 22:13 UTC
+    quota = QuotaTracker(150, clock=lambda: now[0])
+    quota.charge('key-1111', 'search.list')
+    quota.charge('key-1111', 'playlistItems.list')
+    assert quota.remaining('key-1111') == 49
+    assert quota.remaining('key-2222') == 150
+    with pytest.raises(QuotaExceededError):
+        quota.charge('key-1111', 'search.list')
+    # A refused call is not charged
+    assert quota.stats()['keys']['...1111'] == {'units_used': 101, 'calls': 2, 'units_remaining': 49}
+
+def test_quota_resets_on_a_new_utc_day():
+    now = [1_700_000_000.0]
+    quota = QuotaTracker(100, clock=lambda: now[0])
+    quota.charge('key-1111', 'search.list')
+    assert quota.remaining('key-1111') == 0
+    now[0] += 2 * 3600
+    assert quota.remaining('key-1111') == 100
+    assert quota.stats()['day'] == '2023-11-15'
+
+def test_zero_daily_quota_means_unlimited():
+    quota = QuotaTracker(0, clock=lambda: 0.0)
+    for _ in range(1000):
+        quota.charge('key-1111', 'search.list')
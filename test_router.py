@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+
+from ratelimit import RateLimiterRegistry
+from router import LLMRouter
+
+GEMINI = ('gemini', 'gemini-2.5-flash')
+FALLBACK = ('gemini', 'gemini-2.0-flash')
+
+class ProviderError(Exception):
+    """A failure the limiter does not retry, so each attempt is one call"""
+
+def make_router(now, **options):
+    limiters = RateLimiterRegistry({'gemini': dict(rate_per_minute=0, max_concurrency=4, max_retries=2,
+                                                    sleep=lambda seconds: None)})
+    options.setdefault('cooldown_seconds', 30.0)
+    return LLMRouter(limiters, clock=lambda: now[0], **options)
+
+def target(model, key):
+    return model + (key,)
+
+def stub(failing=(), stalled=None):
+    """A provider call that fails on the keys in failing, blocks on stalled until released, and records the order"""
+    calls = []
+    release = threading.Event()
+
+    def call(target):
+        calls.append(target[2])
+        if target[2] in failing:
+            raise ProviderError(f'{target[2]} is down')
+        if target[2] == stalled:
+            release.wait(5)
+        return f'answer from {target[2]}'
+    return call, calls, release
+
+def test_targets_list_the_model_keys_before_its_fallbacks():
+    router = make_router([0.0], fallbacks={'gemini-2.5-flash': ['gemini-2.0-flash', 'chatgpt']})
+    targets = router.targets('gemini', 'gemini-2.5-flash', {'gemini': 'key-1, key-2\nkey-1', 'chatgpt': ['key-9']})
+    assert targets == [target(GEMINI, 'key-1'), target(GEMINI, 'key-2'),
+                       target(FALLBACK, 'key-1'), target(FALLBACK, 'key-2'),
+                       ('chatgpt', 'chatgpt', 'key-9')]
+    with pytest.raises(ValueError):
+        router.call([], stub()[0])
+
+def test_failover_tries_every_key_of_the_model_before_the_fallback():
+    router = make_router([0.0])
+    targets = [target(GEMINI, 'key-1'), target(GEMINI, 'key-2'), target(FALLBACK, 'key-3')]
+    call, calls, _ = stub(failing={'key-1', 'key-2'})
+    assert router.call(targets, call) == ('answer from key-3', target(FALLBACK, 'key-3'))
+    assert calls == ['key-1', 'key-2', 'key-3']
+    stats = router.stats()
+    assert stats['gemini-2.5-flash:...ey-1']['failovers'] == 1
+    assert stats['gemini-2.5-flash:...ey-2']['failovers'] == 1
+    assert stats['gemini-2.0-flash:...ey-3']['failures'] == 0
+
+def test_targets_cooling_down_are_tried_last():
+    now = [1000.0]
+    router = make_router(now)
+    targets = [target(GEMINI, 'key-1'), target(GEMINI, 'key-2')]
+    call, calls, _ = stub(failing={'key-1'})
+    router.call(targets, call)
+    router.call(targets, call)
+    assert calls == ['key-1', 'key-2', 'key-2']
+    # Once the cooldown is over the failed key is back in the rotation
+    now[0] += 30
+    assert router.rank(targets)[0] == target(GEMINI, 'key-1')
+
+def test_all_targets_failing_raises_the_last_error():
+    router = make_router([0.0])
+    call, calls, _ = stub(failing={'key-1', 'key-2'})
+    with pytest.raises(ProviderError, match='key-2'):
+        router.call([target(GEMINI, 'key-1'), target(GEMINI, 'key-2')], call)
+    assert calls == ['key-1', 'key-2']
+
+def test_cooldown_doubles_with_consecutive_failures_and_resets_on_success():
+    now = [1000.0]
+    router = make_router(now, cooldown_seconds=10.0)
+    targets = [target(GEMINI, 'key-1')]
+    call, _, _ = stub(failing={'key-1'})
+    cooldowns = []
+    for _ in range(8):
+        with pytest.raises(ProviderError):
+            router.call(targets, call)
+        cooldowns.append(router.stats()['gemini-2.5-flash:...ey-1']['cooling_down_seconds'])
+    # Doubling stops at 2 ** 5 times the base cooldown
+    assert cooldowns == [10.0, 20.0, 40.0, 80.0, 160.0, 320.0, 320.0, 320.0]
+
+    assert router.call(targets, stub()[0])[0] == 'answer from key-1'
+    stats = router.stats()['gemini-2.5-flash:...ey-1']
+    assert (stats['calls'], stats['failures'], stats['cooling_down_seconds']) == (9, 8, 0.0)
+    with pytest.raises(ProviderError):
+        router.call(targets, call)
+    assert router.stats()['gemini-2.5-flash:...ey-1']['cooling_down_seconds'] == 10.0
+
+def hedging_router():
+    router = make_router([0.0], hedge_quantile=0.5, hedge_min_seconds=0.05, hedge_min_samples=3)
+    targets = [target(GEMINI, 'key-1'), target(GEMINI, 'key-2')]
+    # Both keys have the same latency history, so key-1 stays first
+    for hedge_target in targets:
+        for seconds in (0.01, 0.02, 0.03):
+            router._target_stats(hedge_target).record(seconds)
+    return router, targets
+
+def test_slow_call_is_hedged_on_the_next_target_and_the_first_answer_wins():
+    router, targets = hedging_router()
+    call, calls, release = stub(stalled='key-1')
+    try:
+        assert router.call(targets, call) == ('answer from key-2', target(GEMINI, 'key-2'))
+    finally:
+        release.set()
+    assert calls == ['key-1', 'key-2']
+    stats = router.stats()
+    assert stats['gemini-2.5-flash:...ey-1']['hedges'] == 1
+    assert stats['gemini-2.5-flash:...ey-2']['hedge_wins'] == 1
+
+def test_fast_call_is_not_hedged():
+    router, targets = hedging_router()
+    call, calls, _ = stub()
+    assert router.call(targets, call) == ('answer from key-1', target(GEMINI, 'key-1'))
+    assert calls == ['key-1']
+    assert router.stats()['gemini-2.5-flash:...ey-1']['hedges'] == 0
+
+def test_hedging_router_fails_over_when_a_call_errors():
+    router, targets = hedging_router()
+    call, calls, _ = stub(failing={'key-1'})
+    assert router.call(targets, call) == ('answer from key-2', target(GEMINI, 'key-2'))
+    assert calls == ['key-1', 'key-2']
+    stats = router.stats()
+    assert stats['gemini-2.5-flash:...ey-1']['failovers'] == 1
+    assert stats['gemini-2.5-flash:...ey-2']['hedge_wins'] == 0
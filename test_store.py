@@ -0,0 +1,46 @@
+from store import ResultStore
+
+def test_failed_videos_stop_after_max_attempts(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.db'))
+    for _ in range(3):
+        store.add_result('UC1', 'v1', 'Title one', None, 'gemini-2.5-flash', error='bad answer')
+    store.add_result('UC1', 'v2', 'Title two', None, 'gemini-2.5-flash', error='bad answer')
+
+    assert [video['attempts'] for video in store.failed_videos('UC1')] == [3, 1]
+    assert [video['video_id'] for video in store.failed_videos('UC1', max_attempts=3)] == ['v2']
+
+    store.add_result('UC1', 'v2', 'Title two', None, 'gemini-2.5-flash', result={'sentiment': 'neutral'})
+    assert store.failed_videos('UC1', max_attempts=3) == []
+
+def test_aggregate_averages_scores_and_shares_values_per_channel_and_month(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.db'))
+    rows = [
+        ('UC1', 'v1', '2024-03-02T10:00:00Z', 'gemini-2.5-flash', -2, 'negative'),
+        ('UC1', 'v2', '2024-03-15T10:00:00Z', 'gemini-2.5-flash', 1, 'negative'),
+        ('UC1', 'v3', '2024-03-30T10:00:00Z', 'gemini-2.5-flash', 4, 'positive'),
+        ('UC1', 'v4', '2024-04-01T10:00:00Z', 'gemini-2.5-flash', 3, 'positive'),
+        ('UC2', 'v5', '2024-03-10T10:00:00Z', 'gemini-2.5-flash', 0, 'neutral'),
+        ('UC1', 'v6', '2024-03-20T10:00:00Z', 'gpt-4o', 5, 'neutral'),
+    ]
+    for channel_id, video_id, published_at, model, score, sentiment in rows:
+        store.add_result(channel_id, video_id, 'Title', published_at, model,
+                         result={'ideology_score': score, 'sentiment': sentiment}, channel_name=channel_id + ' News')
+    # Failures have no fields and are left out
+    store.add_result('UC1', 'v7', 'Title', '2024-03-05T10:00:00Z', 'gemini-2.5-flash', error='bad answer')
+
+    scores = store.aggregate('ideology_score', 'month', model='gemini-2.5-flash')
+    assert [(row['channel_id'], row['channel_name'], row['bucket'], row['average'], row['min'], row['max'], row['count'])
+            for row in scores] == [
+        ('UC1', 'UC1 News', '2024-03', 1.0, -2, 4, 3),
+        ('UC1', 'UC1 News', '2024-04', 3.0, 3, 3, 1),
+        ('UC2', 'UC2 News', '2024-03', 0.0, 0, 0, 1),
+    ]
+
+    sentiments = store.aggregate('sentiment', 'month', channel_id='UC1')
+    assert sentiments[0]['value'] == 'negative'
+    assert {(row['bucket'], row['value']): (row['count'], row['share']) for row in sentiments} == {
+        ('2024-03', 'negative'): (2, 0.5),
+        ('2024-03', 'neutral'): (1, 0.25),
+        ('2024-03', 'positive'): (1, 0.25),
+        ('2024-04', 'positive'): (1, 1.0),
+    }
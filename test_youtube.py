@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+from cache import ChannelCache
+from quota import QuotaTracker
+from ratelimit import RateLimiterRegistry
+
+class FakeRequest:
+    def __init__(self, youtube, resource, params):
+        self.youtube = youtube
+        self.resource = resource
+        self.params = params
+
+    def execute(self):
+        self.youtube.calls.append((self.resource, self.params))
+        return self.youtube.handlers[self.resource](**self.params)
+
+class FakeResource:
+    def __init__(self, youtube, resource):
+        self.youtube = youtube
+        self.resource = resource
+
+    def list(self, **params):
+        return FakeRequest(self.youtube, self.resource, params)
+
+class FakeYouTube:
+    """YouTube client answering list() calls with a handler per resource and recording every call"""
+
+    def __init__(self, **handlers):
+        self.handlers = handlers
+        self.calls = []
+
+    def channels(self):
+        return FakeResource(self, 'channels')
+
+    def search(self):
+        return FakeResource(self, 'search')
+
+    def playlistItems(self):
+        return FakeResource(self, 'playlistItems')
+
+def uploads(count):
+    """Newest-first uploads, one per day counting back from 2024-06-30"""
+    newest = datetime(2024, 6, 30, 10)
+    return [(f'v{index}', f'Video {index}', (newest - timedelta(days=index)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+            for index in range(count)]
+
+def paged_playlist(videos):
+    """playlistItems.list handler that pages through videos with numeric page tokens"""
+    def playlist_items(part, playlistId, maxResults, pageToken=None):
+        start = int(pageToken or 0)
+        page = videos[start:start + maxResults]
+        response = {'items': [
+            {'snippet': {'title': title, 'publishedAt': published_at},
+             'contentDetails': {'videoId': video_id, 'videoPublishedAt': published_at}}
+            for video_id, title, published_at in page
+        ]}
+        if start + maxResults < len(videos):
+            response['nextPageToken'] = str(start + maxResults)
+        return response
+    return playlist_items
+
+@pytest.fixture
+def youtube(monkeypatch):
+    """Install a FakeYouTube (set its handlers in the test) without quota or rate limits"""
+    client = FakeYouTube()
+    monkeypatch.setattr(app_module, 'get_youtube_client', lambda api_key: client)
+    monkeypatch.setattr(app_module, 'youtube_quota', QuotaTracker(0))
+    limits = RateLimiterRegistry({'youtube': {'rate_per_minute': 0, 'max_concurrency': 4}})
+    monkeypatch.setattr(app_module, 'rate_limiters', limits)
+    monkeypatch.setattr(app_module, 'channel_cache', None)
+    return client
+
+def playlist_calls(youtube):
+    return [(params['maxResults'], params['pageToken']) for resource, params in youtube.calls if resource == 'playlistItems']
+
+def test_uploads_are_read_across_pages(youtube):
+    youtube.handlers['playlistItems'] = paged_playlist(uploads(130))
+    videos = list(app_module.iter_channel_videos_with_key('UC1', 'key', 120, uploads_playlist_id='UU1'))
+    assert [video['video_id'] for video in videos] == [f'v{index}' for index in range(120)]
+    # The last page asks only for the videos still wanted
+    assert playlist_calls(youtube) == [(50, None), (50, '50'), (20, '100')]
+
+def test_without_a_limit_every_page_is_read(youtube):
+    youtube.handlers['playlistItems'] = paged_playlist(uploads(101))
+    assert len(list(app_module.iter_channel_videos_with_key('UC1', 'key', uploads_playlist_id='UU1'))) == 101
+    assert playlist_calls(youtube) == [(50, None), (50, '50'), (50, '100')]
+
+def test_the_uploads_playlist_is_looked_up_when_unknown(youtube):
+    youtube.handlers['channels'] = lambda **params: {
+        'items': [{'id': 'UC1', 'contentDetails': {'relatedPlaylists': {'uploads': 'UU1'}}}]
+    }
+    youtube.handlers['playlistItems'] = paged_playlist(uploads(3))
+    assert len(list(app_module.iter_channel_videos_with_key('UC1', 'key', 10))) == 3
+    assert youtube.calls[0] == ('channels', {'part': 'contentDetails', 'id': 'UC1'})
+    assert youtube.calls[1][1]['playlistId'] == 'UU1'
+
+def test_date_range_skips_newer_uploads_and_stops_at_older_ones(youtube):
+    youtube.handlers['playlistItems'] = paged_playlist(uploads(200))
+    videos = list(app_module.iter_channel_videos_with_key(
+        'UC1', 'key', published_after='2024-05-01', published_before='2024-06-21', uploads_playlist_id='UU1'
+    ))
+    assert (videos[0]['published_at'], videos[-1]['published_at']) == ('2024-06-20T10:00:00Z', '2024-05-01T10:00:00Z')
+    # Uploads come newest first, so the first one before published_after ends the listing
+    assert playlist_calls(youtube) == [(50, None), (50, '50')]
+
+def test_since_video_id_stops_before_the_last_analyzed_upload(youtube):
+    youtube.handlers['playlistItems'] = paged_playlist(uploads(200))
+    videos = list(app_module.iter_channel_videos_with_key('UC1', 'key', stop_at_video_id='v55',
+                                                          uploads_playlist_id='UU1'))
+    assert [video['video_id'] for video in videos] == [f'v{index}' for index in range(55)]
+    assert len(playlist_calls(youtube)) == 2
+
+def test_every_page_is_charged_to_the_key_quota(youtube, monkeypatch):
+    quota = QuotaTracker(10000)
+    monkeypatch.setattr(app_module, 'youtube_quota', quota)
+    youtube.handlers['playlistItems'] = paged_playlist(uploads(130))
+    list(app_module.iter_channel_videos_with_key('UC1', 'key-1111', uploads_playlist_id='UU1'))
+    assert quota.stats()['keys']['...1111'] == {'units_used': 3, 'calls': 3, 'units_remaining': 9997}
+
+def channel_item(channel_id):
+    return {'id': channel_id, 'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + channel_id[2:]}}}
+
+def test_handles_resolve_with_the_cheap_lookup_and_are_cached(youtube, monkeypatch, tmp_path):
+    cache = ChannelCache(str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(app_module, 'channel_cache', cache)
+    youtube.handlers['channels'] = lambda **params: {'items': [channel_item('UC1')]}
+    for channel_input in ('@NDTV', 'https://www.youtube.com/@ndtv/videos', '@ndtv'):
+        assert app_module.extract_channel_id_with_key(channel_input, 'key') == 'UC1'
+    assert youtube.calls == [('channels', {'part': 'id,contentDetails', 'forHandle': 'NDTV'})]
+    # The lookup also learned the uploads playlist, so listing uploads needs no channels.list call
+    assert app_module.get_uploads_playlist_id_with_key('UC1', 'key') == 'UU1'
+    assert len(youtube.calls) == 1
+
+def test_channel_ids_need_no_lookup(youtube):
+    assert app_module.extract_channel_id_with_key('https://www.youtube.com/channel/UCabcdefghijklmnopqrstuv', 'key') \
+        == 'UCabcdefghijklmnopqrstuv'
+    assert app_module.extract_channel_id_with_key('UCabcdefghijklmnopqrstuv', 'key') == 'UCabcdefghijklmnopqrstuv'
+    assert youtube.calls == []
+
+def test_user_urls_fall_back_to_search_and_custom_urls_search(youtube):
+    youtube.handlers['channels'] = lambda **params: {'items': []}
+    youtube.handlers['search'] = lambda **params: {'items': [{'snippet': {'channelId': 'UC9'}}]}
+    assert app_module.extract_channel_id_with_key('https://www.youtube.com/user/ndtv', 'key') == 'UC9'
+    assert app_module.extract_channel_id_with_key('https://www.youtube.com/c/ndtvindia', 'key') == 'UC9'
+    assert [(resource, params.get('forUsername') or params.get('q')) for resource, params in youtube.calls] == [
+        ('channels', 'ndtv'), ('search', 'ndtv'), ('search', 'ndtvindia')
+    ]
+
+def test_expired_handle_lookups_are_resolved_again(youtube, monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(app_module, 'channel_cache', ChannelCache(str(tmp_path / 'cache.db'), 60, clock=lambda: now[0]))
+    youtube.handlers['channels'] = lambda **params: {'items': [channel_item('UC1')]}
+    app_module.extract_channel_id_with_key('@ndtv', 'key')
+    now[0] += 61
+    app_module.extract_channel_id_with_key('@ndtv', 'key')
+    assert len(youtube.calls) == 2
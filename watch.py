@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class WatchScheduler:
+    """Background thread polling watched channels for new uploads when they fall due.
+
+    poll(channel) does the work for one watchlist row and returns a summary;
+    the scheduler only decides when to call it and records the outcome.
+    """
+
+    def __init__(self, store, poll, tick_seconds=60):
+        self.store = store
+        self.poll = poll
+        self.tick_seconds = tick_seconds
+        self.last_runs = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='watch-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def trigger(self, channel_id):
+        """Poll a channel on the next pass instead of waiting for its interval"""
+        self.store.schedule(channel_id, time.time())
+        self._wake.set()
+
+    def run_due(self):
+        """Poll every channel that is due now; returns {channel_id: summary or error}"""
+        outcomes = {}
+        for channel in self.store.due_channels():
+            if self._stop.is_set():
+                break
+            outcomes[channel['channel_id']] = self.run_channel(channel)
+        return outcomes
+
+    def run_channel(self, channel):
+        started = time.time()
+        try:
+            summary = self.poll(channel)
+            self.store.mark_checked(channel['channel_id'])
+        except Exception as e:
+            logger.error("Error polling channel %s: %s", channel['channel_id'], e)
+            self.store.mark_checked(channel['channel_id'], str(e))
+            summary = {'error': str(e)}
+        summary['seconds'] = round(time.time() - started, 3)
+        self.last_runs[channel['channel_id']] = dict(summary, finished_at=time.time())
+        return summary
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.error("Error in watch scheduler: %s", e)
+            self._wake.wait(self.tick_seconds)
+            self._wake.clear()